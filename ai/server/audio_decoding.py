@@ -0,0 +1,482 @@
+"""
+Audio container detection, decoding and resampling for uploaded chunks.
+
+/audio/chunk and the /stream audio messages accept:
+
+  * raw int16 little-endian PCM at SPEECH_SAMPLE_RATE (the original format)
+  * WAV: the header is parsed and the data chunk is viewed in place with
+    np.frombuffer (no copy for 16-bit mono at the model rate)
+  * Ogg or WebM (e.g. Opus from the browser's MediaRecorder): decoded
+    in-process with PyAV when installed, otherwise by a local ffmpeg binary
+
+MediaRecorder timeslice chunks are consecutive pieces of one container
+stream: only the first carries the container header, and later ones may
+start anywhere (mid-cluster, mid-page), so they cannot be decoded alone.
+Chunks that belong to a session go through that session's StreamDecoder: one
+demuxer and decoder (a PyAV container on a feeder thread, else one ffmpeg
+process) that lives as long as the stream and is fed each chunk's bytes as
+they arrive. A chunk starting with a new header (the recorder restarted)
+starts a new stream.
+
+Everything is returned as mono int16 at the requested rate; mismatched
+rates go through a polyphase windowed-sinc resampler whose filter bank is
+built once per rate pair and applied with a single gather + einsum.
+"""
+
+import io
+import math
+import shutil
+import struct
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:  # Optional: in-process Opus/Vorbis decoding
+    import av  # type: ignore
+except ImportError:
+    av = None
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Zero crossings of the sinc kernel on each side of the centre tap
+RESAMPLE_HALF_WIDTH = 8
+
+# Longest wait for a streamed chunk's decoded audio
+STREAM_DECODE_TIMEOUT = 2.0
+# ffmpeg gives no "needs more input" signal: a chunk's output is complete once
+# nothing new arrived for this long
+FFMPEG_QUIET_SECONDS = 0.02
+
+# Ogg page header flag of a stream's first (beginning-of-stream) page
+_OGG_BOS = 0x02
+
+
+def detect_format(data: bytes) -> str:
+    """Return "wav", "ogg", "webm" or "pcm" from the leading magic bytes."""
+    if len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "wav"
+    if data[:4] == b"OggS":
+        return "ogg"
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    return "pcm"
+
+
+def parse_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    """
+    Parse a RIFF/WAVE buffer into ([n_samples, channels] samples, rate).
+
+    16-bit PCM and 32-bit float data are viewed in place; 8-bit PCM is
+    converted. Streaming writers that leave the data size at 0 or
+    0xFFFFFFFF are read to the end of the buffer.
+    """
+    view = memoryview(data)
+    offset = 12
+    fmt = None
+    while offset + 8 <= len(data):
+        chunk_id = bytes(view[offset : offset + 4])
+        (size,) = struct.unpack_from("<I", data, offset + 4)
+        body = offset + 8
+
+        if chunk_id == b"fmt ":
+            audio_format, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", data, body)
+            if audio_format == WAVE_FORMAT_EXTENSIBLE and size >= 40:
+                (audio_format,) = struct.unpack_from("<H", data, body + 24)
+            fmt = (audio_format, channels, rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            audio_format, channels, rate, bits = fmt
+            if size in (0, 0xFFFFFFFF) or body + size > len(data):
+                size = len(data) - body
+
+            if audio_format == WAVE_FORMAT_PCM and bits == 16:
+                dtype = np.dtype("<i2")
+            elif audio_format == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+                dtype = np.dtype("<f4")
+            elif audio_format == WAVE_FORMAT_PCM and bits == 8:
+                dtype = np.dtype("u1")
+            else:
+                raise ValueError(f"Unsupported WAV encoding (format {audio_format}, {bits} bit)")
+
+            frame_bytes = dtype.itemsize * channels
+            count = (size // frame_bytes) * channels
+            samples = np.frombuffer(data, dtype=dtype, count=count, offset=body)
+            return samples.reshape(-1, channels), rate
+
+        offset = body + size + (size & 1)  # chunks are word aligned
+
+    raise ValueError("WAV file has no data chunk")
+
+
+def to_int16_mono(samples: np.ndarray) -> np.ndarray:
+    """Downmix [n, channels] samples of any supported dtype to int16 mono."""
+    if samples.dtype == np.int16 and samples.shape[1] == 1:
+        return samples[:, 0]
+
+    if samples.dtype == np.uint8:
+        mono = (samples.astype(np.float32) - 128.0).mean(axis=1) * 256.0
+    elif samples.dtype.kind == "f":
+        mono = samples.mean(axis=1, dtype=np.float32) * 32767.0
+    else:
+        mono = samples.mean(axis=1, dtype=np.float32)
+    return np.clip(np.rint(mono), -32768, 32767).astype(np.int16)
+
+
+@lru_cache(maxsize=16)
+def _polyphase_bank(up: int, down: int) -> np.ndarray:
+    """Kaiser-windowed sinc low-pass split into ``up`` phases: [up, taps]."""
+    factor = max(up, down)
+    half = RESAMPLE_HALF_WIDTH * factor
+    t = np.arange(-half, half + 1, dtype=np.float64)
+    cutoff = 0.5 / factor  # cycles per sample at the upsampled rate
+    kernel = 2.0 * cutoff * np.sinc(2.0 * cutoff * t) * np.kaiser(t.size, 8.0) * up
+
+    taps = math.ceil(kernel.size / up)
+    padded = np.zeros(taps * up, dtype=np.float64)
+    padded[: kernel.size] = kernel
+    return padded.reshape(taps, up).T.astype(np.float32).copy()
+
+
+def resample(samples: np.ndarray, orig_rate: int, target_rate: int) -> np.ndarray:
+    """Resample int16 mono audio by the rational factor target/orig."""
+    if orig_rate == target_rate or samples.size == 0:
+        return samples
+
+    g = math.gcd(orig_rate, target_rate)
+    up, down = target_rate // g, orig_rate // g
+    bank = _polyphase_bank(up, down)
+    taps = bank.shape[1]
+    center = RESAMPLE_HALF_WIDTH * max(up, down)  # kernel midpoint
+
+    n_out = math.ceil(samples.shape[0] * up / down)
+    position = np.arange(n_out, dtype=np.int64) * down + center
+    phase = position % up
+    last = position // up
+
+    # Input index of every tap for every output sample, offset into a
+    # zero-padded copy so edge taps read silence
+    padded = np.concatenate(
+        (np.zeros(taps, np.float32), samples.astype(np.float32), np.zeros(taps, np.float32))
+    )
+    index = last[:, None] - np.arange(taps)[None, :] + taps
+    np.clip(index, 0, padded.size - 1, out=index)
+    out = np.einsum("nk,nk->n", bank[phase], padded[index])
+    return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
+
+
+def _decode_with_av(data: bytes, target_rate: int) -> np.ndarray:
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=target_rate)
+    chunks = []
+    with av.open(io.BytesIO(data)) as container:
+        for frame in container.decode(audio=0):
+            for out in resampler.resample(frame):
+                chunks.append(out.to_ndarray().reshape(-1))
+        for out in resampler.resample(None):
+            chunks.append(out.to_ndarray().reshape(-1))
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int16)
+
+
+def _decode_with_ffmpeg(data: bytes, target_rate: int) -> np.ndarray:
+    result = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-ar", str(target_rate),
+            "pipe:1",
+        ],
+        input=data,
+        capture_output=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise ValueError(f"ffmpeg could not decode audio: {result.stderr.decode(errors='replace')}")
+    return np.frombuffer(result.stdout, dtype=np.int16)
+
+
+def decode_compressed(data: bytes, target_rate: int) -> np.ndarray:
+    """Decode Ogg/WebM (Opus, Vorbis) to int16 mono at ``target_rate``."""
+    if av is not None:
+        return _decode_with_av(data, target_rate)
+    if shutil.which("ffmpeg"):
+        return _decode_with_ffmpeg(data, target_rate)
+    raise ValueError("Compressed audio needs PyAV (pip install av) or ffmpeg on PATH")
+
+
+def starts_stream(data: bytes, kind: str) -> bool:
+    """True when a WebM/Ogg chunk begins a stream (it carries the header)."""
+    if kind == "webm":
+        # Only a stream's first chunk starts with the EBML magic
+        return True
+    return kind == "ogg" and len(data) > 5 and bool(data[5] & _OGG_BOS)
+
+
+class _AvStream:
+    """
+    One PyAV container demuxing and decoding a growing byte stream.
+
+    The container runs on its own thread and reads through ``read``, which
+    blocks while no bytes are buffered. It only blocks once everything fed
+    so far has been demuxed and decoded, so that is when a chunk's audio is
+    complete.
+    """
+
+    def __init__(self, kind: str, target_rate: int) -> None:
+        self._buffer = bytearray()
+        self._output: List[np.ndarray] = []
+        self._cond = threading.Condition()
+        self._starved = False
+        self._closed = False
+        self._finished = False
+        self._error: Optional[Exception] = None
+        self._thread = threading.Thread(
+            target=self._run, args=(kind, target_rate), name="audio-stream", daemon=True
+        )
+        self._thread.start()
+
+    def read(self, size: int = -1) -> bytes:
+        """File-like read for the demuxer (blocks until bytes are fed)."""
+        with self._cond:
+            while not self._buffer and not self._closed:
+                self._starved = True
+                self._cond.notify_all()
+                self._cond.wait()
+            size = len(self._buffer) if size < 0 else size
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+            return data
+
+    def _run(self, kind: str, target_rate: int) -> None:
+        try:
+            resampler = av.AudioResampler(format="s16", layout="mono", rate=target_rate)
+            with av.open(self, mode="r", format="matroska" if kind == "webm" else "ogg") as container:
+                for frame in container.decode(audio=0):
+                    for out in resampler.resample(frame):
+                        with self._cond:
+                            self._output.append(out.to_ndarray().reshape(-1))
+        except Exception as exc:
+            self._error = exc
+        finally:
+            with self._cond:
+                self._finished = True
+                self._cond.notify_all()
+
+    def feed(self, data: bytes) -> np.ndarray:
+        """Append a chunk and return the audio decoded from it."""
+        with self._cond:
+            self._buffer += data
+            self._starved = False
+            self._cond.notify_all()
+            self._cond.wait_for(
+                lambda: (self._starved and not self._buffer) or self._finished,
+                STREAM_DECODE_TIMEOUT,
+            )
+            output, self._output = self._output, []
+        if not output and self._error is not None:
+            raise ValueError(f"Could not decode audio stream: {self._error}")
+        return np.concatenate(output) if output else np.zeros(0, dtype=np.int16)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class _FfmpegStream:
+    """One ffmpeg process decoding a growing byte stream from stdin."""
+
+    def __init__(self, kind: str, target_rate: int) -> None:
+        self._process = subprocess.Popen(
+            [
+                "ffmpeg", "-hide_banner", "-loglevel", "error",
+                "-probesize", "32", "-analyzeduration", "0",
+                "-f", "matroska" if kind == "webm" else "ogg", "-i", "pipe:0",
+                "-f", "s16le", "-ac", "1", "-ar", str(target_rate),
+                "-flush_packets", "1",
+                "pipe:1",
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._output = bytearray()
+        self._cond = threading.Condition()
+        self._finished = False
+        threading.Thread(target=self._drain, name="audio-stream", daemon=True).start()
+
+    def _drain(self) -> None:
+        while True:
+            data = self._process.stdout.read1(65536)
+            with self._cond:
+                if not data:
+                    self._finished = True
+                    self._cond.notify_all()
+                    return
+                self._output += data
+                self._cond.notify_all()
+
+    def feed(self, data: bytes) -> np.ndarray:
+        """Append a chunk and return the audio ffmpeg produced for it so far."""
+        try:
+            self._process.stdin.write(data)
+            self._process.stdin.flush()
+        except OSError as exc:
+            raise ValueError(f"ffmpeg audio stream ended: {exc}")
+
+        deadline = time.monotonic() + STREAM_DECODE_TIMEOUT
+        with self._cond:
+            # Wait for output to start, then until it pauses
+            while not self._finished:
+                received = len(self._output)
+                timeout = FFMPEG_QUIET_SECONDS if received else deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                self._cond.wait(timeout)
+                if received and len(self._output) == received:
+                    break
+            usable = len(self._output) - len(self._output) % 2
+            output = bytes(self._output[:usable])
+            del self._output[:usable]
+        return np.frombuffer(output, dtype=np.int16)
+
+    def close(self) -> None:
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        self._process.kill()
+
+
+class StreamDecoder:
+    """A session's MediaRecorder stream, decoded chunk by chunk (see module docstring)."""
+
+    def __init__(self, target_rate: int) -> None:
+        self.target_rate = target_rate
+        self.used_at = time.monotonic()
+        self._stream = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._stream is not None
+
+    def decode(self, data: bytes) -> np.ndarray:
+        kind = detect_format(data)
+        with self._lock:
+            if kind in ("ogg", "webm") and starts_stream(data, kind):
+                self.close()
+                if av is not None:
+                    self._stream = _AvStream(kind, self.target_rate)
+                elif shutil.which("ffmpeg"):
+                    self._stream = _FfmpegStream(kind, self.target_rate)
+                else:
+                    raise ValueError("Compressed audio needs PyAV (pip install av) or ffmpeg on PATH")
+            elif self._stream is None:
+                raise ValueError("Audio chunk continues a stream whose first chunk was not received")
+            return self._stream.feed(data)
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+
+class StreamDecoderStore:
+    """
+    Thread-safe LRU + TTL map of session_id -> StreamDecoder.
+
+    Every decoder holds a feeder thread or an ffmpeg process, so decoders
+    idle for longer than ``ttl_seconds`` (sessions that were never finalized)
+    and the least recently used beyond ``max_sessions`` are closed.
+    """
+
+    def __init__(self, target_rate: int, max_sessions: int = 128, ttl_seconds: float = 1800.0) -> None:
+        self.target_rate = target_rate
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._decoders: "OrderedDict[str, StreamDecoder]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicted_expired = 0
+        self._evicted_capacity = 0
+
+    def get(self, session_id: Optional[str]) -> Optional[StreamDecoder]:
+        """The session's decoder; None without a session_id."""
+        if not session_id:
+            return None
+        closing: List[StreamDecoder] = []
+        with self._lock:
+            closing += self._pop_expired()
+            decoder = self._decoders.get(session_id)
+            if decoder is None:
+                decoder = self._decoders[session_id] = StreamDecoder(self.target_rate)
+                while len(self._decoders) > self.max_sessions:
+                    closing.append(self._decoders.popitem(last=False)[1])
+                    self._evicted_capacity += 1
+            else:
+                self._decoders.move_to_end(session_id)
+            decoder.used_at = time.monotonic()
+        for stale in closing:
+            stale.close()
+        return decoder
+
+    def _pop_expired(self) -> List[StreamDecoder]:
+        """Remove decoders idle for longer than the TTL (oldest are first)."""
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = []
+        while self._decoders:
+            session_id, decoder = next(iter(self._decoders.items()))
+            if decoder.used_at >= cutoff:
+                break
+            del self._decoders[session_id]
+            expired.append(decoder)
+            self._evicted_expired += 1
+        return expired
+
+    def evict_expired(self) -> None:
+        """Close decoders idle for longer than the TTL."""
+        with self._lock:
+            expired = self._pop_expired()
+        for decoder in expired:
+            decoder.close()
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            decoder = self._decoders.pop(session_id, None)
+        if decoder is not None:
+            decoder.close()
+
+    def stats(self) -> Dict[str, Any]:
+        self.evict_expired()
+        return {
+            "stream_decoders": len(self._decoders),
+            "max_stream_decoders": self.max_sessions,
+            "decoders_evicted_expired": self._evicted_expired,
+            "decoders_evicted_capacity": self._evicted_capacity,
+        }
+
+
+def decode_audio(data: bytes, target_rate: int, stream: Optional[StreamDecoder] = None) -> np.ndarray:
+    """
+    Decode an uploaded chunk of any supported format to int16 mono.
+
+    With a session's ``stream``, WebM/Ogg chunks (and whatever follows them
+    that is not WAV) are decoded as pieces of one continuous stream.
+    """
+    kind = detect_format(data)
+    if stream is not None and kind != "wav" and (kind in ("ogg", "webm") or stream.started):
+        return stream.decode(data)
+    if kind == "wav":
+        samples, rate = parse_wav(data)
+        return resample(to_int16_mono(samples), rate, target_rate)
+    if kind in ("ogg", "webm"):
+        return decode_compressed(data, target_rate)
+    if len(data) % 2:
+        data = data[:-1]
+    return np.frombuffer(data, dtype=np.int16)
@@ -0,0 +1,195 @@
+"""
+Streaming log-mel / MFCC feature extraction for the speech model.
+
+A lightweight NumPy replacement for librosa on the latency-sensitive audio
+path: the analysis window, mel filterbank and DCT matrix are computed once,
+and each chunk is framed with a strided view, transformed with one batched
+rfft and projected onto the mel basis with a single matmul.
+
+Extraction is stateful per session. The samples that did not yet fill a
+whole hop (plus the window overlap) are carried into the next chunk, so a
+session's chunks produce exactly the frames the concatenated signal would,
+without re-sending or re-windowing audio. The last frame is also carried so
+delta features stay continuous across chunks, and a rolling buffer keeps the
+most recent ``context_frames`` feature frames for the model input.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+
+def hz_to_mel(hz: np.ndarray) -> np.ndarray:
+    return 2595.0 * np.log10(1.0 + np.asarray(hz) / 700.0)
+
+
+def mel_to_hz(mel: np.ndarray) -> np.ndarray:
+    return 700.0 * (10.0 ** (np.asarray(mel) / 2595.0) - 1.0)
+
+
+def mel_filterbank(
+    sample_rate: int,
+    n_fft: int,
+    n_mels: int,
+    fmin: float = 0.0,
+    fmax: Optional[float] = None,
+) -> np.ndarray:
+    """Triangular, area-normalised mel filters of shape [n_mels, n_fft // 2 + 1]."""
+    fmax = sample_rate / 2.0 if fmax is None else fmax
+    edges = mel_to_hz(np.linspace(hz_to_mel(fmin), hz_to_mel(fmax), n_mels + 2))
+    fft_freqs = np.linspace(0.0, sample_rate / 2.0, n_fft // 2 + 1)
+
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (fft_freqs - lower) / (center - lower)
+    falling = (upper - fft_freqs) / (upper - center)
+    filters = np.maximum(0.0, np.minimum(rising, falling))
+    filters *= 2.0 / (upper - lower)
+    return filters.astype(np.float32)
+
+
+def dct_matrix(n_mfcc: int, n_mels: int) -> np.ndarray:
+    """Orthonormal DCT-II basis of shape [n_mfcc, n_mels]."""
+    k = np.arange(n_mfcc)[:, None]
+    n = np.arange(n_mels)[None, :]
+    basis = np.cos(np.pi / n_mels * (n + 0.5) * k) * np.sqrt(2.0 / n_mels)
+    basis[0] /= np.sqrt(2.0)
+    return basis.astype(np.float32)
+
+
+class StreamState:
+    """Per-session carry-over between chunks."""
+
+    __slots__ = ("residual", "last_frame", "context")
+
+    def __init__(self, n_features: int, context_frames: int) -> None:
+        self.residual = np.zeros(0, dtype=np.float32)
+        self.last_frame: Optional[np.ndarray] = None
+        self.context = np.zeros((0, n_features), dtype=np.float32)
+
+
+class MelFrontend:
+    """Precomputed STFT -> log-mel (-> MFCC) (+ delta) feature extractor."""
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        n_fft: int = 400,
+        hop_length: int = 160,
+        n_mels: int = 64,
+        n_mfcc: int = 0,
+        deltas: bool = False,
+        context_frames: int = 100,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.n_mels = n_mels
+        self.n_mfcc = n_mfcc
+        self.deltas = deltas
+        self.context_frames = context_frames
+
+        # Periodic Hann window, as used by librosa/torchaudio
+        self.window = np.hanning(n_fft + 1)[:-1].astype(np.float32)
+        self.mel_basis = mel_filterbank(sample_rate, n_fft, n_mels)
+        self.dct_basis = dct_matrix(n_mfcc, n_mels) if n_mfcc else None
+
+    @property
+    def n_features(self) -> int:
+        base = self.n_mfcc or self.n_mels
+        return base * 2 if self.deltas else base
+
+    def new_state(self) -> StreamState:
+        return StreamState(self.n_features, self.context_frames)
+
+    def process(self, samples: np.ndarray, state: Optional[StreamState] = None) -> np.ndarray:
+        """
+        Extract features for a chunk of float32 samples in [-1, 1].
+
+        Returns the new frames [n_frames, n_features]; with a state, leftover
+        samples are carried to the next call and the rolling context updated.
+        """
+        if state is not None and state.residual.size:
+            samples = np.concatenate((state.residual, samples.astype(np.float32, copy=False)))
+        else:
+            samples = samples.astype(np.float32, copy=False)
+
+        n_frames = 0
+        if samples.shape[0] >= self.n_fft:
+            n_frames = 1 + (samples.shape[0] - self.n_fft) // self.hop_length
+
+        if n_frames:
+            frames = np.lib.stride_tricks.sliding_window_view(samples, self.n_fft)[
+                : n_frames * self.hop_length : self.hop_length
+            ]
+            spectrum = np.fft.rfft(frames * self.window, axis=-1)
+            power = spectrum.real ** 2 + spectrum.imag ** 2
+            feats = np.log(np.maximum(power.astype(np.float32) @ self.mel_basis.T, 1e-10))
+            if self.dct_basis is not None:
+                feats = feats @ self.dct_basis.T
+        else:
+            feats = np.zeros((0, self.n_mfcc or self.n_mels), dtype=np.float32)
+
+        if self.deltas:
+            previous = state.last_frame if state is not None else None
+            if feats.shape[0]:
+                prev_rows = np.vstack(
+                    ([previous] if previous is not None else [feats[0]]) + [feats[:-1]]
+                )
+                if state is not None:
+                    state.last_frame = feats[-1].copy()
+                feats = np.hstack((feats, feats - prev_rows))
+            else:
+                feats = np.zeros((0, self.n_features), dtype=np.float32)
+
+        feats = feats.astype(np.float32, copy=False)
+
+        if state is not None:
+            consumed = n_frames * self.hop_length
+            state.residual = samples[consumed:].copy()
+            if feats.shape[0]:
+                state.context = np.concatenate((state.context, feats))[-self.context_frames :]
+        return feats
+
+    def skip(self, state: StreamState) -> None:
+        """Mark a gap in the stream (e.g. a chunk skipped as silence)."""
+        state.residual = np.zeros(0, dtype=np.float32)
+        state.last_frame = None
+
+    def context_window(self, state: StreamState) -> np.ndarray:
+        """The last ``context_frames`` frames, zero-padded at the start."""
+        missing = self.context_frames - state.context.shape[0]
+        if missing <= 0:
+            return state.context
+        pad = np.zeros((missing, self.n_features), dtype=np.float32)
+        return np.concatenate((pad, state.context))
+
+
+class StreamStateStore:
+    """Thread-safe LRU map of session_id -> StreamState."""
+
+    def __init__(self, frontend: MelFrontend, max_sessions: int = 1000) -> None:
+        self.frontend = frontend
+        self.max_sessions = max_sessions
+        self._states: "OrderedDict[str, StreamState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: Optional[str]) -> StreamState:
+        """Return the session's state (a fresh one when session_id is None)."""
+        if not session_id:
+            return self.frontend.new_state()
+        with self._lock:
+            state = self._states.get(session_id)
+            if state is None:
+                state = self.frontend.new_state()
+                self._states[session_id] = state
+                while len(self._states) > self.max_sessions:
+                    self._states.popitem(last=False)
+            else:
+                self._states.move_to_end(session_id)
+            return state
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            self._states.pop(session_id, None)
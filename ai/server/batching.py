@@ -0,0 +1,96 @@
+"""
+Dynamic micro-batching for Cognicare AI inference.
+
+Concurrent requests are collected for a short window (up to ``max_batch_size``
+items or ``max_wait_ms`` milliseconds, whichever comes first) and handed to a
+single batch callable, so the ONNX models run once per window instead of once
+per request. Each caller gets back its own row of the batch result.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+BatchRunner = Callable[[List[Any]], Awaitable[List[Any]]]
+
+
+class MicroBatcher:
+    """Collect concurrent items into batches and run them together."""
+
+    def __init__(
+        self,
+        run_batch: BatchRunner,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        name: str = "batch",
+    ) -> None:
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        # Achieved batch sizes, reported through stats()
+        self._batches = 0
+        self._items = 0
+        self._size_histogram: Dict[int, int] = {}
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its row of the batch result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush(loop)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush, loop)
+
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[: self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size :]
+            loop.create_task(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        size = len(batch)
+        self._batches += 1
+        self._items += size
+        self._size_histogram[size] = self._size_histogram.get(size, 0) + 1
+
+        try:
+            results = await self.run_batch([item for item, _ in batch])
+            if len(results) != size:
+                raise RuntimeError(
+                    f"{self.name} batch returned {len(results)} results for {size} items"
+                )
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Report configuration and the batch sizes achieved so far."""
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": self._batches,
+            "items": self._items,
+            "average_batch_size": self._items / self._batches if self._batches else 0.0,
+            "batch_size_histogram": dict(sorted(self._size_histogram.items())),
+            "pending": len(self._pending),
+        }
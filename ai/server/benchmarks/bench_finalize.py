@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /session/finalize aggregation, per-frame loop vs NumPy.
+
+Compares, for sessions of 10k-100k frames:
+  * loop     - the original finalize_session pure-Python aggregation
+  * dicts    - SessionAccumulator.add_frame_dicts on the same dict payload
+  * columns  - SessionAccumulator.add_frame_columns on the columnar payload
+
+and the request cost (JSON parse + pydantic validation) of a dict payload
+vs a FrameColumns one.
+
+Usage (from ai/server):
+  python benchmarks/bench_finalize.py --frames 10000 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from main import EMOTION_LABELS, SessionFinalizeRequest  # noqa: E402
+from session_store import SessionAccumulator  # noqa: E402
+
+
+def legacy_aggregate(frames: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The original finalize_session loops."""
+    engagement_scores = [f.get("engagement", 0.5) for f in frames]
+    avg_engagement = sum(engagement_scores) / len(engagement_scores) if engagement_scores else 0.5
+    attention_scores = [f.get("attention", 0.5) for f in frames]
+    avg_attention = sum(attention_scores) / len(attention_scores) if attention_scores else 0.5
+    emotion_distribution: Dict[str, float] = {}
+    for frame in frames:
+        for emotion, value in frame.get("emotions", {}).items():
+            emotion_distribution[emotion] = emotion_distribution.get(emotion, 0) + value
+    total = sum(emotion_distribution.values())
+    if total > 0:
+        emotion_distribution = {k: v / total for k, v in emotion_distribution.items()}
+    return {"engagement": avg_engagement, "attention": avg_attention, "emotions": emotion_distribution}
+
+
+def make_frames(n: int) -> List[Dict[str, Any]]:
+    frames = []
+    for _ in range(n):
+        probs = np.random.dirichlet(np.ones(len(EMOTION_LABELS)))
+        frames.append({
+            "emotions": dict(zip(EMOTION_LABELS, probs.tolist())),
+            "attention": random.random(),
+            "engagement": random.random(),
+            "gaze_direction": {"x": random.random(), "y": random.random()},
+        })
+    return frames
+
+
+def to_columns(frames: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "engagement": [f["engagement"] for f in frames],
+        "attention": [f["attention"] for f in frames],
+        "emotion_labels": list(EMOTION_LABELS),
+        "emotions": [f["emotions"][label] for f in frames for label in EMOTION_LABELS],
+        "gaze_x": [f["gaze_direction"]["x"] for f in frames],
+        "gaze_y": [f["gaze_direction"]["y"] for f in frames],
+    }
+
+
+def timed(fn: Callable[[], Any], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(n: int) -> None:
+    frames = make_frames(n)
+    columns = to_columns(frames)
+    arrays = {
+        "engagement": np.asarray(columns["engagement"]),
+        "attention": np.asarray(columns["attention"]),
+        "emotions": np.asarray(columns["emotions"]).reshape(n, len(EMOTION_LABELS)),
+        "gaze_x": np.asarray(columns["gaze_x"]),
+        "gaze_y": np.asarray(columns["gaze_y"]),
+    }
+
+    def dicts() -> SessionAccumulator:
+        acc = SessionAccumulator()
+        acc.add_frame_dicts(frames)
+        return acc
+
+    def cols() -> SessionAccumulator:
+        acc = SessionAccumulator()
+        acc.add_frame_columns(
+            arrays["engagement"], arrays["attention"], EMOTION_LABELS,
+            arrays["emotions"], arrays["gaze_x"], arrays["gaze_y"],
+        )
+        return acc
+
+    # Sanity check: all paths agree
+    expected = legacy_aggregate(frames)
+    for acc in (dicts(), cols()):
+        assert abs(acc.average_engagement - expected["engagement"]) < 1e-9
+        for label, value in acc.emotion_distribution().items():
+            assert abs(value - expected["emotions"][label]) < 1e-9
+
+    print(f"\n{n} frames")
+    print(f"  aggregate  loop    {timed(lambda: legacy_aggregate(frames)):>9.2f} ms")
+    print(f"  aggregate  dicts   {timed(dicts):>9.2f} ms")
+    print(f"  aggregate  columns {timed(cols):>9.2f} ms")
+
+    for name, payload in (
+        ("dicts", {"session_id": "bench", "frames": frames}),
+        ("columns", {"session_id": "bench", "frame_columns": columns}),
+    ):
+        body = json.dumps(payload)
+        ms = timed(lambda: SessionFinalizeRequest.model_validate(json.loads(body)))
+        print(f"  request    {name:<7} {ms:>9.2f} ms  ({len(body) / 1e6:.1f} MB body)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark session finalize aggregation")
+    parser.add_argument("--frames", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+
+    random.seed(0)
+    np.random.seed(0)
+    for n in args.frames:
+        run(n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: frame preprocessing before/after the allocation-free path.
+
+Compares the original _preprocess_face pipeline (decode, cvtColor, resize,
+astype, /255, transpose, expand_dims, then stacking for the batch) with
+preprocessing.py (reduced-scale decode, resize into a buffer, fused
+normalisation into a reused NCHW batch buffer).
+
+Reports time per frame and the transient numpy allocation per frame,
+measured as the tracemalloc high-water mark while each batch is processed.
+
+Usage (from ai/server):
+  python benchmarks/bench_preprocess.py --width 1280 --height 720 --frames 200
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, List
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from preprocessing import batch_buffer, preprocess_frame, write_nchw  # noqa: E402
+
+
+def legacy_preprocess(frame_bytes: bytes, size: int = 64) -> np.ndarray:
+    """The original _preprocess_face implementation."""
+    nparr = np.frombuffer(frame_bytes, np.uint8)
+    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    img = cv2.resize(img, (size, size))
+    img = img.astype("float32") / 255.0
+    img = np.transpose(img, (2, 0, 1))
+    return np.expand_dims(img, axis=0)
+
+
+def legacy_batch(frames: List[bytes], size: int) -> np.ndarray:
+    return np.ascontiguousarray(np.concatenate([legacy_preprocess(f, size) for f in frames]))
+
+
+def fused_batch(frames: List[bytes], size: int) -> np.ndarray:
+    batch = batch_buffer(len(frames), size)
+    for slot, frame in zip(batch, frames):
+        write_nchw(preprocess_frame(frame, size), slot)
+    return batch
+
+
+def measure(name: str, fn: Callable, frames: List[bytes], size: int, batch_size: int) -> None:
+    batches = [frames[i : i + batch_size] for i in range(0, len(frames), batch_size)]
+
+    # Warm-up (also lets the batch buffer reach its steady-state size)
+    fn(batches[0], size)
+
+    start = time.perf_counter()
+    for batch in batches:
+        fn(batch, size)
+    per_frame_ms = (time.perf_counter() - start) / len(frames) * 1000
+
+    # Allocation high-water mark above the baseline while each batch runs
+    tracemalloc.start()
+    allocated = 0
+    for batch in batches:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn(batch, size)
+        _, peak = tracemalloc.get_traced_memory()
+        allocated += peak - baseline
+    tracemalloc.stop()
+
+    print(
+        f"{name:<8} {per_frame_ms:>8.3f} ms/frame   "
+        f"{allocated / len(frames) / 1024:>8.1f} KiB allocated/frame"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--size", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Smooth synthetic frames compress like webcam images, unlike pure noise
+    frames = []
+    for _ in range(args.frames):
+        small = rng.integers(0, 255, (args.height // 16, args.width // 16, 3), dtype=np.uint8)
+        img = cv2.resize(small, (args.width, args.height), interpolation=cv2.INTER_CUBIC)
+        frames.append(cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes())
+
+    print(
+        f"{args.frames} JPEG frames {args.width}x{args.height} -> "
+        f"[{args.batch_size}, 3, {args.size}, {args.size}]\n"
+    )
+    measure("before", legacy_batch, frames, args.size, args.batch_size)
+    measure("after", fused_batch, frames, args.size, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark: vision throughput and memory vs. number of worker processes.
+
+For each worker count, starts that many processes which each import the
+server, load its models and run batched vision inference for a fixed time,
+once with private weights and twice with SHARED_WEIGHTS=on (models must have
+been exported with shared_weights.py first): with ORT's weight pre-packing
+("shared+pack", the SHARED_WEIGHTS_PREPACK default) and without it
+("shared"). Every session runs one intra-op thread so workers don't
+oversubscribe the cores. Reports:
+
+  * frames/s   - total across workers
+  * RSS MiB    - summed resident memory (counts shared pages in every worker)
+  * PSS MiB    - summed proportional memory (shared pages split between
+                 the workers mapping them), the real machine-wide cost
+
+Usage (from ai/server):
+  python shared_weights.py models/emotion_emotionnet.onnx models/attention_gaze.onnx
+  python benchmarks/bench_workers.py --workers 1 2 4 --seconds 5
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def _memory_mib() -> Dict[str, float]:
+    values = {"Rss": 0.0, "Pss": 0.0}
+    with open("/proc/self/smaps_rollup", "r") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in values:
+                values[key] = int(rest.split()[0]) / 1024.0
+    return values
+
+
+# (label, SHARED_WEIGHTS, SHARED_WEIGHTS_PREPACK)
+CONFIGS = [("private", False, True), ("shared+pack", True, True), ("shared", True, False)]
+
+
+def _worker(shared: bool, prepack: bool, seconds: float, batch_size: int, start, results) -> None:
+    os.environ["SHARED_WEIGHTS"] = "on" if shared else "off"
+    os.environ["SHARED_WEIGHTS_PREPACK"] = "on" if prepack else "off"
+    for model in ("VISION", "EMOTION", "ATTENTION"):
+        os.environ.setdefault(f"{model}_ORT_INTRA_OP_NUM_THREADS", "1")
+    sys.path.insert(0, SERVER_DIR)
+    os.chdir(SERVER_DIR)
+
+    import numpy as np
+    import main
+
+    main.load_models()
+    spec = main._vision_spec()
+    batch = np.random.rand(batch_size, *spec.shape(spec.size)).astype(np.float32)
+    main._analyze_vision_batch(batch)  # warm-up
+
+    start.wait()
+    frames = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        main._analyze_vision_batch(batch)
+        frames += batch_size
+
+    memory = _memory_mib()
+    results.put((frames, memory["Rss"], memory["Pss"]))
+    # Stay alive until every worker has measured, so PSS sees the sharing
+    start.wait()
+
+
+def run(
+    workers: int, shared: bool, prepack: bool, seconds: float, batch_size: int
+) -> Tuple[float, float, float]:
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_worker, args=(shared, prepack, seconds, batch_size, start, results))
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    start.wait()  # all models loaded
+    measured: List[Tuple[int, float, float]] = [results.get() for _ in range(workers)]
+    start.wait()  # release the workers
+    for p in procs:
+        p.join()
+
+    frames = sum(m[0] for m in measured)
+    return frames / seconds, sum(m[1] for m in measured), sum(m[2] for m in measured)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--batch-size", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'weights':>11} {'frames/s':>10} {'RSS MiB':>9} {'PSS MiB':>9}")
+    for workers in args.workers:
+        for label, shared, prepack in CONFIGS:
+            fps, rss, pss = run(workers, shared, prepack, args.seconds, args.batch_size)
+            print(f"{workers:>7} {label:>11} {fps:>10.0f} {rss:>9.0f} {pss:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Resumable, checkpointed Keras training for the training scripts.
+
+``checkpoint_callbacks(directory)`` returns callbacks that
+
+  * save the model, optimizer state and epoch after every epoch
+    (``<directory>/backup``); an interrupted run started again with the same
+    directory resumes from the last finished epoch, and the backup is
+    removed once training completes, and
+  * keep the weights of the best epoch so far (``<directory>/best.weights.h5``,
+    with its score in ``best.json`` so a resumed run only replaces them with
+    better ones).
+
+After ``fit``, ``restore_best`` loads those weights so only the best epoch
+is exported. Delete the directory to start training over.
+"""
+
+import json
+import os
+from typing import Any, List, Optional, Tuple
+
+
+def _read_best(path: str) -> Optional[float]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return float(json.load(f)["value"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def checkpoint_callbacks(
+    directory: str, monitor: str = "val_accuracy", mode: str = "max"
+) -> Tuple[List[Any], str]:
+    """(callbacks for model.fit, path of the best weights)."""
+    from tensorflow import keras
+
+    backup_dir = os.path.join(directory, "backup")
+    best_path = os.path.join(directory, "best.weights.h5")
+    best_meta = os.path.join(directory, "best.json")
+    os.makedirs(directory, exist_ok=True)
+
+    best = None
+    if os.path.isdir(backup_dir):
+        best = _read_best(best_meta)
+        print(f"🔁 Resuming from the last epoch checkpoint in {backup_dir} (best {monitor}: {best})")
+    else:
+        # A fresh run must not compete with (or export) an earlier run's best
+        for path in (best_path, best_meta):
+            if os.path.exists(path):
+                os.remove(path)
+
+    class RecordBest(keras.callbacks.Callback):
+        """Remember the best score, matching ModelCheckpoint's decision."""
+
+        def __init__(self, value: Optional[float]) -> None:
+            super().__init__()
+            self.value = value
+
+        def on_epoch_end(self, epoch, logs=None):
+            current = (logs or {}).get(monitor)
+            if current is None:
+                return
+            if self.value is None or (
+                current > self.value if mode == "max" else current < self.value
+            ):
+                self.value = float(current)
+                with open(best_meta, "w", encoding="utf-8") as f:
+                    json.dump({"monitor": monitor, "value": self.value, "epoch": epoch + 1}, f)
+
+    callbacks = [
+        keras.callbacks.BackupAndRestore(backup_dir),
+        keras.callbacks.ModelCheckpoint(
+            best_path,
+            monitor=monitor,
+            mode=mode,
+            save_best_only=True,
+            save_weights_only=True,
+            initial_value_threshold=best,
+        ),
+        RecordBest(best),
+    ]
+    return callbacks, best_path
+
+
+def restore_best(model: Any, best_path: str) -> bool:
+    """Load the best epoch's weights into ``model`` if any were saved."""
+    if not os.path.exists(best_path):
+        return False
+    model.load_weights(best_path)
+    print(f"✅ Restored best weights from {best_path}")
+    return True
@@ -0,0 +1,162 @@
+"""
+Bounded worker pool for CPU-bound inference work.
+
+Model runs and OpenCV calls release the GIL but still block whichever thread
+calls them, so they must not run on uvicorn's event loop. InferenceExecutor
+hands them to a thread pool (or, optionally, a process pool) and caps the
+amount of outstanding work. When the cap is reached new work is rejected
+immediately with ExecutorSaturated so handlers can answer 503 instead of
+queueing up latency.
+
+Work can carry a ``key`` (the game session id). Streaming state such as the
+mel-frame carry-over, VAD hysteresis and face tracks lives in whichever
+interpreter runs a session's work, so in process mode each worker is its own
+single-process lane and all work with the same key goes to the same lane,
+in submission order. Work without a key goes to the least busy lane. In
+thread mode every thread shares the state and keys are ignored.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when the worker pool queue is full and work is shed."""
+
+
+class InferenceExecutor:
+    """Run blocking callables off the event loop with a bounded queue."""
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        initializer: Optional[Callable[[], None]] = None,
+    ) -> None:
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown executor mode: {mode!r}")
+
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = self.max_workers * 4 if max_queue is None else max_queue
+        self.initializer = initializer
+
+        self._pool: Optional[Executor] = None
+        # Process mode: one single-worker pool per lane (see module docstring)
+        self._lanes: List[Executor] = []
+        # Only touched from the event loop thread, so no lock is needed
+        self._lane_load: List[int] = []
+        self._outstanding = 0
+        self._completed = 0
+        self._rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of running plus queued jobs."""
+        return self.max_workers + self.max_queue
+
+    def start(self) -> None:
+        """Create the underlying pool (idempotent)."""
+        if self._pool is not None or self._lanes:
+            return
+
+        if self.mode == "process":
+            # Spawned workers load their own models through the initializer;
+            # forking a process that already holds ORT thread pools is unsafe.
+            context = multiprocessing.get_context("spawn")
+            self._lanes = [
+                ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=self.initializer)
+                for _ in range(self.max_workers)
+            ]
+            self._lane_load = [0] * self.max_workers
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="cognicare-ai",
+            )
+        print(
+            f"[AI] Inference executor started: {self.mode} pool, "
+            f"{self.max_workers} workers, queue {self.max_queue}"
+        )
+
+    def shutdown(self) -> None:
+        for pool in [self._pool] + self._lanes:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+        self._lanes = []
+        self._lane_load = []
+
+    def lane(self, key: Optional[str]) -> Optional[int]:
+        """Process-mode lane for ``key`` (least busy without one); None in thread mode."""
+        if self.mode != "process":
+            return None
+        self.start()
+        if key:
+            # Stable across runs and processes, unlike hash()
+            return zlib.crc32(key.encode("utf-8")) % len(self._lanes)
+        return min(range(len(self._lanes)), key=self._lane_load.__getitem__)
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        shed: bool = True,
+        key: Optional[str] = None,
+    ) -> Any:
+        """
+        Run ``fn(*args)`` in the pool and await its result.
+
+        With ``shed=True`` the job is rejected with ExecutorSaturated when the
+        pool already has ``capacity`` jobs outstanding. Follow-up stages of an
+        already-admitted request pass ``shed=False`` so admitted work is never
+        dropped halfway through. ``key`` pins the job to a lane in process
+        mode (see module docstring).
+        """
+        if shed and self._outstanding >= self.capacity:
+            self._rejected += 1
+            raise ExecutorSaturated(
+                f"Inference queue is full ({self._outstanding}/{self.capacity})"
+            )
+
+        self.start()
+        return await self._submit(self.lane(key), fn, args)
+
+    async def broadcast(self, fn: Callable[..., Any], *args: Any) -> List[Any]:
+        """Run ``fn(*args)`` once in every worker process (once locally in thread mode)."""
+        if self.mode != "process":
+            return [fn(*args)]
+        self.start()
+        return list(await asyncio.gather(
+            *(self._submit(lane, fn, args) for lane in range(len(self._lanes)))
+        ))
+
+    async def _submit(self, lane: Optional[int], fn: Callable[..., Any], args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        pool = self._pool if lane is None else self._lanes[lane]
+        self._outstanding += 1
+        if lane is not None:
+            self._lane_load[lane] += 1
+        try:
+            return await loop.run_in_executor(pool, fn, *args)
+        finally:
+            self._outstanding -= 1
+            self._completed += 1
+            if lane is not None and lane < len(self._lane_load):
+                self._lane_load[lane] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "outstanding": self._outstanding,
+            "lane_outstanding": list(self._lane_load),
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
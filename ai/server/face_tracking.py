@@ -0,0 +1,215 @@
+"""
+Face localisation and per-session tracking for the vision models.
+
+Feeding the whole webcam frame to a 64x64 model leaves the face a few pixels
+wide. FaceTracker finds the face on a downscaled grayscale copy of the frame
+with OpenCV's bundled Haar cascade (no network access needed) and returns the
+box to crop before preprocessing.
+
+Consecutive frames from one session are tracked instead of re-detected: the
+last face patch is matched (normalised cross-correlation) inside a small
+search window around the previous box. Full-frame detection only runs every
+``redetect_every`` frames, or sooner when the match score drops below
+``min_confidence``.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+Box = Tuple[int, int, int, int]  # x, y, w, h
+
+_local = threading.local()
+
+
+def _cascade() -> Optional["cv2.CascadeClassifier"]:
+    """
+    Per-thread Haar cascade (detectMultiScale is not thread-safe).
+
+    Returns None when the OpenCV build has no bundled cascade, in which case
+    callers fall back to the whole frame.
+    """
+    if not hasattr(_local, "cascade"):
+        cascade = None
+        try:
+            path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+            cascade = cv2.CascadeClassifier(path)
+            if cascade.empty():
+                raise RuntimeError(f"empty cascade at {path}")
+        except Exception as exc:
+            print(f"[AI] Face detector unavailable, using whole frames: {exc}")
+            cascade = None
+        _local.cascade = cascade
+    return _local.cascade
+
+
+@dataclass
+class _TrackState:
+    box: Optional[Box] = None  # in detection-scale pixels
+    template: Optional[np.ndarray] = None
+    detect_width: int = 0
+    frames_since_detect: int = 0
+
+
+class FaceTracker:
+    """Detect faces on a downscaled frame and track them per session."""
+
+    def __init__(
+        self,
+        detect_width: int = 240,
+        redetect_every: int = 10,
+        min_confidence: float = 0.6,
+        margin: float = 0.15,
+        max_sessions: int = 1000,
+    ) -> None:
+        self.detect_width = detect_width
+        self.redetect_every = max(1, redetect_every)
+        self.min_confidence = min_confidence
+        self.margin = margin
+        self.max_sessions = max_sessions
+
+        self._sessions: "OrderedDict[str, _TrackState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._detections = 0
+        self._tracked = 0
+        self._misses = 0
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def locate(self, img: np.ndarray, session_id: Optional[str] = None) -> Optional[Box]:
+        """
+        Return the face box in ``img`` pixel coordinates (with margin), or
+        None when no face is found. Without a session id every call runs a
+        full detection.
+        """
+        gray, scale = self._downscale_gray(img)
+        state = self._state(session_id)
+
+        box = None
+        if state is not None and self._can_track(state, gray):
+            box = self._track(gray, state)
+            if box is not None:
+                self._tracked += 1
+
+        if box is None:
+            box = self._detect(gray)
+            self._detections += 1
+            if box is None:
+                self._misses += 1
+            if state is not None:
+                state.frames_since_detect = 0
+
+        if state is not None:
+            state.box = box
+            state.detect_width = gray.shape[1]
+            state.template = _patch(gray, box).copy() if box is not None else None
+            state.frames_since_detect += 1
+
+        if box is None:
+            return None
+        return self._to_image_box(box, scale, img.shape)
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "detections": self._detections,
+            "tracked_frames": self._tracked,
+            "misses": self._misses,
+            "redetect_every": self.redetect_every,
+            "min_confidence": self.min_confidence,
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _state(self, session_id: Optional[str]) -> Optional[_TrackState]:
+        if not session_id:
+            return None
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = _TrackState()
+                self._sessions[session_id] = state
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            return state
+
+    def _downscale_gray(self, img: np.ndarray) -> Tuple[np.ndarray, float]:
+        height, width = img.shape[:2]
+        scale = min(1.0, self.detect_width / float(width))
+        small = img
+        if scale < 1.0:
+            small = cv2.resize(
+                img,
+                (int(round(width * scale)), int(round(height * scale))),
+                interpolation=cv2.INTER_AREA,
+            )
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), scale
+
+    def _can_track(self, state: _TrackState, gray: np.ndarray) -> bool:
+        return (
+            state.box is not None
+            and state.template is not None
+            and state.detect_width == gray.shape[1]
+            and state.frames_since_detect < self.redetect_every
+        )
+
+    def _detect(self, gray: np.ndarray) -> Optional[Box]:
+        cascade = _cascade()
+        if cascade is None:
+            return None
+        faces = cascade.detectMultiScale(
+            cv2.equalizeHist(gray),
+            scaleFactor=1.1,
+            minNeighbors=5,
+            minSize=(24, 24),
+        )
+        if len(faces) == 0:
+            return None
+        # The child is the largest face in front of the camera
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        return int(x), int(y), int(w), int(h)
+
+    def _track(self, gray: np.ndarray, state: _TrackState) -> Optional[Box]:
+        x, y, w, h = state.box
+        pad_x, pad_y = w // 2, h // 2
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1 = min(gray.shape[1], x + w + pad_x)
+        y1 = min(gray.shape[0], y + h + pad_y)
+        search = gray[y0:y1, x0:x1]
+        if search.shape[0] < h or search.shape[1] < w:
+            return None
+
+        scores = cv2.matchTemplate(search, state.template, cv2.TM_CCOEFF_NORMED)
+        _, confidence, _, (dx, dy) = cv2.minMaxLoc(scores)
+        if confidence < self.min_confidence:
+            return None
+        return x0 + dx, y0 + dy, w, h
+
+    def _to_image_box(self, box: Box, scale: float, shape: Tuple[int, ...]) -> Box:
+        x, y, w, h = (v / scale for v in box)
+        mx, my = w * self.margin, h * self.margin
+        x0 = max(0, int(x - mx))
+        y0 = max(0, int(y - my))
+        x1 = min(shape[1], int(x + w + mx))
+        y1 = min(shape[0], int(y + h + my))
+        return x0, y0, x1 - x0, y1 - y0
+
+
+def _patch(gray: np.ndarray, box: Box) -> np.ndarray:
+    x, y, w, h = box
+    return gray[y : y + h, x : x + w]
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Memory-bounded FER2013 loading for the training scripts.
+
+fer2013.csv holds 35,887 rows of ``emotion,pixels,Usage`` where ``pixels``
+is 2,304 space-separated grey levels. Parsing it row by row into float32 RGB
+arrays takes minutes and several GB; here the pixel column is parsed in a
+few vectorised passes (one np.fromstring per chunk of rows) straight into a
+single uint8 [N, 48, 48] array, about 80 MB for the whole dataset.
+
+The parsed arrays are cached next to the CSV as
+
+    fer2013.<csv sha256 prefix>.{images,labels,usage}.npy
+
+and later runs memory-map them instead of parsing again, so a training job
+starts in seconds and concurrent runs share one page-cached copy. A changed
+CSV gets a new key (and the old cache files are removed). To build the
+cache ahead of time:
+
+    python fer2013.py data/fer2013/fer2013.csv
+
+RGB expansion, resizing and [0, 1] normalisation happen per batch, when a
+batch is handed to the model:
+
+    data = load_fer2013("data/fer2013/fer2013.csv")
+    for x, y in iter_batches(data, indices, batch_size=32, size=64):
+        ...
+
+For Keras training, ``tf_dataset`` builds the same batches as a tf.data
+pipeline: rows are gathered and resized once and cached as uint8, then
+every epoch shuffles, batches, normalises and (optionally) augments with
+Keras preprocessing layers in parallel, prefetching ahead of the model.
+TensorFlow is only imported by those helpers.
+"""
+
+import argparse
+import glob
+import hashlib
+import itertools
+import os
+import resource
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+IMAGE_SIZE = 48
+USAGES = ("Training", "PublicTest", "PrivateTest")
+
+# cv2.resize handles at most this many channels at once
+_RESIZE_CHANNELS = 512
+_CACHE_FIELDS = ("images", "labels", "usage")
+
+
+@dataclass
+class Fer2013:
+    images: np.ndarray  # [N, 48, 48] uint8 grayscale
+    labels: np.ndarray  # [N] uint8 emotion index
+    usage: np.ndarray  # [N] uint8 index into USAGES
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+
+def peak_memory_mb() -> float:
+    """Peak resident memory of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def csv_digest(csv_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(csv_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def cache_paths(csv_path: str, digest: str) -> Dict[str, str]:
+    root = os.path.splitext(csv_path)[0]
+    return {field: f"{root}.{digest}.{field}.npy" for field in _CACHE_FIELDS}
+
+
+def load_fer2013(csv_path: str, chunk_rows: int = 4096, cache: bool = True) -> Fer2013:
+    """
+    FER2013 as uint8 arrays: memory-mapped from the binary cache when it
+    matches the CSV, else parsed (and the cache written for next time).
+    """
+    if not cache:
+        return parse_fer2013(csv_path, chunk_rows)
+
+    started = time.perf_counter()
+    paths = cache_paths(csv_path, csv_digest(csv_path))
+    if all(os.path.exists(path) for path in paths.values()):
+        data = Fer2013(**{field: np.load(path, mmap_mode="r") for field, path in paths.items()})
+        print(
+            f"📊 Memory-mapped {len(data)} images from {paths['images']} "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        return data
+
+    data = parse_fer2013(csv_path, chunk_rows)
+    write_cache(csv_path, paths, data)
+    return data
+
+
+def write_cache(csv_path: str, paths: Dict[str, str], data: Fer2013) -> None:
+    # Drop caches of earlier versions of the CSV
+    root = os.path.splitext(csv_path)[0]
+    wanted = set(paths.values())
+    for stale in glob.glob(f"{glob.escape(root)}.*.npy"):
+        if stale not in wanted and stale.endswith(tuple(f".{f}.npy" for f in _CACHE_FIELDS)):
+            os.remove(stale)
+
+    for field, path in paths.items():
+        # Written under a temporary name so a concurrent run never maps a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, getattr(data, field))
+        os.replace(tmp_path, path)
+    print(f"💾 Cached FER2013 arrays: {paths['images']}")
+
+
+def parse_fer2013(csv_path: str, chunk_rows: int = 4096) -> Fer2013:
+    """Parse fer2013.csv into uint8 arrays, reporting parse time and peak memory."""
+    started = time.perf_counter()
+    images, labels, usage = [], [], []
+    with open(csv_path, "r") as f:
+        columns = next(f).strip().split(",")
+        emotion_col = columns.index("emotion")
+        pixels_col = columns.index("pixels")
+        usage_col = columns.index("Usage") if "Usage" in columns else None
+
+        while True:
+            rows = [line.rstrip("\n").split(",") for line in itertools.islice(f, chunk_rows)]
+            rows = [row for row in rows if len(row) > pixels_col]
+            if not rows:
+                break
+            pixels = np.fromstring(
+                " ".join(row[pixels_col] for row in rows), dtype=np.uint8, sep=" "
+            )
+            images.append(pixels.reshape(len(rows), IMAGE_SIZE, IMAGE_SIZE))
+            labels.append(np.array([row[emotion_col] for row in rows], dtype=np.uint8))
+            if usage_col is not None:
+                usage.append(np.array(
+                    [USAGES.index(row[usage_col].strip()) for row in rows], dtype=np.uint8
+                ))
+            else:
+                usage.append(np.zeros(len(rows), dtype=np.uint8))
+
+    data = Fer2013(
+        images=np.concatenate(images),
+        labels=np.concatenate(labels),
+        usage=np.concatenate(usage),
+    )
+    print(
+        f"📊 Parsed {len(data)} images in {time.perf_counter() - started:.1f}s "
+        f"({data.images.nbytes / 1e6:.0f} MB uint8, peak RSS {peak_memory_mb():.0f} MB)"
+    )
+    return data
+
+
+def to_model_input(
+    images: np.ndarray, size: int, channels: int = 3, out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    uint8 [B, 48, 48] -> float32 [B, size, size, channels] in [0, 1].
+
+    The batch is resized in one cv2 call by treating it as a B-channel image.
+    """
+    if out is None:
+        out = np.empty((images.shape[0], size, size, channels), dtype=np.float32)
+    # Grey -> RGB is the same plane in every channel
+    np.multiply(resize_batch(images, size)[..., None], 1.0 / 255.0, out=out, casting="unsafe")
+    return out
+
+
+def resize_batch(images: np.ndarray, size: int) -> np.ndarray:
+    """uint8 [B, H, W] -> uint8 [B, size, size]."""
+    batch = images.shape[0]
+    if images.shape[1:] == (size, size):
+        return images
+    resized = np.empty((batch, size, size), dtype=np.uint8)
+    for start in range(0, batch, _RESIZE_CHANNELS):
+        chunk = images[start : start + _RESIZE_CHANNELS]
+        planes = cv2.resize(np.ascontiguousarray(chunk.transpose(1, 2, 0)), (size, size))
+        resized[start : start + len(chunk)] = planes.reshape(size, size, -1).transpose(2, 0, 1)
+    return resized
+
+
+def split_indices(
+    data: Fer2013, train_fraction: float = 0.8
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (train, validation, test) row indices from the Usage column: Training,
+    PublicTest and PrivateTest. A CSV without a Usage column (everything is
+    "Training") falls back to the first ``train_fraction`` rows for training
+    and the rest for validation, with no test rows.
+    """
+    train, validation, test = (np.flatnonzero(data.usage == code) for code in range(len(USAGES)))
+    if len(validation) == 0 and len(test) == 0:
+        split = int(len(data) * train_fraction)
+        indices = np.arange(len(data))
+        return indices[:split], indices[split:], indices[:0]
+    return train, validation, test
+
+
+def iter_batches(
+    data: Fer2013,
+    indices: np.ndarray,
+    batch_size: int,
+    size: int,
+    shuffle: bool = False,
+    repeat: bool = False,
+    seed: Optional[int] = None,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Yield (float32 [B, size, size, 3], labels) batches over ``indices``."""
+    rng = np.random.default_rng(seed)
+    while True:
+        order = rng.permutation(indices) if shuffle else indices
+        for start in range(0, len(order), batch_size):
+            rows = np.sort(order[start : start + batch_size])
+            yield to_model_input(data.images[rows], size), data.labels[rows].astype(np.int64)
+        if not repeat:
+            return
+
+
+# ---------------------------------------------------------------------------
+# tf.data pipeline
+# ---------------------------------------------------------------------------
+
+def augmentation_layers(rotation_degrees: float = 15, shift: float = 0.1, zoom: float = 0.1):
+    """Vectorised equivalent of the old ImageDataGenerator settings."""
+    from tensorflow import keras
+    from tensorflow.keras import layers
+
+    return keras.Sequential([
+        layers.RandomFlip("horizontal"),
+        layers.RandomRotation(rotation_degrees / 360.0),
+        layers.RandomTranslation(shift, shift),
+        layers.RandomZoom(zoom),
+    ], name="augmentation")
+
+
+def tf_dataset(
+    data: Fer2013,
+    indices: np.ndarray,
+    batch_size: int,
+    size: int,
+    training: bool = False,
+    augment: bool = False,
+    seed: Optional[int] = None,
+    channels: int = 3,
+):
+    """
+    tf.data.Dataset of (float32 [B, size, size, channels], int64 labels)
+    batches; ``channels`` is 3 (grey expanded to RGB) or 1.
+
+    Source rows are gathered from ``data`` (in memory or memory-mapped) in
+    large vectorised chunks, resized, and cached as uint8 for later epochs.
+    With ``training`` the cached rows are reshuffled every epoch.
+    """
+    import tensorflow as tf
+
+    autotune = tf.data.AUTOTUNE
+    indices = np.sort(np.asarray(indices))
+
+    def gather(rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return resize_batch(data.images[rows], size), data.labels[rows].astype(np.int64)
+
+    def load(rows):
+        images, labels = tf.numpy_function(gather, [rows], (tf.uint8, tf.int64))
+        images.set_shape([None, size, size])
+        labels.set_shape([None])
+        return images, labels
+
+    def normalize(images, labels):
+        images = tf.cast(images, tf.float32)[..., tf.newaxis] * (1.0 / 255.0)
+        return (tf.repeat(images, channels, axis=-1) if channels > 1 else images), labels
+
+    ds = (
+        tf.data.Dataset.from_tensor_slices(indices)
+        .batch(1024)
+        .map(load, num_parallel_calls=autotune)
+        .unbatch()
+        .cache()
+    )
+    if training:
+        ds = ds.shuffle(len(indices), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size).map(normalize, num_parallel_calls=autotune)
+    if augment:
+        augmenter = augmentation_layers()
+        ds = ds.map(
+            lambda images, labels: (augmenter(images, training=True), labels),
+            num_parallel_calls=autotune,
+        )
+    return ds.prefetch(autotune)
+
+
+def steps_per_second_callback(batch_size: int):
+    """Keras callback printing training steps/s and images/s per epoch."""
+    from tensorflow import keras
+
+    class StepsPerSecond(keras.callbacks.Callback):
+        def on_epoch_begin(self, epoch, logs=None):
+            self._steps = 0
+            self._started = self._last = time.perf_counter()
+
+        def on_train_batch_end(self, batch, logs=None):
+            self._steps += 1
+            self._last = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            # Training steps only; validation runs after the last of them
+            elapsed = self._last - self._started
+            rate = self._steps / elapsed if elapsed > 0 else 0.0
+            print(f"   ⏱️  Epoch {epoch + 1}: {rate:.1f} steps/s, {rate * batch_size:.0f} images/s")
+
+    return StepsPerSecond()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the binary FER2013 cache")
+    parser.add_argument("csv", nargs="?", default="data/fer2013/fer2013.csv")
+    args = parser.parse_args()
+    load_fer2013(args.csv)
+
+
+if __name__ == "__main__":
+    main()
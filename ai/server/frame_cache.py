@@ -0,0 +1,104 @@
+"""
+Per-session reuse of analyses for (near-)duplicate webcam frames.
+
+While a child sits still, consecutive frames are nearly identical and
+re-running face tracking and both vision models on them buys nothing.
+Each analysed frame is fingerprinted with a 64-bit difference hash (dHash)
+of a 9x8 grayscale thumbnail; when a new frame's hash is within
+``max_distance`` bits of the session's last analysed frame, that frame's
+analysis is returned again.
+
+Entries are reused for at most ``ttl_seconds`` after the analysis they
+hold, so a still scene is still re-analysed periodically. The cache holds
+at most ``max_sessions`` entries (least recently used evicted first).
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+_BIT_WEIGHTS = (1 << np.arange(64, dtype=np.uint64)).astype(np.uint64)
+
+
+def dhash(img: np.ndarray) -> int:
+    """64-bit difference hash of a BGR or grayscale image."""
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    thumb = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (thumb[:, 1:] > thumb[:, :-1]).reshape(-1)
+    return int(np.dot(bits.astype(np.uint64), _BIT_WEIGHTS))
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class FrameCache:
+    """LRU + TTL map of session_id -> (frame hash, analysis, time)."""
+
+    def __init__(
+        self,
+        max_distance: int = 4,
+        ttl_seconds: float = 10.0,
+        max_sessions: int = 10000,
+    ) -> None:
+        self.max_distance = max_distance
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._entries: "OrderedDict[str, Tuple[int, Dict[str, Any], float]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def last_hash(self, session_id: Optional[str]) -> Optional[int]:
+        """Hash of the session's cached frame, if it is still fresh."""
+        if not session_id:
+            return None
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[2] > self.ttl_seconds:
+            del self._entries[session_id]
+            return None
+        return entry[0]
+
+    def is_duplicate(self, frame_hash: int, cached_hash: Optional[int]) -> bool:
+        return cached_hash is not None and hamming(frame_hash, cached_hash) <= self.max_distance
+
+    def hit(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached analysis for a duplicate frame, if it is still fresh."""
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[2] > self.ttl_seconds:
+            # Expired while the frame was being hashed
+            del self._entries[session_id]
+            return None
+        self._entries.move_to_end(session_id)
+        self._hits += 1
+        return entry[1]
+
+    def store(self, session_id: Optional[str], frame_hash: Optional[int], analysis: Dict[str, Any]) -> None:
+        """Record a freshly analysed frame (counted as a miss)."""
+        self._misses += 1
+        if not session_id or frame_hash is None:
+            return
+        self._entries[session_id] = (frame_hash, analysis, time.monotonic())
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.max_sessions:
+            self._entries.popitem(last=False)
+
+    def forget(self, session_id: str) -> None:
+        self._entries.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "sessions": len(self._entries),
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": self._hits / lookups if lookups else 0.0,
+            "max_distance": self.max_distance,
+            "ttl_seconds": self.ttl_seconds,
+        }
@@ -0,0 +1,159 @@
+"""
+Incremental gaze-pattern analytics for a game session.
+
+GazeAccumulator folds each gaze sample (normalised screen coordinates, with
+[0, 1] x [0, 1] being on screen) into fixed-size state, so both updating
+and reporting cost the same however long the session runs:
+
+  * mean and dispersion (running sums and sums of squares)
+  * fixation/saccade split: a velocity-threshold (I-VT) classifier on the
+    gaze speed between consecutive samples (distance over the time between
+    them), so it does not depend on the frame rate or on dropped frames;
+    fixations and saccades are counted as events (runs of samples), not as
+    samples
+  * a coarse on-screen heatmap (GAZE_HEATMAP_GRID x GAZE_HEATMAP_GRID counts)
+  * off-task time: samples whose gaze falls off screen, weighted by the
+    time between frames
+"""
+
+import math
+import os
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+GAZE_HEATMAP_GRID = int(os.getenv("GAZE_HEATMAP_GRID", "4"))
+# Gaze speed (screen widths per second) between consecutive samples that
+# counts as a saccade
+GAZE_SACCADE_VELOCITY = float(os.getenv("GAZE_SACCADE_VELOCITY", "0.5"))
+# How far outside [0, 1] gaze may drift before it counts as off screen
+GAZE_SCREEN_MARGIN = float(os.getenv("GAZE_SCREEN_MARGIN", "0.05"))
+# Assumed seconds between frames when no timing is known (MemoryGame's cadence)
+GAZE_DEFAULT_FRAME_INTERVAL = float(os.getenv("GAZE_DEFAULT_FRAME_INTERVAL", "2.0"))
+# Longer gaps between frames (e.g. a paused game) are not counted as time
+GAZE_MAX_FRAME_INTERVAL = 10.0
+
+
+class GazeAccumulator:
+    """Fixed-size running gaze statistics for one session."""
+
+    __slots__ = (
+        "grid",
+        "count",
+        "sum_x",
+        "sum_y",
+        "sum_xx",
+        "sum_yy",
+        "fixation_samples",
+        "saccade_count",
+        "fixation_count",
+        "heatmap",
+        "off_screen_samples",
+        "off_task_seconds",
+        "total_seconds",
+        "_last_x",
+        "_last_y",
+        "_in_fixation",
+    )
+
+    def __init__(self, grid: int = GAZE_HEATMAP_GRID) -> None:
+        self.grid = grid
+        self.count = 0
+        self.sum_x = self.sum_y = 0.0
+        self.sum_xx = self.sum_yy = 0.0
+        self.fixation_samples = 0
+        self.saccade_count = 0
+        self.fixation_count = 0
+        self.heatmap = np.zeros((grid, grid), dtype=np.int64)
+        self.off_screen_samples = 0
+        self.off_task_seconds = 0.0
+        self.total_seconds = 0.0
+        self._last_x: Optional[float] = None
+        self._last_y: Optional[float] = None
+        self._in_fixation = False
+
+    def add(self, x: float, y: float, dt: Optional[float] = None) -> None:
+        """
+        Fold one sample; ``dt`` is the time since the previous frame (0 for
+        a session's first frame, None when unknown).
+        """
+        self.add_arrays(np.array([x], dtype=np.float64), np.array([y], dtype=np.float64), dt)
+
+    def add_arrays(self, xs: np.ndarray, ys: np.ndarray, dt: Optional[float] = None) -> None:
+        """
+        Fold consecutive samples in order with NumPy reductions.
+
+        ``dt`` is the (uniform) time per sample; unknown timing falls back to
+        GAZE_DEFAULT_FRAME_INTERVAL. It weights both the off-task time and
+        the gaze speed the I-VT split compares with GAZE_SACCADE_VELOCITY.
+        """
+        n = int(xs.shape[0])
+        if n == 0:
+            return
+        dt = GAZE_DEFAULT_FRAME_INTERVAL if dt is None else min(dt, GAZE_MAX_FRAME_INTERVAL)
+
+        self.count += n
+        self.sum_x += float(xs.sum())
+        self.sum_y += float(ys.sum())
+        self.sum_xx += float(np.dot(xs, xs))
+        self.sum_yy += float(np.dot(ys, ys))
+
+        # I-VT: a sample is part of a fixation when the gaze moved slower than
+        # the threshold since the previous sample (the first sample ever,
+        # with no movement and dt 0, starts one)
+        if self._last_x is None:
+            prev_x = np.concatenate(([xs[0]], xs[:-1]))
+            prev_y = np.concatenate(([ys[0]], ys[:-1]))
+        else:
+            prev_x = np.concatenate(([self._last_x], xs[:-1]))
+            prev_y = np.concatenate(([self._last_y], ys[:-1]))
+        moved = np.hypot(xs - prev_x, ys - prev_y)
+        fixating = moved <= GAZE_SACCADE_VELOCITY * dt
+
+        self.fixation_samples += int(fixating.sum())
+        previous = np.concatenate(([self._in_fixation], fixating[:-1]))
+        # A saccade starts where a fixation ends
+        self.saccade_count += int(np.count_nonzero(~fixating & previous))
+        self.fixation_count += int(np.count_nonzero(fixating & ~previous))
+        self._in_fixation = bool(fixating[-1])
+        self._last_x, self._last_y = float(xs[-1]), float(ys[-1])
+
+        low, high = -GAZE_SCREEN_MARGIN, 1.0 + GAZE_SCREEN_MARGIN
+        on_screen = (xs >= low) & (xs <= high) & (ys >= low) & (ys <= high)
+        off_screen = n - int(on_screen.sum())
+        self.off_screen_samples += off_screen
+        self.off_task_seconds += off_screen * dt
+        self.total_seconds += n * dt
+
+        cols = np.clip((xs[on_screen] * self.grid).astype(np.int64), 0, self.grid - 1)
+        rows = np.clip((ys[on_screen] * self.grid).astype(np.int64), 0, self.grid - 1)
+        self.heatmap += np.bincount(
+            rows * self.grid + cols, minlength=self.grid * self.grid
+        ).reshape(self.grid, self.grid)
+
+    def patterns(self) -> Dict[str, Any]:
+        """Summary served as ``gaze_patterns`` by /session/finalize."""
+        if not self.count:
+            return {"average_x": 0.5, "average_y": 0.5, "samples": 0}
+
+        mean_x = self.sum_x / self.count
+        mean_y = self.sum_y / self.count
+        var_x = max(0.0, self.sum_xx / self.count - mean_x * mean_x)
+        var_y = max(0.0, self.sum_yy / self.count - mean_y * mean_y)
+        on_screen = self.count - self.off_screen_samples
+
+        return {
+            "average_x": mean_x,
+            "average_y": mean_y,
+            "std_x": math.sqrt(var_x),
+            "std_y": math.sqrt(var_y),
+            "dispersion": math.sqrt(var_x + var_y),
+            "samples": self.count,
+            "fixation_ratio": self.fixation_samples / self.count,
+            "fixation_count": self.fixation_count,
+            "saccade_count": self.saccade_count,
+            "heatmap": (self.heatmap / on_screen).tolist() if on_screen else self.heatmap.tolist(),
+            "off_task_ratio": self.off_screen_samples / self.count,
+            "off_task_seconds": self.off_task_seconds,
+            "tracked_seconds": self.total_seconds,
+        }
@@ -0,0 +1,93 @@
+"""
+Loudness measures for int16 audio chunks.
+
+Squaring an int16 array in NumPy stays in int16 and silently wraps, and
+``np.square`` also materialises a full copy of the chunk. These helpers
+accumulate sums of squares in float64 through einsum (which casts in small
+internal buffers, not a whole-array temporary) and find the peak from the
+min/max, so a chunk is summarised without any copy of its samples.
+"""
+
+import math
+from typing import Dict
+
+import numpy as np
+
+FULL_SCALE = 32768.0
+SILENCE_DBFS = -200.0
+
+
+def _dbfs(rms: float) -> float:
+    return 20.0 * math.log10(rms) if rms > 0 else SILENCE_DBFS
+
+
+def chunk_loudness(samples: np.ndarray) -> Dict[str, float]:
+    """
+    RMS and peak (as fractions of full scale), their dBFS values and the
+    mean-square ``energy`` reported by /audio/chunk.
+    """
+    if samples.size == 0:
+        return {"rms": 0.0, "peak": 0.0, "dbfs": SILENCE_DBFS, "peak_dbfs": SILENCE_DBFS, "energy": 0.0}
+
+    mean_square = float(np.einsum("i,i->", samples, samples, dtype=np.float64)) / samples.size
+    rms = math.sqrt(mean_square) / FULL_SCALE
+    peak = max(int(samples.max()), -int(samples.min())) / FULL_SCALE
+    return {
+        "rms": rms,
+        "peak": peak,
+        "dbfs": _dbfs(rms),
+        "peak_dbfs": _dbfs(peak),
+        # Historical scale of the energy field: mean square / 2**31
+        "energy": mean_square / 2**31,
+    }
+
+
+def frame_envelope(samples: np.ndarray, frame_length: int) -> np.ndarray:
+    """
+    Per-frame RMS level in dBFS over consecutive ``frame_length`` frames
+    (a trailing partial frame is dropped; a chunk shorter than one frame is
+    measured as a single frame).
+    """
+    n_frames = max(1, samples.shape[0] // frame_length)
+    usable = min(samples.shape[0], n_frames * frame_length)
+    frames = samples[:usable].reshape(n_frames, -1)
+    mean_square = np.einsum("ij,ij->i", frames, frames, dtype=np.float64) / frames.shape[1]
+    rms = np.sqrt(mean_square) / FULL_SCALE
+    return 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+
+class LoudnessTrend:
+    """
+    Running session loudness: mean and max level, and the least-squares
+    slope of chunk level over session time (dB per minute).
+    """
+
+    __slots__ = ("count", "sum_db", "max_peak_db", "sum_t", "sum_tt", "sum_tdb")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.sum_db = 0.0
+        self.max_peak_db = SILENCE_DBFS
+        self.sum_t = self.sum_tt = self.sum_tdb = 0.0
+
+    def add(self, dbfs: float, peak_dbfs: float, minutes: float) -> None:
+        self.count += 1
+        self.sum_db += dbfs
+        self.max_peak_db = max(self.max_peak_db, peak_dbfs)
+        self.sum_t += minutes
+        self.sum_tt += minutes * minutes
+        self.sum_tdb += minutes * dbfs
+
+    def summary(self) -> Dict[str, float]:
+        if not self.count:
+            return {}
+        mean_t = self.sum_t / self.count
+        var_t = self.sum_tt / self.count - mean_t * mean_t
+        mean_db = self.sum_db / self.count
+        slope = (self.sum_tdb / self.count - mean_t * mean_db) / var_t if var_t > 1e-12 else 0.0
+        return {
+            "average_dbfs": mean_db,
+            "max_peak_dbfs": self.max_peak_db,
+            "trend_db_per_minute": slope,
+            "chunks": self.count,
+        }
@@ -9,16 +9,43 @@ You are expected to:
   3. Place the .onnx files in the configured paths or set env vars.
 """
 
+import asyncio
+import hmac
 import os
 import random
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from dataclasses import replace
+from typing import Callable, List, Dict, Any, Optional, Tuple
+
+# Start of the (heavy) third-party and module imports, for /ready's breakdown
+_IMPORT_STARTED = time.perf_counter()
 
-import cv2
 import numpy as np
 import onnxruntime as ort
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, Form, Header, UploadFile, HTTPException, WebSocket
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
+
+from audio_decoding import StreamDecoderStore, decode_audio
+from audio_features import MelFrontend, StreamStateStore
+from batching import MicroBatcher
+from executor import ExecutorSaturated, InferenceExecutor
+from face_tracking import FaceTracker
+from frame_cache import FrameCache, dhash
+from loudness import chunk_loudness
+from metrics import render_gauges, stage_latency, stage_timer
+from ort_profiles import build_session_options, get_profile
+from preprocessing import batch_buffer, decode_frame, resize_frame, standardize, write_input
+from model_registry import InputSpec, LoadedModel, ModelRegistry, SessionMetadata, latest_version
+from quantize_models import quantized_model_path
+from session_store import SessionAccumulator, SessionStore
+from shared_weights import attach_shared_weights
+from streaming import StreamSession
+from vad import VoiceActivityDetector
+
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
 
 app = FastAPI(title="Cognicare AI Server")
 
@@ -30,8 +57,49 @@ app = FastAPI(title="Cognicare AI Server")
 EMOTION_MODEL_PATH = os.getenv("EMOTION_MODEL_PATH", "models/emotion_emotionnet.onnx")
 ATTENTION_MODEL_PATH = os.getenv("ATTENTION_MODEL_PATH", "models/attention_gaze.onnx")
 SPEECH_MODEL_PATH = os.getenv("SPEECH_MODEL_PATH", "models/speech_ravdess.onnx")
+# Combined model exported by setup_and_train.py: one shared backbone with an
+# "emotion" and an "attention" output. When it loads, it replaces the two
+# separate vision models and each frame batch needs a single inference.
+VISION_MODEL_PATH = os.getenv("VISION_MODEL_PATH", "models/vision_multitask.onnx")
+
+# Prefer INT8 variants written by quantize_models.py when they exist:
+# "off" (default), "static", "dynamic" or "auto" (static, then dynamic).
+PREFER_QUANTIZED_MODELS = os.getenv("PREFER_QUANTIZED_MODELS", "off").lower()
+
+# When models are loaded: "eager" (default) loads all of them in the startup
+# hook before serving; "background" starts serving at once (/health answers
+# immediately) and loads them on a background thread; "lazy" loads each model
+# on its first use. Requests that need a model still loading wait for it.
+MODEL_LOADING = os.getenv("MODEL_LOADING", "eager").lower()
 
-# Label mappings – MUST match your training code
+# Run each model on dummy inputs right after loading so allocator and kernel
+# initialisation isn't paid by the first request. Vision models are warmed at
+# each of MODEL_WARMUP_BATCH_SIZES (default: 1 and VISION_BATCH_MAX_SIZE).
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "off").lower() in ("1", "on", "true", "yes")
+
+# Multi-worker serving: with SHARED_WEIGHTS on, models exported by
+# shared_weights.py have their weights memory-mapped, so every uvicorn or
+# process-pool worker shares one copy. SERVER_WORKERS sets the number of
+# uvicorn workers when running ``python main.py``.
+SHARED_WEIGHTS = os.getenv("SHARED_WEIGHTS", "off").lower() in ("1", "on", "true", "yes")
+# Keep ORT's weight pre-packing for shared weights. Each process then holds its
+# own packed copy, which costs more memory than private weights; see the
+# numbers from benchmarks/bench_workers.py in shared_weights.py
+SHARED_WEIGHTS_PREPACK = os.getenv("SHARED_WEIGHTS_PREPACK", "off").lower() in ("1", "on", "true", "yes")
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+
+# Hot swapping (see model_registry): poll models/ every MODEL_WATCH_INTERVAL
+# seconds (0 = off; the admin endpoints still reload on demand) and swap in changed or
+# newer versioned files. With MODEL_RELOAD_AS_SHADOW, reloaded models run as
+# a shadow on MODEL_SHADOW_SAMPLE_RATE of requests until promoted.
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
+MODEL_RELOAD_AS_SHADOW = os.getenv("MODEL_RELOAD_AS_SHADOW", "off").lower() in ("1", "on", "true", "yes")
+MODEL_SHADOW_SAMPLE_RATE = float(os.getenv("MODEL_SHADOW_SAMPLE_RATE", "0.1"))
+# Required as the X-Admin-Token header on /admin endpoints; while unset the
+# admin endpoints answer 403 (CORS allows any origin)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Default label mappings for models without their own – MUST match your training code
 EMOTION_LABELS = os.getenv(
     "EMOTION_LABELS",
     "angry,disgust,fear,happy,sad,surprise,neutral,focused",
@@ -42,6 +110,87 @@ SPEECH_EMOTION_LABELS = os.getenv(
     "neutral,calm,happy,sad,angry,fear,disgust,surprised",
 ).split(",")
 
+# Speech model frontend: log-mel (or MFCC) frames of SPEECH_N_FFT samples
+# every SPEECH_HOP_LENGTH samples; the model sees the last
+# SPEECH_CONTEXT_FRAMES frames of the session's audio. MUST match training.
+SPEECH_SAMPLE_RATE = int(os.getenv("SPEECH_SAMPLE_RATE", "16000"))
+SPEECH_N_FFT = int(os.getenv("SPEECH_N_FFT", "400"))
+SPEECH_HOP_LENGTH = int(os.getenv("SPEECH_HOP_LENGTH", "160"))
+SPEECH_N_MELS = int(os.getenv("SPEECH_N_MELS", "64"))
+SPEECH_N_MFCC = int(os.getenv("SPEECH_N_MFCC", "0"))  # 0 = log-mel features
+SPEECH_DELTAS = os.getenv("SPEECH_DELTAS", "off").lower() in ("1", "on", "true", "yes")
+SPEECH_CONTEXT_FRAMES = int(os.getenv("SPEECH_CONTEXT_FRAMES", "100"))
+
+# Voice-activity gate in front of the speech model: chunks with no frame above
+# VAD_START_DBFS (or above VAD_STOP_DBFS while already in speech) and with a
+# speech-like zero-crossing rate are answered as "silence" without inference.
+# Frames at or above VAD_LOUD_DBFS are never rejected for their ZCR.
+VAD_ENABLED = os.getenv("VAD_ENABLED", "on").lower() not in ("0", "off", "false", "no")
+VAD_START_DBFS = float(os.getenv("VAD_START_DBFS", "-40"))
+VAD_STOP_DBFS = float(os.getenv("VAD_STOP_DBFS", "-48"))
+VAD_ZCR_MAX = float(os.getenv("VAD_ZCR_MAX", "0.35"))
+VAD_HANGOVER_FRAMES = int(os.getenv("VAD_HANGOVER_FRAMES", "10"))
+VAD_LOUD_DBFS = float(os.getenv("VAD_LOUD_DBFS", "-25"))
+
+# Micro-batching for /vision/frame: concurrent frames are stacked into one
+# [N, 3, size, size] tensor and each model runs once per batch window.
+# Frames are preprocessed to the serving model's own input (size, layout,
+# colour, normalisation) from its sidecar or graph; VISION_INPUT_SIZE is only
+# used for models whose input size is not fixed.
+VISION_INPUT_SIZE = int(os.getenv("VISION_INPUT_SIZE", "64"))
+VISION_BATCH_MAX_SIZE = int(os.getenv("VISION_BATCH_MAX_SIZE", "16"))
+VISION_BATCH_MAX_WAIT_MS = float(os.getenv("VISION_BATCH_MAX_WAIT_MS", "5"))
+MODEL_WARMUP_BATCH_SIZES = sorted({
+    int(size)
+    for size in os.getenv("MODEL_WARMUP_BATCH_SIZES", f"1,{VISION_BATCH_MAX_SIZE}").split(",")
+    if size.strip()
+})
+
+# Audio chunks buffered per /stream connection before the oldest is dropped
+# (frames always keep only the newest unprocessed one)
+STREAM_AUDIO_QUEUE_SIZE = int(os.getenv("STREAM_AUDIO_QUEUE_SIZE", "8"))
+# Compressed (Ogg/WebM) audio streams decoded at once per worker. Each holds a
+# decoder thread or ffmpeg process; idle ones close after SESSION_TTL_SECONDS
+# or when their /stream connection ends, the least recently used beyond this
+AUDIO_DECODER_MAX_SESSIONS = int(os.getenv("AUDIO_DECODER_MAX_SESSIONS", "128"))
+
+# Server-side session aggregation: idle sessions are evicted after
+# SESSION_TTL_SECONDS and at most SESSION_MAX_SESSIONS are kept in memory
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+
+# Face localisation before emotion/attention inference. Detection runs on a
+# FACE_DETECT_WIDTH-wide grayscale copy; frames from the same session are
+# tracked and only re-detected every FACE_REDETECT_EVERY frames or when the
+# tracking score drops below FACE_TRACK_MIN_CONFIDENCE.
+FACE_DETECTION = os.getenv("FACE_DETECTION", "on").lower() not in ("0", "off", "false", "no")
+FACE_DETECT_WIDTH = int(os.getenv("FACE_DETECT_WIDTH", "240"))
+FACE_REDETECT_EVERY = int(os.getenv("FACE_REDETECT_EVERY", "10"))
+FACE_TRACK_MIN_CONFIDENCE = float(os.getenv("FACE_TRACK_MIN_CONFIDENCE", "0.6"))
+# Shorter side to decode frames at when cropping faces (the face is only a
+# fraction of the frame, so it needs more pixels than the whole-frame path)
+FACE_DECODE_MIN_SIDE = int(os.getenv("FACE_DECODE_MIN_SIDE", "360"))
+
+# Reuse the last analysis for a session's frame when its 64-bit dHash is within
+# FRAME_CACHE_MAX_DISTANCE bits of the last analysed frame, for up to
+# FRAME_CACHE_TTL_SECONDS after that analysis
+FRAME_CACHE = os.getenv("FRAME_CACHE", "on").lower() not in ("0", "off", "false", "no")
+FRAME_CACHE_MAX_DISTANCE = int(os.getenv("FRAME_CACHE_MAX_DISTANCE", "4"))
+FRAME_CACHE_TTL_SECONDS = float(os.getenv("FRAME_CACHE_TTL_SECONDS", "10"))
+
+# Worker pool for model and OpenCV work, kept off the asyncio event loop.
+# INFERENCE_EXECUTOR_MODE is "thread" (default) or "process". Requests beyond
+# INFERENCE_WORKERS + INFERENCE_QUEUE_SIZE outstanding jobs get a fast 503.
+# In process mode a session's frames and audio always run in the same worker,
+# which holds its face track, mel-frame carry-over and VAD state.
+# Thread budget: every worker can drive a session at once, so the default
+# intra-op threads per session are cpu_count // (3 * INFERENCE_WORKERS), at
+# least 1 (see ort_profiles). Raising <MODEL>_ORT_INTRA_OP_NUM_THREADS above
+# that oversubscribes the CPU unless INFERENCE_WORKERS is lowered to match.
+INFERENCE_EXECUTOR_MODE = os.getenv("INFERENCE_EXECUTOR_MODE", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(os.cpu_count() or 1)))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", str(INFERENCE_WORKERS * 4)))
+
 
 # ---------------------------------------------------------------------------
 # CORS
@@ -60,43 +209,236 @@ app.add_middleware(
 # ONNX model loading
 # ---------------------------------------------------------------------------
 
-emotion_session: Optional[ort.InferenceSession] = None
-attention_session: Optional[ort.InferenceSession] = None
-speech_session: Optional[ort.InferenceSession] = None
+def _resolve_model_path(path: str) -> str:
+    """Swap in a quantized variant of ``path`` if configured and present."""
+    if PREFER_QUANTIZED_MODELS == "auto":
+        modes = ["static", "dynamic"]
+    elif PREFER_QUANTIZED_MODELS in ("static", "dynamic"):
+        modes = [PREFER_QUANTIZED_MODELS]
+    else:
+        return path
 
+    for mode in modes:
+        candidate = quantized_model_path(path, mode)
+        if os.path.exists(candidate):
+            return candidate
+    return path
 
-def _load_session(path: str) -> Optional[ort.InferenceSession]:
-    """Safely load an ONNXRuntime session if the model file exists."""
+
+def _load_session(path: str, model_name: str) -> Optional[ort.InferenceSession]:
+    """
+    Safely load an ONNXRuntime session if the model file exists.
+
+    Session options come from the model's runtime profile (see ort_profiles).
+    With SHARED_WEIGHTS, a model exported by shared_weights.py is loaded with
+    its weights memory-mapped so all server processes share one copy.
+    """
+    path = _resolve_model_path(path)
     if not path or not os.path.exists(path):
         print(f"[AI] Model not found at {path}, falling back to heuristic logic.")
         return None
 
     try:
-        print(f"[AI] Loading ONNX model from {path} ...")
+        profile = get_profile(model_name, workers=INFERENCE_WORKERS)
+        shared = None
+        if SHARED_WEIGHTS:
+            # A cached optimized graph would inline private copies of the weights
+            profile = dict(profile, save_optimized_model=False)
+        load_path, options = build_session_options(path, profile)
+        if SHARED_WEIGHTS:
+            shared = attach_shared_weights(options, path, prepack=SHARED_WEIGHTS_PREPACK)
+            if shared is None:
+                print(f"[AI] No shared-weights export for {path}; run shared_weights.py to create one.")
+            else:
+                load_path = shared[0]
+        print(f"[AI] Loading ONNX model from {load_path} ({model_name} profile: {profile}) ...")
         session = ort.InferenceSession(
-            path,
+            load_path,
+            sess_options=options,
             providers=["CPUExecutionProvider"],
         )
-        print(f"[AI] Loaded model: {path}")
+        if shared is not None:
+            # The memory map and OrtValues must live as long as the session
+            session._shared_weights = shared[1]
+        print(f"[AI] Loaded model: {load_path}")
         return session
     except Exception as exc:
         print(f"[AI] Failed to load model {path}: {exc}")
         return None
 
 
+def _load_metadata(path: str, model_name: str) -> Optional[SessionMetadata]:
+    """
+    Loader for the server process in process mode: the workers hold the
+    sessions, so this one only keeps each model's inputs, outputs and
+    metadata, read from an unoptimized session that is released again.
+    """
+    path = _resolve_model_path(path)
+    if not path or not os.path.exists(path):
+        print(f"[AI] Model not found at {path}, falling back to heuristic logic.")
+        return None
+
+    try:
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        options.add_session_config_entry("session.disable_prepacking", "1")
+        metadata = SessionMetadata(
+            ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        )
+        print(f"[AI] Read {model_name} model metadata from {path} (sessions live in the workers)")
+        return metadata
+    except Exception as exc:
+        print(f"[AI] Failed to read model {path}: {exc}")
+        return None
+
+
+_MODEL_PATHS = {
+    "vision": VISION_MODEL_PATH,
+    "emotion": EMOTION_MODEL_PATH,
+    "attention": ATTENTION_MODEL_PATH,
+    "speech": SPEECH_MODEL_PATH,
+}
+
+startup_timings: Dict[str, Optional[float]] = {
+    "import_seconds": _IMPORT_SECONDS,
+    "models_loaded_seconds": None,
+}
+_startup_started: Optional[float] = None
+
+
+def _warm_up(name: str, session: ort.InferenceSession, spec: Optional[InputSpec]) -> None:
+    """Run a freshly created session on zero inputs of the serving shapes."""
+    if isinstance(session, SessionMetadata):
+        return  # Nothing to run here; each worker warms its own session
+    model_input = session.get_inputs()[0]
+    if name == "speech":
+        window = speech_frontend.context_window(speech_frontend.new_state())
+        templates = [{2: (1, window.size), 4: (1, 1) + window.shape}.get(
+            len(model_input.shape), (1,) + window.shape
+        )]
+    else:
+        sample = (spec or InputSpec()).shape(VISION_INPUT_SIZE)
+        templates = [(batch,) + sample for batch in MODEL_WARMUP_BATCH_SIZES]
+
+    # Fixed dimensions of the model win over the serving defaults
+    shapes = {
+        tuple(dim if isinstance(dim, int) else default for dim, default in zip(model_input.shape, template))
+        for template in templates
+    }
+    for shape in sorted(shapes):
+        try:
+            session.run(None, {model_input.name: np.zeros(shape, dtype=np.float32)})
+        except Exception as exc:
+            print(f"[AI] Warm-up of {name} model at {shape} failed: {exc}")
+
+
+# Models are served from a registry that can hot-swap them (see
+# model_registry). Each carries its own labels; EMOTION_LABELS and
+# SPEECH_EMOTION_LABELS are only the defaults for models without any.
+model_registry = ModelRegistry(
+    paths=_MODEL_PATHS,
+    default_labels={
+        "vision": EMOTION_LABELS,
+        "emotion": EMOTION_LABELS,
+        "speech": SPEECH_EMOTION_LABELS,
+    },
+    loader=_load_session,
+    warm_up=_warm_up,
+    warm_up_initial=MODEL_WARMUP,
+    shadow_sample_rate=MODEL_SHADOW_SAMPLE_RATE,
+)
+# Per-model loading state served by /ready: pending -> loading -> ready,
+# or missing (no file, heuristics are used) / failed (see the server log)
+model_status = model_registry.status
+
+
+def _record_model_run(name: str, elapsed: float) -> None:
+    """Time one model run and remember the first one (its warm-up cost)."""
+    stage_latency.observe(f"{name}_model", elapsed)
+    status = model_status[name]
+    if "first_run_seconds" not in status:
+        status["first_run_seconds"] = elapsed
+
+
 def load_models() -> None:
-    """Load all ONNX models into memory at startup."""
-    global emotion_session, attention_session, speech_session
+    """Load all ONNX models into memory."""
+    for name in _MODEL_PATHS:
+        if name in ("emotion", "attention") and model_status["vision"]["state"] == "ready":
+            # The combined vision model already has both heads
+            model_registry.supersede(name, by="vision")
+        model_registry.ensure(name)
+
+    if _startup_started is not None:
+        startup_timings["models_loaded_seconds"] = time.perf_counter() - _startup_started
+    breakdown = ", ".join(
+        f"{name} {status['state']}"
+        + (f" in {status['create_seconds']:.2f}s" if "create_seconds" in status else "")
+        for name, status in model_status.items()
+    )
+    print(f"[AI] Imports took {_IMPORT_SECONDS:.2f}s; models: {breakdown}")
+
+
+def models_ready() -> bool:
+    """
+    True once no model is pending or loading. In lazy mode models that were
+    never requested don't count (they load on first use), so it is only
+    False while a lazy load is in progress.
+    """
+    if MODEL_LOADING == "lazy":
+        return all(s["state"] != "loading" for s in model_status.values())
+    return model_registry.ready()
+
+
+def _init_worker() -> None:
+    """Process-pool initializer: load this worker's models and watch them."""
+    load_models()
+    model_registry.start_watching(MODEL_WATCH_INTERVAL, shadow=MODEL_RELOAD_AS_SHADOW)
 
-    emotion_session = _load_session(EMOTION_MODEL_PATH)
-    attention_session = _load_session(ATTENTION_MODEL_PATH)
-    speech_session = _load_session(SPEECH_MODEL_PATH)
+
+inference_executor = InferenceExecutor(
+    mode=INFERENCE_EXECUTOR_MODE,
+    max_workers=INFERENCE_WORKERS,
+    max_queue=INFERENCE_QUEUE_SIZE,
+    # Process workers don't share this interpreter's sessions
+    initializer=_init_worker if INFERENCE_EXECUTOR_MODE == "process" else None,
+)
 
 
 @app.on_event("startup")
 async def on_startup() -> None:
-    """FastAPI startup hook – load models once."""
-    load_models()
+    """FastAPI startup hook – load models (per MODEL_LOADING) and start the pool."""
+    global _startup_started
+
+    _startup_started = time.perf_counter()
+    if INFERENCE_EXECUTOR_MODE == "process":
+        # Each worker loads its own sessions (_init_worker); this process
+        # only needs the models' descriptions for /ready and /stats/models
+        model_registry.loader = _load_metadata
+    if MODEL_LOADING == "background":
+        threading.Thread(target=load_models, name="model-loader", daemon=True).start()
+    elif MODEL_LOADING != "lazy":
+        load_models()
+    model_registry.start_watching(MODEL_WATCH_INTERVAL, shadow=MODEL_RELOAD_AS_SHADOW)
+    inference_executor.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    """FastAPI shutdown hook – stop the worker pool."""
+    model_registry.stop_watching()
+    inference_executor.shutdown()
+
+
+def _service_unavailable(exc: ExecutorSaturated) -> HTTPException:
+    """Map a saturated worker pool to a fast 503 so clients back off."""
+    return HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"})
+
+
+class ModelReloadRequest(BaseModel):
+    # Defaults to the newest version of the model's configured file
+    path: Optional[str] = None
+    # Run the new model as a shadow next to the active one instead of swapping
+    shadow: bool = False
 
 
 class FrameAnalysisResponse(BaseModel):
@@ -110,12 +452,46 @@ class AudioAnalysisResponse(BaseModel):
     emotion: str
     confidence: float
     energy: float
+    dbfs: Optional[float] = None
+    peak_dbfs: Optional[float] = None
+    voice_activity: bool = True
+
+
+class FrameColumns(BaseModel):
+    """
+    Columnar frame analyses: one entry per frame in each list.
+
+    ``emotions`` is the [n_frames, len(emotion_labels)] emotion matrix
+    flattened row-major; a flat float list validates several times faster
+    than a list of lists.
+    """
+    engagement: List[float]
+    attention: List[float]
+    emotion_labels: List[str] = []
+    emotions: List[float] = []
+    gaze_x: List[float] = []
+    gaze_y: List[float] = []
+
+    @model_validator(mode="after")
+    def _check_lengths(self) -> "FrameColumns":
+        n = len(self.engagement)
+        if len(self.attention) != n:
+            raise ValueError("attention must have one entry per frame")
+        if len(self.gaze_x) != len(self.gaze_y) or (self.gaze_x and len(self.gaze_x) != n):
+            raise ValueError("gaze_x and gaze_y must both be empty or have one entry per frame")
+        if self.emotions and len(self.emotions) != n * len(self.emotion_labels):
+            raise ValueError("emotions must hold len(emotion_labels) values per frame")
+        return self
 
 
 class SessionFinalizeRequest(BaseModel):
     session_id: str
-    frames: List[Dict[str, Any]]
-    audio_chunks: List[Dict[str, Any]]
+    # Optional: when omitted, the server-side aggregate for session_id is used
+    frames: List[Dict[str, Any]] = []
+    audio_chunks: List[Dict[str, Any]] = []
+    # Faster typed alternatives to frames / audio_chunks
+    frame_columns: Optional[FrameColumns] = None
+    audio_emotions: List[str] = []
 
 
 class SessionMetricsResponse(BaseModel):
@@ -125,58 +501,265 @@ class SessionMetricsResponse(BaseModel):
     gaze_patterns: Dict[str, Any]
     speech_emotions: Dict[str, float]
     recommendations: List[str]
+    frame_count: int = 0
+    audio_chunk_count: int = 0
+    histograms: Dict[str, List[int]] = {}
+    loudness: Dict[str, float] = {}
 
 
 def _softmax(x: np.ndarray) -> np.ndarray:
-    e_x = np.exp(x - np.max(x))
+    e_x = np.exp(x - np.max(x, axis=-1, keepdims=True))
     return e_x / e_x.sum(axis=-1, keepdims=True)
 
 
-def _preprocess_face(frame_bytes: bytes, size: int = 64) -> np.ndarray:
+def _model_spec(model: Optional[LoadedModel]) -> InputSpec:
+    """A vision model's input spec, with the server default size filled in."""
+    spec = model.input_spec if model is not None and model.input_spec is not None else InputSpec()
+    return spec if spec.size else replace(spec, size=VISION_INPUT_SIZE)
+
+
+def _vision_spec() -> InputSpec:
+    """
+    What frames are preprocessed for: the input of the model serving the
+    emotion head (the combined model, else the emotion model), so crops
+    are resized once, straight to its native resolution.
     """
-    Convert raw bytes into a normalized tensor suitable for ONNX.
+    for name in ("vision", "emotion", "attention"):
+        model = model_registry.get(name)
+        if model is not None:
+            return _model_spec(model)
+    return _model_spec(None)
+
 
-    This assumes your vision model takes input of shape [1, 3, size, size]
-    with pixel values normalized to [0, 1]. Adjust this if your training
-    pipeline used different preprocessing.
+def _vision_batch(images: List[np.ndarray], spec: InputSpec) -> np.ndarray:
     """
-    nparr = np.frombuffer(frame_bytes, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    if img is None:
-        raise ValueError("Could not decode image")
+    Normalize resized BGR frames straight into this worker's preallocated
+    batch buffer for ``spec``. Frames of another size (the model was
+    swapped since they were cropped) are resized first.
+    """
+    size = spec.size or VISION_INPUT_SIZE
+    batch = batch_buffer(len(images), size, spec.shape(size))
+    for slot, img in zip(batch, images):
+        if img.shape[:2] != (size, size):
+            img = resize_frame(img, size)
+        write_input(img, slot, spec.layout, spec.channels, spec.scale)
+    return standardize(batch, spec.layout, spec.mean, spec.std)
 
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    img = cv2.resize(img, (size, size))
-    img = img.astype("float32") / 255.0
-    # Move channels first: HWC -> CHW
-    img = np.transpose(img, (2, 0, 1))
-    # Add batch dimension
-    img = np.expand_dims(img, axis=0)
-    return img
 
+def _preprocess_face(frame_bytes: bytes, size: Optional[int] = None) -> np.ndarray:
+    """
+    Convert raw bytes into a normalized tensor suitable for ONNX, in the
+    input format of the serving vision model (see _vision_spec).
+    """
+    spec = _vision_spec()
+    if size:
+        spec = replace(spec, size=size)
+    img = _preprocess_session_frame(frame_bytes, size=spec.size)
+    return _vision_batch([img], spec).copy()
 
-def process_frame(frame_bytes: bytes) -> Dict[str, Any]:
+
+session_store = SessionStore(
+    ttl_seconds=SESSION_TTL_SECONDS,
+    max_sessions=SESSION_MAX_SESSIONS,
+)
+
+frame_cache = FrameCache(
+    max_distance=FRAME_CACHE_MAX_DISTANCE,
+    ttl_seconds=FRAME_CACHE_TTL_SECONDS,
+    max_sessions=SESSION_MAX_SESSIONS,
+)
+
+face_tracker = FaceTracker(
+    detect_width=FACE_DETECT_WIDTH,
+    redetect_every=FACE_REDETECT_EVERY,
+    min_confidence=FACE_TRACK_MIN_CONFIDENCE,
+    max_sessions=SESSION_MAX_SESSIONS,
+)
+
+
+def _decode_session_frame(frame_bytes: bytes, size: Optional[int] = None) -> np.ndarray:
+    """Decode a frame at the reduced scale the vision path needs."""
+    size = size or _vision_spec().size
+    if not FACE_DETECTION:
+        # Keep at least 2x the target resolution so the resize doesn't alias
+        return decode_frame(frame_bytes, min_side=size * 2)
+    return decode_frame(frame_bytes, min_side=FACE_DECODE_MIN_SIDE)
+
+
+def _crop_face(img: np.ndarray, session_id: Optional[str], size: int) -> np.ndarray:
+    """Crop the child's face and resize it to (size, size, 3)."""
+    if FACE_DETECTION:
+        box = face_tracker.locate(img, session_id)
+        if box is not None:
+            x, y, w, h = box
+            img = img[y : y + h, x : x + w]
+    return resize_frame(img, size)
+
+
+def _preprocess_session_frame(
+    frame_bytes: bytes,
+    session_id: Optional[str] = None,
+    size: Optional[int] = None,
+) -> np.ndarray:
     """
-    Production frame processing using ONNX models when available.
-    Falls back to a heuristic implementation when models are missing.
+    Decode a frame, crop the child's face and resize it to (size, size, 3)
+    (by default the serving vision model's input size).
+
+    The whole frame is used when face detection is off or no face is found.
     """
-    try:
-        img_tensor = _preprocess_face(frame_bytes)
-
-        # -------------------------
-        # Emotion inference
-        # -------------------------
-        if emotion_session is not None:
-            input_name = emotion_session.get_inputs()[0].name
-            outputs = emotion_session.run(None, {input_name: img_tensor})
-            # Assume outputs[0] is [1, num_classes]
-            logits = outputs[0][0]
-            probs = _softmax(logits)
-            emotions = {
-                EMOTION_LABELS[i]: float(probs[i])
-                for i in range(min(len(EMOTION_LABELS), len(probs)))
-            }
+    size = size or _vision_spec().size
+    return _crop_face(_decode_session_frame(frame_bytes, size), session_id, size)
+
+
+def _prepare_session_frame(
+    frame_bytes: bytes,
+    session_id: Optional[str] = None,
+    cached_hash: Optional[int] = None,
+    size: Optional[int] = None,
+) -> Tuple[Optional[int], Optional[np.ndarray]]:
+    """
+    Worker-side half of analyze_frame_bytes: decode and hash the frame and,
+    unless it duplicates the session's cached frame (``cached_hash``), crop
+    and resize it. Returns (frame_hash, image); image is None for duplicates.
+    """
+    size = size or _vision_spec().size
+    with stage_timer("frame_decode"):
+        img = _decode_session_frame(frame_bytes, size)
+    with stage_timer("frame_hash"):
+        frame_hash = dhash(img) if FRAME_CACHE else None
+    if frame_hash is not None and frame_cache.is_duplicate(frame_hash, cached_hash):
+        return frame_hash, None
+    with stage_timer("face_crop_resize"):
+        return frame_hash, _crop_face(img, session_id, size)
+
+
+def _run_session(session: ort.InferenceSession, batch: np.ndarray) -> List[np.ndarray]:
+    """
+    Run a session on an [N, ...] batch and return all of its outputs.
+
+    Models exported with a fixed batch dimension of 1 cannot take a stacked
+    tensor, so those are run row by row and each output concatenated.
+    """
+    model_input = session.get_inputs()[0]
+    fixed_batch = model_input.shape[0] if model_input.shape else None
+    if isinstance(fixed_batch, int) and fixed_batch != batch.shape[0]:
+        rows = [
+            session.run(None, {model_input.name: batch[i : i + 1]})
+            for i in range(batch.shape[0])
+        ]
+        return [np.concatenate(outputs, axis=0) for outputs in zip(*rows)]
+    return session.run(None, {model_input.name: batch})
+
+
+def _run_model(model: LoadedModel, batch: np.ndarray, classifier: bool) -> List[np.ndarray]:
+    """
+    Run a registry model on a batch; on a sample of calls also run its
+    shadow (if any) on the same input and record how the two compare
+    (on the first output).
+    """
+    started = time.perf_counter()
+    outputs = _run_session(model.session, batch)
+    output = outputs[0]
+    elapsed = time.perf_counter() - started
+    _record_model_run(model.name, elapsed)
+
+    shadow = model_registry.shadow(model.name)
+    if shadow is not None and random.random() < model_registry.shadow_sample_rate:
+        started = time.perf_counter()
+        try:
+            shadow_output = _run_session(shadow.session, batch)[0]
+        except Exception as exc:
+            print(f"[AI] Shadow {model.name} model {shadow.version} failed: {exc}")
         else:
+            shadow_elapsed = time.perf_counter() - started
+            stage_latency.observe(f"{model.name}_shadow_model", shadow_elapsed)
+            n = batch.shape[0]
+            model_registry.record_shadow(
+                model.name,
+                elapsed,
+                shadow_elapsed,
+                output.reshape(n, -1),
+                shadow_output.reshape(n, -1),
+                classifier,
+            )
+    return outputs
+
+
+def _vision_heads(model: LoadedModel, outputs: List[np.ndarray]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Emotion and attention outputs of the combined vision model, found by
+    output name, else taken in order (emotion first).
+    """
+    by_name = {meta.name: out for meta, out in zip(model.session.get_outputs(), outputs)}
+    emotion = by_name.get("emotion", outputs[0])
+    attention = by_name.get("attention", outputs[1] if len(outputs) > 1 else None)
+    return emotion, attention
+
+
+def _fallback_frame_analysis() -> Dict[str, Any]:
+    """Robust fallback values to avoid breaking the flow."""
+    return {
+        "emotions": {"neutral": 1.0},
+        "attention": 0.5,
+        "engagement": 0.5,
+        "gaze_direction": {"x": 0.5, "y": 0.5},
+    }
+
+
+def _analyze_vision_batch(
+    batch: np.ndarray, images: Optional[List[np.ndarray]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Run emotion and attention inference on a batch preprocessed for
+    _vision_spec() (e.g. [N, 3, size, size]).
+
+    With separate emotion and attention models whose inputs differ, the
+    attention batch is built from ``images`` (the resized BGR frames).
+    Falls back to a heuristic implementation when models are missing.
+    Returns one analysis dict per row of the batch.
+    """
+    n = batch.shape[0]
+
+    # Hold on to this batch's models even if a reload swaps them meanwhile.
+    # The combined model runs once for both heads; otherwise each separate
+    # model runs on the same batch.
+    vision_model = model_registry.get("vision")
+    emotion_out: Optional[np.ndarray] = None
+    attention_out: Optional[np.ndarray] = None
+    labels: List[str] = []
+    if vision_model is not None:
+        outputs = _run_model(vision_model, batch, classifier=True)
+        emotion_out, attention_out = _vision_heads(vision_model, outputs)
+        labels = vision_model.labels
+    else:
+        emotion_model = model_registry.get("emotion")
+        attention_model = model_registry.get("attention")
+        if emotion_model is not None:
+            # Assume the first output is [N, num_classes]
+            emotion_out = _run_model(emotion_model, batch, classifier=True)[0]
+            labels = emotion_model.labels
+        if attention_model is not None:
+            attention_batch = batch
+            attention_spec = _model_spec(attention_model)
+            if images is not None and attention_spec != _model_spec(emotion_model or attention_model):
+                with stage_timer("vision_normalize"):
+                    attention_batch = _vision_batch(images, attention_spec)
+            attention_out = _run_model(attention_model, attention_batch, classifier=False)[0]
+
+    # -------------------------
+    # Emotion inference
+    # -------------------------
+    if emotion_out is not None:
+        logits = emotion_out.reshape(n, -1)
+        probs = _softmax(logits)
+        num_labels = min(len(labels), probs.shape[1])
+        emotions_batch = [
+            {labels[i]: float(row[i]) for i in range(num_labels)}
+            for row in probs
+        ]
+    else:
+        emotions_batch = []
+        for _ in range(n):
             # Improved heuristic fallback for demo
             # Simulates realistic emotion distribution
             base_emotions = {
@@ -189,185 +772,445 @@ def process_frame(frame_bytes: bytes) -> Dict[str, Any]:
             }
             # Normalize to sum to 1.0
             total = sum(base_emotions.values())
-            emotions = {k: v / total for k, v in base_emotions.items()}
-
-        # -------------------------
-        # Attention / gaze inference (optional)
-        # -------------------------
-        if attention_session is not None:
-            att_input = attention_session.get_inputs()[0].name
-            att_output = attention_session.run(None, {att_input: img_tensor})[0][0]
-            # Assume attention model returns a scalar attention score in [0, 1]
-            attention = float(att_output[0]) if np.ndim(att_output) > 0 else float(att_output)
-            gaze_direction = {
-                "x": float(att_output[1]) if len(att_output) > 1 else 0.5,
-                "y": float(att_output[2]) if len(att_output) > 2 else 0.5,
-            }
-        else:
-            # Improved heuristic: simulate realistic attention patterns
-            # Attention varies between 0.5-0.9 for engaged users
-            attention = random.uniform(0.6, 0.85)
-            # Gaze direction slightly varies around center
-            gaze_direction = {
-                "x": random.uniform(0.4, 0.6),
-                "y": random.uniform(0.4, 0.6),
+            emotions_batch.append({k: v / total for k, v in base_emotions.items()})
+
+    # -------------------------
+    # Attention / gaze inference (optional)
+    # -------------------------
+    if attention_out is not None:
+        # Assume attention model returns [attention, gaze_x, gaze_y] per row,
+        # with the attention score in [0, 1]
+        att_outputs = attention_out.reshape(n, -1)
+        attention_batch = [float(row[0]) for row in att_outputs]
+        gaze_batch = [
+            {
+                "x": float(row[1]) if len(row) > 1 else 0.5,
+                "y": float(row[2]) if len(row) > 2 else 0.5,
             }
+            for row in att_outputs
+        ]
+    else:
+        # Improved heuristic: simulate realistic attention patterns
+        # Attention varies between 0.5-0.9 for engaged users
+        attention_batch = [random.uniform(0.6, 0.85) for _ in range(n)]
+        # Gaze direction slightly varies around center
+        gaze_batch = [
+            {"x": random.uniform(0.4, 0.6), "y": random.uniform(0.4, 0.6)}
+            for _ in range(n)
+        ]
 
+    started = time.perf_counter()
+    results = []
+    for emotions, attention, gaze_direction in zip(emotions_batch, attention_batch, gaze_batch):
         # Engagement combines positive/focused emotions with attention
         engagement = (
             (emotions.get("happy", 0) + emotions.get("focused", 0)) * 0.5
             + attention * 0.5
         )
-
-        return {
+        results.append({
             "emotions": emotions,
             "attention": float(attention),
             "engagement": float(engagement),
             "gaze_direction": gaze_direction,
-        }
+        })
+    stage_latency.observe("vision_postprocess", time.perf_counter() - started)
+    return results
+
+
+def process_frame(frame_bytes: bytes) -> Dict[str, Any]:
+    """
+    Production frame processing using ONNX models when available.
+    Falls back to a heuristic implementation when models are missing.
+    """
+    try:
+        return _analyze_vision_frames([_preprocess_session_frame(frame_bytes)])[0]
     except Exception as e:
         print(f"[AI] Error processing frame: {e}")
-        # Robust fallback values to avoid breaking the flow
-        return {
-            "emotions": {"neutral": 1.0},
-            "attention": 0.5,
-            "engagement": 0.5,
-            "gaze_direction": {"x": 0.5, "y": 0.5},
-        }
+        return _fallback_frame_analysis()
+
+
+def _analyze_vision_frames(images: List[np.ndarray]) -> List[Dict[str, Any]]:
+    """
+    Normalize resized BGR frames straight into this worker's preallocated
+    batch buffer and analyze them in one pass.
+    """
+    with stage_timer("vision_normalize"):
+        batch = _vision_batch(images, _vision_spec())
+    return _analyze_vision_batch(batch, images)
+
+
+async def _run_vision_batch(images: List[np.ndarray]) -> List[Dict[str, Any]]:
+    """Analyze a window of queued frames on the worker pool."""
+    try:
+        # Frames in the batch were already admitted, so never shed here
+        return await inference_executor.run(_analyze_vision_frames, images, shed=False)
+    except Exception as e:
+        print(f"[AI] Error processing frame batch of {len(images)}: {e}")
+        return [_fallback_frame_analysis() for _ in images]
+
+
+vision_batcher = MicroBatcher(
+    _run_vision_batch,
+    max_batch_size=VISION_BATCH_MAX_SIZE,
+    max_wait_ms=VISION_BATCH_MAX_WAIT_MS,
+    name="vision",
+)
+
+
+async def analyze_frame_bytes(frame_bytes: bytes, session_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Preprocess one frame on the worker pool and analyze it in the next batch.
+
+    A frame that (nearly) duplicates the session's last analysed frame gets
+    that frame's analysis back without running the models (see frame_cache).
+
+    Raises ExecutorSaturated when the pool is full; any other failure yields
+    the fallback analysis.
+    """
+    started = time.perf_counter()
+    cached_hash = frame_cache.last_hash(session_id) if FRAME_CACHE else None
+    try:
+        frame_hash, img = await inference_executor.run(
+            _prepare_session_frame, frame_bytes, session_id, cached_hash, key=session_id
+        )
+    except ExecutorSaturated:
+        raise
+    except Exception as e:
+        print(f"[AI] Error processing frame: {e}")
+        return _fallback_frame_analysis()
+
+    analysis = frame_cache.hit(session_id) if img is None else None
+    if analysis is None:
+        if img is None:
+            # The cached entry was evicted or expired meanwhile; analyse this
+            # frame. It was already admitted, so the retry is not shed.
+            img = await inference_executor.run(
+                _preprocess_session_frame, frame_bytes, session_id, shed=False, key=session_id
+            )
+        analysis = await vision_batcher.submit(img)
+        if FRAME_CACHE:
+            frame_cache.store(session_id, frame_hash, analysis)
+    if session_id:
+        session_store.add_frame(session_id, analysis)
+    stage_latency.observe("frame_total", time.perf_counter() - started)
+    return analysis
 
 
 @app.post("/vision/frame", response_model=FrameAnalysisResponse)
-async def analyze_frame(frame: UploadFile = File(...)):
+async def analyze_frame(
+    frame: UploadFile = File(...),
+    session_id: Optional[str] = Form(None),
+):
     """
-    Analyze a video frame for emotions, attention, and engagement
+    Analyze a video frame for emotions, attention, and engagement.
+
+    Passing the game's session_id lets consecutive frames reuse the tracked
+    face position instead of running full-frame detection each time.
     """
     try:
         frame_bytes = await frame.read()
-        analysis = process_frame(frame_bytes)
-        
+        analysis = await analyze_frame_bytes(frame_bytes, session_id)
+
         return FrameAnalysisResponse(**analysis)
+    except ExecutorSaturated as e:
+        raise _service_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+speech_frontend = MelFrontend(
+    sample_rate=SPEECH_SAMPLE_RATE,
+    n_fft=SPEECH_N_FFT,
+    hop_length=SPEECH_HOP_LENGTH,
+    n_mels=SPEECH_N_MELS,
+    n_mfcc=SPEECH_N_MFCC,
+    deltas=SPEECH_DELTAS,
+    context_frames=SPEECH_CONTEXT_FRAMES,
+)
+speech_states = StreamStateStore(speech_frontend, max_sessions=SESSION_MAX_SESSIONS)
+
+voice_activity = VoiceActivityDetector(
+    sample_rate=SPEECH_SAMPLE_RATE,
+    start_dbfs=VAD_START_DBFS,
+    stop_dbfs=VAD_STOP_DBFS,
+    zcr_max=VAD_ZCR_MAX,
+    hangover_frames=VAD_HANGOVER_FRAMES,
+    max_sessions=SESSION_MAX_SESSIONS,
+    loud_dbfs=VAD_LOUD_DBFS,
+)
+
+# One container decoder per session for MediaRecorder WebM/Ogg chunk streams
+audio_streams = StreamDecoderStore(
+    SPEECH_SAMPLE_RATE,
+    max_sessions=AUDIO_DECODER_MAX_SESSIONS,
+    ttl_seconds=SESSION_TTL_SECONDS,
+)
+
+
+def _speech_features(
+    audio_np: np.ndarray, session_id: Optional[str], input_rank: int
+) -> np.ndarray:
+    """
+    Run a chunk through the streaming frontend and shape the session's
+    feature context for the speech model: [1, T, F] for rank-3 inputs,
+    [1, 1, T, F] for rank-4 and [1, T * F] for rank-2.
+
+    With a session_id the window/hop overlap carries over from the previous
+    chunk; without one each chunk is analysed on its own.
+    """
+    state = speech_states.get(session_id)
+    speech_frontend.process(audio_np.astype(np.float32) / 32768.0, state)
+    window = speech_frontend.context_window(state)
+    if input_rank == 4:
+        return window[None, None]
+    if input_rank == 2:
+        return window.reshape(1, -1)
+    return window[None]
+
+
+def process_audio(audio_bytes: bytes, session_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Analyze an audio chunk for speech emotion and loudness.
+    Falls back to an energy heuristic when the speech model is missing.
+
+    The chunk may be raw int16 PCM, WAV or Ogg/WebM (see audio_decoding);
+    it is decoded to int16 mono at SPEECH_SAMPLE_RATE first. With a
+    session_id, Ogg/WebM chunks continue the session's recorder stream, and
+    a chunk that does not complete any audio yet is reported as silence.
+    """
+    stream = audio_streams.get(session_id)
+    with stage_timer("audio_decode"):
+        audio_np = decode_audio(audio_bytes, SPEECH_SAMPLE_RATE, stream)
+    if audio_np.size == 0 and not (stream is not None and stream.started):
+        raise ValueError("Empty audio buffer")
+
+    with stage_timer("audio_loudness"):
+        loudness = chunk_loudness(audio_np)
+    energy = loudness["energy"]
+    levels = {"dbfs": loudness["dbfs"], "peak_dbfs": loudness["peak_dbfs"]}
+
+    if audio_np.size == 0:
+        speech = False
+    elif VAD_ENABLED:
+        with stage_timer("audio_vad"):
+            speech = voice_activity.is_speech(audio_np, session_id)
+    else:
+        speech = True
+
+    if not speech:
+        # Nothing to classify; the feature stream restarts at the next speech
+        if session_id:
+            speech_frontend.skip(speech_states.get(session_id))
+        return {
+            "emotion": "silence",
+            "confidence": 1.0,
+            "energy": energy,
+            **levels,
+            "voice_activity": False,
+        }
+
+    speech_model = model_registry.get("speech")
+    if speech_model is not None:
+        model_input = speech_model.session.get_inputs()[0]
+        with stage_timer("speech_features"):
+            feats = _speech_features(audio_np, session_id, len(model_input.shape))
+
+        logits = _run_model(speech_model, feats, classifier=True)[0][0]
+        probs = _softmax(logits)
+        best_idx = int(np.argmax(probs))
+        emotion = (
+            speech_model.labels[best_idx]
+            if best_idx < len(speech_model.labels)
+            else "neutral"
+        )
+        confidence = float(np.max(probs))
+    else:
+        # Heuristic speech emotion based on energy
+        if energy < 1e-6:
+            emotion = "calm"
+        elif energy < 5e-6:
+            emotion = "neutral"
+        else:
+            emotion = "excited"
+        confidence = 0.6
+
+    return {
+        "emotion": emotion,
+        "confidence": confidence,
+        "energy": energy,
+        **levels,
+        "voice_activity": True,
+    }
+
+
+async def analyze_audio_bytes(audio_bytes: bytes, session_id: Optional[str] = None) -> Dict[str, Any]:
+    """Analyze one audio chunk on the worker pool."""
+    started = time.perf_counter()
+    analysis = await inference_executor.run(process_audio, audio_bytes, session_id, key=session_id)
+    if session_id:
+        session_store.add_audio(session_id, analysis)
+    stage_latency.observe("audio_total", time.perf_counter() - started)
+    return analysis
+
+
 @app.post("/audio/chunk", response_model=AudioAnalysisResponse)
-async def analyze_audio(audio: UploadFile = File(...)):
+async def analyze_audio(
+    audio: UploadFile = File(...),
+    session_id: Optional[str] = Form(None),
+):
     """
     Analyze an audio chunk for speech emotions
     """
     try:
         audio_bytes = await audio.read()
+        analysis = await analyze_audio_bytes(audio_bytes, session_id)
 
-        # Simple energy proxy for loudness
-        audio_np = np.frombuffer(audio_bytes, dtype=np.int16)
-        if audio_np.size == 0:
-            raise ValueError("Empty audio buffer")
-
-        energy = float(np.mean(np.square(audio_np))) / (2**31)
-
-        if speech_session is not None:
-            # NOTE: This assumes your speech model expects log-mel spectrogram
-            # features of fixed length. You MUST align this with your training
-            # pipeline. Here we just show the structure.
-            input_name = speech_session.get_inputs()[0].name
-
-            # Placeholder: use a simple normalized energy vector as input
-            # Replace with real feature extraction (e.g. librosa melspectrogram)
-            feats = np.clip(audio_np.astype("float32") / 32768.0, -1.0, 1.0)
-            # Pad / truncate to fixed length
-            target_len = 16000
-            if feats.shape[0] < target_len:
-                feats = np.pad(feats, (0, target_len - feats.shape[0]))
-            else:
-                feats = feats[:target_len]
-            feats = np.expand_dims(feats, axis=0)
-
-            outputs = speech_session.run(None, {input_name: feats})
-            logits = outputs[0][0]
-            probs = _softmax(logits)
-            best_idx = int(np.argmax(probs))
-            emotion = (
-                SPEECH_EMOTION_LABELS[best_idx]
-                if best_idx < len(SPEECH_EMOTION_LABELS)
-                else "neutral"
-            )
-            confidence = float(np.max(probs))
-        else:
-            # Heuristic speech emotion based on energy
-            if energy < 1e-6:
-                emotion = "calm"
-            elif energy < 5e-6:
-                emotion = "neutral"
-            else:
-                emotion = "excited"
-            confidence = 0.6
-
-        return AudioAnalysisResponse(
-            emotion=emotion,
-            confidence=confidence,
-            energy=energy,
-        )
+        return AudioAnalysisResponse(**analysis)
+    except ExecutorSaturated as e:
+        raise _service_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.websocket("/stream/{session_id}")
+async def stream_session(websocket: WebSocket, session_id: str):
+    """
+    Stream frames and audio for a whole game session over one WebSocket.
+    See streaming.py for the message format and backpressure behaviour.
+    """
+    await StreamSession(
+        websocket,
+        session_id,
+        analyze_frame=analyze_frame_bytes,
+        analyze_audio=analyze_audio_bytes,
+        audio_queue_size=STREAM_AUDIO_QUEUE_SIZE,
+        on_close=_close_audio_stream,
+    ).run()
+
+
+def _forget_audio_stream(session_id: str) -> None:
+    audio_streams.forget(session_id)
+
+
+async def _close_audio_stream(session_id: str) -> None:
+    """Release the session's audio decoder when its /stream connection ends."""
+    await inference_executor.run(_forget_audio_stream, session_id, shed=False, key=session_id)
+
+
+def _forget_stream_state(session_id: str) -> None:
+    """Drop a finished session's face track, mel-frame, VAD and audio decoder state."""
+    face_tracker.forget(session_id)
+    speech_states.forget(session_id)
+    voice_activity.forget(session_id)
+    audio_streams.forget(session_id)
+
+
+def _audio_stats() -> Dict[str, Any]:
+    return {**voice_activity.stats(), **audio_streams.stats()}
+
+
+def _face_stats() -> Dict[str, Any]:
+    return face_tracker.stats()
+
+
+async def _worker_stats(
+    stats: Callable[[], Dict[str, Any]],
+    counters: Tuple[str, ...],
+    ratio: Optional[Tuple[str, str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Stats kept where the work runs, with ``counters`` summed over the worker
+    processes in process mode. ``ratio`` (name, numerator, denominator) is
+    recomputed from the sums.
+    """
+    reports = await inference_executor.broadcast(stats)
+    merged = dict(reports[0])
+    for report in reports[1:]:
+        for name in counters:
+            merged[name] += report[name]
+    if ratio is not None:
+        name, numerator, denominator = ratio
+        merged[name] = merged[numerator] / merged[denominator] if merged[denominator] else 0.0
+    return merged
+
+
+def _session_metrics(acc: SessionAccumulator) -> SessionMetricsResponse:
+    """Turn a session's running sums into the metrics response."""
+    avg_engagement = acc.average_engagement
+    avg_attention = acc.average_attention
+
+    # Generate recommendations
+    recommendations = []
+    if avg_engagement < 0.5:
+        recommendations.append("Consider shorter game sessions to maintain focus")
+    if avg_attention < 0.6:
+        recommendations.append("Try games with more visual feedback")
+    if avg_engagement > 0.8:
+        recommendations.append("Great engagement! Consider increasing difficulty")
+
+    return SessionMetricsResponse(
+        engagement_score=avg_engagement * 100,
+        attention_score=avg_attention * 100,
+        emotion_distribution=acc.emotion_distribution(),
+        gaze_patterns=acc.gaze_patterns(),
+        speech_emotions=acc.speech_distribution(),
+        recommendations=recommendations,
+        frame_count=acc.frame_count,
+        audio_chunk_count=acc.audio_count,
+        histograms=acc.histograms(),
+        loudness=acc.loudness.summary(),
+    )
+
+
+def _accumulate_payload(request: SessionFinalizeRequest) -> SessionAccumulator:
+    """Aggregate client-posted analyses with NumPy reductions."""
+    acc = SessionAccumulator()
+
+    columns = request.frame_columns
+    if columns is not None:
+        acc.add_frame_columns(
+            np.asarray(columns.engagement, dtype=np.float64),
+            np.asarray(columns.attention, dtype=np.float64),
+            columns.emotion_labels,
+            (
+                np.asarray(columns.emotions, dtype=np.float64).reshape(-1, len(columns.emotion_labels))
+                if columns.emotions
+                else None
+            ),
+            np.asarray(columns.gaze_x, dtype=np.float64) if columns.gaze_x else None,
+            np.asarray(columns.gaze_y, dtype=np.float64) if columns.gaze_y else None,
+        )
+    acc.add_frame_dicts(request.frames)
+
+    acc.add_audio_emotions(request.audio_emotions)
+    acc.add_audio_emotions(chunk.get("emotion", "neutral") for chunk in request.audio_chunks)
+    return acc
+
+
 @app.post("/session/finalize", response_model=SessionMetricsResponse)
 async def finalize_session(request: SessionFinalizeRequest):
     """
-    Aggregate metrics from a game session and generate insights
+    Aggregate metrics from a game session and generate insights.
+
+    Frames and audio analysed with this session_id were already aggregated
+    on the server, so only the session_id is needed. Clients that still post
+    their analyses get those aggregated instead, either as the original
+    frames/audio_chunks dicts or as typed frame_columns/audio_emotions.
     """
     try:
-        frames = request.frames
-        audio_chunks = request.audio_chunks
-        
-        # Aggregate engagement scores
-        engagement_scores = [f.get("engagement", 0.5) for f in frames]
-        avg_engagement = sum(engagement_scores) / len(engagement_scores) if engagement_scores else 0.5
-        
-        # Aggregate attention scores
-        attention_scores = [f.get("attention", 0.5) for f in frames]
-        avg_attention = sum(attention_scores) / len(attention_scores) if attention_scores else 0.5
-        
-        # Aggregate emotions
-        emotion_distribution = {}
-        for frame in frames:
-            emotions = frame.get("emotions", {})
-            for emotion, value in emotions.items():
-                emotion_distribution[emotion] = emotion_distribution.get(emotion, 0) + value
-        
-        # Normalize
-        total = sum(emotion_distribution.values())
-        if total > 0:
-            emotion_distribution = {k: v / total for k, v in emotion_distribution.items()}
-        
-        # Aggregate speech emotions
-        speech_emotions = {}
-        for chunk in audio_chunks:
-            emotion = chunk.get("emotion", "neutral")
-            speech_emotions[emotion] = speech_emotions.get(emotion, 0) + 1
-        
-        # Normalize
-        total_speech = sum(speech_emotions.values())
-        if total_speech > 0:
-            speech_emotions = {k: v / total_speech for k, v in speech_emotions.items()}
-        
-        # Generate recommendations
-        recommendations = []
-        if avg_engagement < 0.5:
-            recommendations.append("Consider shorter game sessions to maintain focus")
-        if avg_attention < 0.6:
-            recommendations.append("Try games with more visual feedback")
-        if avg_engagement > 0.8:
-            recommendations.append("Great engagement! Consider increasing difficulty")
-        
-        return SessionMetricsResponse(
-            engagement_score=avg_engagement * 100,
-            attention_score=avg_attention * 100,
-            emotion_distribution=emotion_distribution,
-            gaze_patterns={"average_x": 0.5, "average_y": 0.5},  # Placeholder
-            speech_emotions=speech_emotions,
-            recommendations=recommendations
+        stored = session_store.pop(request.session_id)
+        # The streaming state lives where the session's work ran
+        await inference_executor.run(
+            _forget_stream_state, request.session_id, shed=False, key=request.session_id
         )
+        frame_cache.forget(request.session_id)
+
+        if request.frames or request.audio_chunks or request.frame_columns or request.audio_emotions:
+            acc = _accumulate_payload(request)
+        else:
+            acc = stored or SessionAccumulator()
+
+        return _session_metrics(acc)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -378,7 +1221,203 @@ async def health_check():
     return {"status": "healthy", "service": "cognicare-ai"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness endpoint: per-model loading state and the startup breakdown.
+    Answers 503 while models are still loading.
+    """
+    ready = models_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "model_loading": MODEL_LOADING,
+            "models": model_status,
+            "startup": startup_timings,
+        },
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus-style per-stage latency histograms and model load timings"""
+    def per_model(key: str) -> Dict[str, float]:
+        return {name: status[key] for name, status in model_status.items() if key in status}
+
+    return (
+        stage_latency.render()
+        + render_gauges("cognicare_model_create_seconds", "Session creation time.", per_model("create_seconds"), "model")
+        + render_gauges("cognicare_model_warmup_seconds", "Warm-up pass time.", per_model("warmup_seconds"), "model")
+        + render_gauges(
+            "cognicare_model_first_run_seconds",
+            "Latency of the first inference after loading.",
+            per_model("first_run_seconds"),
+            "model",
+        )
+    )
+
+
+def _check_admin(name: str, token: Optional[str]) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if token is None or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    if name not in _MODEL_PATHS:
+        raise HTTPException(status_code=404, detail=f"Unknown model {name}")
+
+
+def _incompatibility(name: str, path: str) -> Optional[str]:
+    """Why the model at ``path`` can't replace the serving ``name`` model (see model_registry)."""
+    candidate = _load_metadata(path, name)
+    if candidate is None:
+        return f"Could not read a model from {path}"
+    return model_registry.incompatibility(name, path, candidate)
+
+
+def _reload_here(name: str, path: str, shadow: bool) -> None:
+    model_registry.reload_in_background(name, path, shadow)
+
+
+def _has_shadow_here(name: str) -> bool:
+    return model_registry.shadow(name) is not None
+
+
+def _promote_here(name: str) -> Optional[str]:
+    model = model_registry.promote(name)
+    return model.version if model is not None else None
+
+
+def _discard_shadow_here(name: str) -> None:
+    model_registry.discard_shadow(name)
+
+
+async def _on_every_registry(fn: Callable[..., Any], *args: Any) -> List[Any]:
+    """
+    Apply a registry change in every worker process and then in this one
+    (which only holds metadata in process mode); thread mode has one registry.
+    """
+    results = await inference_executor.broadcast(fn, *args)
+    if INFERENCE_EXECUTOR_MODE == "process":
+        results.append(fn(*args))
+    return results
+
+
+@app.post("/admin/models/{name}/reload", status_code=202)
+async def reload_model(
+    name: str,
+    request: Optional[ModelReloadRequest] = None,
+    x_admin_token: Optional[str] = Header(None),
+):
+    """
+    Build, warm and swap in (or shadow) a new version of a model in the
+    background; in-flight requests finish on the current one. With the
+    process executor every worker reloads, and the server process refreshes
+    its metadata.
+
+    A model whose inputs or outputs differ from the serving one is rejected
+    with 400 before anything is swapped (each registry checks again before
+    its own swap).
+    """
+    _check_admin(name, x_admin_token)
+    request = request or ModelReloadRequest()
+    path = request.path
+    if path is not None:
+        models_dir = os.path.dirname(os.path.realpath(_MODEL_PATHS[name]))
+        if os.path.dirname(os.path.realpath(path)) != models_dir:
+            raise HTTPException(status_code=400, detail="Models can only be loaded from the models directory")
+        if not os.path.exists(path):
+            raise HTTPException(status_code=404, detail=f"No model file at {path}")
+    else:
+        path = latest_version(_MODEL_PATHS[name])
+    if os.path.exists(path):
+        problem = await asyncio.to_thread(_incompatibility, name, path)
+        if problem is not None:
+            raise HTTPException(status_code=400, detail=problem)
+    await _on_every_registry(_reload_here, name, path, request.shadow)
+    return {"status": "reloading", "model": name, "shadow": request.shadow}
+
+
+@app.post("/admin/models/{name}/promote")
+async def promote_shadow_model(name: str, x_admin_token: Optional[str] = Header(None)):
+    """Make a model's shadow the active model (in every worker process)"""
+    _check_admin(name, x_admin_token)
+    loaded = await _on_every_registry(_has_shadow_here, name)
+    if not any(loaded):
+        raise HTTPException(status_code=404, detail=f"No shadow {name} model")
+    if not all(loaded):
+        raise HTTPException(status_code=409, detail=f"The shadow {name} model is still loading in some workers")
+    versions = await _on_every_registry(_promote_here, name)
+    return {"status": "promoted", "model": name, "version": versions[-1]}
+
+
+@app.delete("/admin/models/{name}/shadow")
+async def discard_shadow_model(name: str, x_admin_token: Optional[str] = Header(None)):
+    """Stop shadowing a model"""
+    _check_admin(name, x_admin_token)
+    await _on_every_registry(_discard_shadow_here, name)
+    return {"status": "discarded", "model": name}
+
+
+@app.get("/stats/models")
+async def model_registry_stats():
+    """Report served model versions, labels, swaps and shadow comparisons"""
+    return model_registry.stats()
+
+
+@app.get("/stats/batching")
+async def batching_stats():
+    """Report micro-batching configuration and achieved batch sizes"""
+    return vision_batcher.stats()
+
+
+@app.get("/stats/executor")
+async def executor_stats():
+    """Report worker pool configuration, load and shed requests"""
+    return inference_executor.stats()
+
+
+@app.get("/stats/sessions")
+async def session_store_stats():
+    """Report in-memory session aggregates and evictions"""
+    return session_store.stats()
+
+
+@app.get("/stats/audio")
+async def audio_stats():
+    """Report audio chunks skipped by the voice-activity gate and open stream decoders"""
+    return await _worker_stats(
+        _audio_stats,
+        (
+            "chunks",
+            "skipped_silent",
+            "stream_decoders",
+            "decoders_evicted_expired",
+            "decoders_evicted_capacity",
+        ),
+        ("skipped_ratio", "skipped_silent", "chunks"),
+    )
+
+
+@app.get("/stats/frame-cache")
+async def frame_cache_stats():
+    """Report duplicate-frame cache hits and misses"""
+    return frame_cache.stats()
+
+
+@app.get("/stats/faces")
+async def face_tracking_stats():
+    """Report face detection vs. tracking counts"""
+    return await _worker_stats(
+        _face_stats, ("sessions", "detections", "tracked_frames", "misses")
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if SERVER_WORKERS > 1:
+        # Workers re-import this module, so the app is passed by name
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=SERVER_WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
 
@@ -0,0 +1,85 @@
+"""
+Per-stage latency histograms in the Prometheus text exposition format.
+
+Each stage of the frame and audio paths (decode, preprocess, each model
+run, postprocess, ...) is timed with ``stage_timer`` and folded into a
+fixed-bucket cumulative histogram, served by /metrics as
+
+    cognicare_stage_latency_seconds_bucket{stage="emotion_model",le="0.005"} 42
+    cognicare_stage_latency_seconds_sum{stage="emotion_model"} 0.131
+    cognicare_stage_latency_seconds_count{stage="emotion_model"} 57
+
+With INFERENCE_EXECUTOR_MODE=process, stages that run in worker processes
+are recorded there and do not show up in the server's /metrics.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence
+
+# Seconds; spans sub-millisecond decodes up to multi-second cold model runs
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+class LatencyHistograms:
+    """Thread-safe set of histograms keyed by stage name."""
+
+    def __init__(self, name: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.buckets = tuple(buckets)
+        self._counts: Dict[str, List[int]] = {}
+        self._sums: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            counts = self._counts.get(stage)
+            if counts is None:
+                # One slot per bucket plus the +Inf overflow
+                counts = self._counts[stage] = [0] * (len(self.buckets) + 1)
+                self._sums[stage] = 0.0
+            counts[index] += 1
+            self._sums[stage] += seconds
+
+    def render(self) -> str:
+        """Prometheus text format (cumulative buckets)."""
+        lines = [
+            f"# HELP {self.name} Latency of each analysis stage in seconds.",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            for stage in sorted(self._counts):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), self._counts[stage]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{self.name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'{self.name}_sum{{stage="{stage}"}} {self._sums[stage]}')
+                lines.append(f'{self.name}_count{{stage="{stage}"}} {cumulative}')
+        return "\n".join(lines) + "\n"
+
+
+stage_latency = LatencyHistograms("cognicare_stage_latency_seconds")
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Time the enclosed block into the ``stage`` histogram."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_latency.observe(stage, time.perf_counter() - started)
+
+
+def render_gauges(name: str, help_text: str, values: Dict[str, float], label: str) -> str:
+    """Render a labelled gauge family, e.g. per-model warm-up seconds."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for key in sorted(values):
+        lines.append(f'{name}{{{label}="{key}"}} {values[key]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,546 @@
+"""
+Hot-swappable registry of the server's ONNX models.
+
+Each named model ("vision", "emotion", "attention", "speech") has a
+configured path.
+The file actually served is the newest versioned sibling of that path,
+``<root>.v<N>.onnx`` (highest N), or the path itself when there is none.
+Derived files written next to models (``*.optimized.onnx`` graph caches and
+``*.int8-*.onnx`` quantized variants) are never treated as versions.
+
+A model is served as an immutable LoadedModel (session + its own labels).
+Reloading builds and warms a new session off the request path and then
+replaces the registry entry in one assignment, so requests that already
+picked up the old LoadedModel finish on it while new ones see the new one.
+
+Reloads come from the admin endpoints or from a polling watcher that
+notices a changed or newly versioned file (after it stopped changing for
+one poll interval). Either way the new file must be able to stand in for
+the serving model (same input spec, input shapes and output names; only a
+class dimension matching the new labels may change), else it is rejected
+before anything is warmed or swapped. A reload can instead go to a *shadow* slot: the shadow
+model then runs on a sample of requests next to the active one, and its
+latency and agreement are reported until it is promoted or discarded.
+
+Labels come from a ``<root>.json`` sidecar ({"labels": [...]}), else from
+a comma-separated ``labels`` entry in the ONNX metadata, else the defaults.
+
+Image models also carry an InputSpec (resolution, layout, colour and
+normalisation), so frames are preprocessed straight to what the model was
+trained on. It comes from the sidecar's "input" section, written by
+train.py:
+
+    {"labels": [...],
+     "input": {"shape": [null, 3, 64, 64], "layout": "NCHW", "color": "RGB",
+               "scale": 0.00392156862745098, "mean": [0, 0, 0], "std": [1, 1, 1]}}
+
+else it is inferred from the graph's input shape (RGB scaled to [0, 1]).
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SETTLED_STATES = ("ready", "missing", "failed", "superseded")
+
+
+@dataclass(frozen=True)
+class InputSpec:
+    """How an image model wants its input."""
+
+    size: Optional[int] = None  # None: not fixed by the model, use the server default
+    layout: str = "NCHW"  # or "NHWC"
+    channels: int = 3  # 3: RGB, 1: grayscale
+    scale: float = 1.0 / 255.0
+    mean: Tuple[float, ...] = ()  # per channel, subtracted after scaling
+    std: Tuple[float, ...] = ()  # per channel, divided by after that
+
+    def shape(self, size: int) -> Tuple[int, int, int]:
+        """Per-sample shape at ``size`` (the spec's own size wins)."""
+        size = self.size or size
+        if self.layout == "NHWC":
+            return size, size, self.channels
+        return self.channels, size, size
+
+
+@dataclass(frozen=True)
+class TensorInfo:
+    name: str
+    shape: List[Any]
+    type: str
+
+
+class SessionMetadata:
+    """
+    The parts of an ONNX Runtime session the registry reads (inputs, outputs
+    and custom metadata), kept after the session itself is released. Stands
+    in for a session where a model only has to be described, not run.
+    """
+
+    def __init__(self, session: Any) -> None:
+        self._inputs = [TensorInfo(arg.name, list(arg.shape), arg.type) for arg in session.get_inputs()]
+        self._outputs = [TensorInfo(arg.name, list(arg.shape), arg.type) for arg in session.get_outputs()]
+        self._meta = SimpleNamespace(
+            custom_metadata_map=dict(session.get_modelmeta().custom_metadata_map)
+        )
+
+    def get_inputs(self) -> List[TensorInfo]:
+        return self._inputs
+
+    def get_outputs(self) -> List[TensorInfo]:
+        return self._outputs
+
+    def get_modelmeta(self) -> Any:
+        return self._meta
+
+
+Loader = Callable[[str, str], Any]  # (path, model name) -> session or None
+WarmUp = Callable[[str, Any, Optional[InputSpec]], None]  # (model name, session, input spec)
+# (serving model, candidate path, candidate session) -> why it can't replace it, or None
+Validate = Callable[["LoadedModel", str, Any], Optional[str]]
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    name: str
+    path: str
+    version: str
+    session: Any
+    labels: List[str]
+    input_spec: Optional[InputSpec] = None  # image models only
+    loaded_at: float = field(default_factory=time.time)
+
+
+def sidecar_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + ".json"
+
+
+def read_sidecar(model_path: str) -> Dict[str, Any]:
+    """Metadata written next to a model by the training scripts, if any."""
+    try:
+        with open(sidecar_path(model_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def model_labels(model_path: str, session: Any, default: List[str]) -> List[str]:
+    labels = read_sidecar(model_path).get("labels")
+    if labels:
+        return [str(label) for label in labels]
+    try:
+        meta = session.get_modelmeta().custom_metadata_map.get("labels")
+    except Exception:
+        meta = None
+    if meta:
+        return [label.strip() for label in meta.split(",") if label.strip()]
+    return list(default)
+
+
+def input_spec(model_path: str, session: Any) -> Optional[InputSpec]:
+    """
+    The sidecar's input description, else what the graph's input implies;
+    None for models without an image-shaped (rank 4) input.
+    """
+    declared = read_sidecar(model_path).get("input") or {}
+    shape = declared.get("shape")
+    if not shape:
+        try:
+            shape = session.get_inputs()[0].shape
+        except Exception:
+            shape = None
+    if not shape or len(shape) != 4:
+        return None
+
+    layout = str(declared.get("layout", "")).upper()
+    if layout not in ("NCHW", "NHWC"):
+        # Channels are the small dimension next to the batch or at the end
+        layout = "NHWC" if shape[3] in (1, 3) and shape[1] not in (1, 3) else "NCHW"
+    channels, size = (shape[3], shape[1]) if layout == "NHWC" else (shape[1], shape[2])
+    color = str(declared.get("color", "")).upper()
+    if color in ("GRAY", "GRAYSCALE"):
+        channels = 1
+    elif not isinstance(channels, int) or channels not in (1, 3):
+        channels = 3
+
+    mean = tuple(float(v) for v in declared.get("mean") or ())
+    std = tuple(float(v) for v in declared.get("std") or ())
+    return InputSpec(
+        size=size if isinstance(size, int) and size > 0 else None,
+        layout=layout,
+        channels=channels,
+        scale=float(declared.get("scale", 1.0 / 255.0)),
+        # Identity statistics are dropped so they cost no extra pass
+        mean=() if not any(mean) else mean,
+        std=() if all(v == 1.0 for v in std) else std,
+    )
+
+
+def _shapes(args: List[Any]) -> List[Tuple[Any, ...]]:
+    """Tensor shapes with symbolic dimensions (batch, time) as None."""
+    return [tuple(dim if isinstance(dim, int) else None for dim in arg.shape) for arg in args]
+
+
+def compatibility_problem(current: "LoadedModel", path: str, session: Any) -> Optional[str]:
+    """
+    Why the model at ``path`` can't replace ``current``, or None if it can.
+
+    Inputs must match (sidecar spec, shapes and types) and outputs keep
+    their names and shapes, except that an output's last (class) dimension
+    may change when the candidate's labels have exactly that many entries.
+    """
+    spec = input_spec(path, session)
+    if spec != current.input_spec:
+        return f"Input spec {spec} does not match the serving model's {current.input_spec}"
+    current_inputs = current.session.get_inputs()
+    inputs = session.get_inputs()
+    if _shapes(inputs) != _shapes(current_inputs) or [arg.type for arg in inputs] != [
+        arg.type for arg in current_inputs
+    ]:
+        return "Inputs do not match the serving model's"
+
+    current_outputs = current.session.get_outputs()
+    outputs = session.get_outputs()
+    if [arg.name for arg in outputs] != [arg.name for arg in current_outputs]:
+        return "Output names do not match the serving model's"
+    labels = model_labels(path, session, [])
+    for arg, shape, current_shape in zip(outputs, _shapes(outputs), _shapes(current_outputs)):
+        if shape == current_shape:
+            continue
+        if len(shape) != len(current_shape) or shape[:-1] != current_shape[:-1]:
+            return f"Output {arg.name} has shape {list(shape)}, the serving model {list(current_shape)}"
+        if shape[-1] != len(labels):
+            return f"Output {arg.name} has {shape[-1]} classes but the model has {len(labels)} labels"
+    return None
+
+
+def _describe(spec: InputSpec) -> Dict[str, Any]:
+    return {"size": spec.size, "layout": spec.layout, "channels": spec.channels}
+
+
+def latest_version(path: str) -> str:
+    """Newest ``<root>.v<N>.onnx`` next to ``path``, else ``path`` itself."""
+    directory = os.path.dirname(path) or "."
+    root = os.path.basename(os.path.splitext(path)[0])
+    pattern = re.compile(re.escape(root) + r"\.v(\d+)\.onnx$")
+    best: Tuple[int, str] = (-1, path)
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return path
+    for name in names:
+        match = pattern.fullmatch(name)
+        if match and int(match.group(1)) > best[0]:
+            best = (int(match.group(1)), os.path.join(directory, name))
+    return best[1]
+
+
+def _signature(path: str) -> Optional[Tuple[str, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return path, st.st_mtime_ns, st.st_size
+
+
+def _version_of(path: str) -> str:
+    match = re.search(r"\.(v\d+)\.onnx$", path)
+    if match:
+        return match.group(1)
+    signature = _signature(path)
+    return f"mtime-{signature[1] // 1_000_000_000}" if signature else "unknown"
+
+
+class ModelRegistry:
+    """Named models with lazy first load, atomic hot swaps and shadowing."""
+
+    def __init__(
+        self,
+        paths: Dict[str, str],
+        default_labels: Dict[str, List[str]],
+        loader: Loader,
+        warm_up: WarmUp,
+        warm_up_initial: bool = False,
+        shadow_sample_rate: float = 0.1,
+        validate: Validate = compatibility_problem,
+    ) -> None:
+        self.paths = dict(paths)
+        self.default_labels = default_labels
+        self.loader = loader
+        self.warm_up = warm_up
+        self.validate = validate
+        self.warm_up_initial = warm_up_initial
+        self.shadow_sample_rate = shadow_sample_rate
+
+        self._active: Dict[str, Optional[LoadedModel]] = {name: None for name in paths}
+        self._shadow: Dict[str, Optional[LoadedModel]] = {name: None for name in paths}
+        self._locks = {name: threading.Lock() for name in paths}
+        self._signatures: Dict[str, Optional[Tuple[str, int, int]]] = {name: None for name in paths}
+        self._pending: Dict[str, Optional[Tuple[str, int, int]]] = {}
+
+        # Served by /ready: pending -> loading -> ready, or missing / failed
+        self.status: Dict[str, Dict[str, Any]] = {name: {"state": "pending"} for name in paths}
+        self.shadow_stats: Dict[str, Dict[str, float]] = {}
+
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Serving
+    # ------------------------------------------------------------------
+
+    def get(self, name: str) -> Optional[LoadedModel]:
+        """The active model, loading it first if that has not happened yet."""
+        self.ensure(name)
+        return self._active[name]
+
+    def shadow(self, name: str) -> Optional[LoadedModel]:
+        return self._shadow[name]
+
+    def ensure(self, name: str) -> None:
+        """
+        Initial load of one model. Concurrent callers wait on the same load
+        instead of starting their own.
+        """
+        status = self.status[name]
+        if status["state"] in SETTLED_STATES:
+            return
+        with self._locks[name]:
+            if status["state"] in SETTLED_STATES:
+                return
+            status["state"] = "loading"
+            model = self._build(name, latest_version(self.paths[name]), self.warm_up_initial, status)
+            self._active[name] = model
+            if model is not None:
+                status["state"] = "ready"
+            elif os.path.exists(latest_version(self.paths[name])):
+                status["state"] = "failed"
+            else:
+                status["state"] = "missing"
+
+    def ready(self) -> bool:
+        return all(s["state"] in SETTLED_STATES for s in self.status.values())
+
+    def supersede(self, name: str, by: str) -> None:
+        """Never load ``name``: another model (``by``) serves its outputs."""
+        with self._locks[name]:
+            if self.status[name]["state"] == "pending":
+                self.status[name].update(state="superseded", by=by)
+
+    # ------------------------------------------------------------------
+    # Hot swap
+    # ------------------------------------------------------------------
+
+    def reload(self, name: str, path: Optional[str] = None, shadow: bool = False) -> Optional[LoadedModel]:
+        """
+        Build and warm a new session for ``name`` from ``path`` (default:
+        the newest version), then swap it in, or install it as the shadow.
+        Returns the new model, or None when it could not be loaded or is not
+        compatible with the serving one (which is then left untouched).
+        """
+        path = path or latest_version(self.paths[name])
+        with self._locks[name]:
+            timings: Dict[str, Any] = {}
+            model = self._build(name, path, True, timings, validate=True)
+            if model is None:
+                return None
+            if shadow:
+                self._shadow[name] = model
+                self.shadow_stats[name] = {
+                    **timings,
+                    "runs": 0,
+                    "active_seconds": 0.0,
+                    "shadow_seconds": 0.0,
+                    "compared": 0,
+                    "agreed": 0,
+                    "classifier": False,
+                    "abs_diff_sum": 0.0,
+                }
+                print(f"[AI] Shadowing {name} model {model.version} ({path})")
+            else:
+                self._active[name] = model
+                self.status[name].pop("first_run_seconds", None)
+                self.status[name].update(timings)
+                self.status[name]["state"] = "ready"
+                self.status[name]["swaps"] = self.status[name].get("swaps", 0) + 1
+                print(f"[AI] Swapped in {name} model {model.version} ({path})")
+            return model
+
+    def incompatibility(self, name: str, path: str, session: Any) -> Optional[str]:
+        """Why ``session`` (loaded from ``path``) can't replace the serving ``name`` model."""
+        current = self._active[name]
+        if current is None:
+            # Nothing is served yet, so there is nothing to stay compatible with
+            return None
+        return self.validate(current, path, session)
+
+    def reload_in_background(self, name: str, path: Optional[str] = None, shadow: bool = False) -> None:
+        threading.Thread(
+            target=self.reload, args=(name, path, shadow), name=f"reload-{name}", daemon=True
+        ).start()
+
+    def promote(self, name: str) -> Optional[LoadedModel]:
+        """Make the shadow model the active one."""
+        with self._locks[name]:
+            model = self._shadow[name]
+            if model is not None:
+                self._active[name] = model
+                self._shadow[name] = None
+                self.status[name]["state"] = "ready"
+                self.status[name]["swaps"] = self.status[name].get("swaps", 0) + 1
+                self.status[name].update({
+                    "path": model.path,
+                    "version": model.version,
+                    "labels": model.labels,
+                    "create_seconds": self.shadow_stats.get(name, {}).get("create_seconds"),
+                    "warmup_seconds": self.shadow_stats.get(name, {}).get("warmup_seconds"),
+                })
+                self.status[name].pop("first_run_seconds", None)
+                if model.input_spec is not None:
+                    self.status[name]["input"] = _describe(model.input_spec)
+                print(f"[AI] Promoted shadow {name} model {model.version}")
+            return model
+
+    def discard_shadow(self, name: str) -> None:
+        with self._locks[name]:
+            self._shadow[name] = None
+
+    def record_shadow(
+        self,
+        name: str,
+        active_seconds: float,
+        shadow_seconds: float,
+        active_out: Any,
+        shadow_out: Any,
+        classifier: bool,
+    ) -> None:
+        """Fold one side-by-side run of the active and shadow models."""
+        stats = self.shadow_stats.get(name)
+        if stats is None:
+            return
+        stats["runs"] += 1
+        stats["active_seconds"] += active_seconds
+        stats["shadow_seconds"] += shadow_seconds
+        width = min(active_out.shape[-1], shadow_out.shape[-1])
+        a, b = active_out[..., :width], shadow_out[..., :width]
+        if a.shape == b.shape:
+            rows = a.reshape(-1, width).shape[0]
+            stats["compared"] += rows
+            stats["abs_diff_sum"] += float(abs(a - b).mean(axis=-1).sum())
+            if classifier:
+                stats["classifier"] = True
+                stats["agreed"] += int((a.argmax(axis=-1) == b.argmax(axis=-1)).sum())
+
+    # ------------------------------------------------------------------
+    # Watching models/
+    # ------------------------------------------------------------------
+
+    def start_watching(self, interval: float, shadow: bool = False) -> None:
+        """Poll model files every ``interval`` seconds (0 disables)."""
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+
+        def watch() -> None:
+            while not self._stop.wait(interval):
+                for name in self.paths:
+                    try:
+                        self._check(name, shadow)
+                    except Exception as exc:
+                        print(f"[AI] Model watch for {name} failed: {exc}")
+
+        self._watcher = threading.Thread(target=watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+        self._watcher = None
+
+    def _check(self, name: str, shadow: bool) -> None:
+        state = self.status[name]["state"]
+        if state not in SETTLED_STATES or state == "superseded":
+            return  # initial load not done (or in progress), or never wanted
+        signature = _signature(latest_version(self.paths[name]))
+        if signature is None or signature == self._signatures[name]:
+            self._pending.pop(name, None)
+            return
+        if self._pending.get(name) != signature:
+            # Changed since the last poll; wait until the file is stable
+            self._pending[name] = signature
+            return
+        self._pending.pop(name, None)
+        if self.reload(name, signature[0], shadow=shadow) is None:
+            # Don't retry a broken file every poll; wait for the next change
+            self._signatures[name] = signature
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _build(
+        self, name: str, path: str, warm: bool, status: Dict[str, Any], validate: bool = False
+    ) -> Optional[LoadedModel]:
+        """
+        Create (and optionally warm) a session, timing it into ``status``.
+        With ``validate``, a session that can't replace the serving model
+        is dropped before warm-up.
+        """
+        self._signatures[name] = _signature(path)
+
+        started = time.perf_counter()
+        session = self.loader(path, name)
+        status["create_seconds"] = time.perf_counter() - started
+        if session is None:
+            return None
+        if validate:
+            problem = self.incompatibility(name, path, session)
+            if problem is not None:
+                print(f"[AI] Rejected {name} model {path}: {problem}")
+                return None
+        spec = input_spec(path, session)
+        if warm:
+            started = time.perf_counter()
+            self.warm_up(name, session, spec)
+            status["warmup_seconds"] = time.perf_counter() - started
+
+        model = LoadedModel(
+            name=name,
+            path=path,
+            version=_version_of(path),
+            session=session,
+            labels=model_labels(path, session, self.default_labels.get(name, [])),
+            input_spec=spec,
+        )
+        status.update({"path": model.path, "version": model.version, "labels": model.labels})
+        if spec is not None:
+            status["input"] = _describe(spec)
+        status.pop("first_run_seconds", None)
+        return model
+
+    def stats(self) -> Dict[str, Any]:
+        report: Dict[str, Any] = {}
+        for name in self.paths:
+            shadow = self._shadow[name]
+            entry: Dict[str, Any] = dict(self.status[name])
+            if shadow is not None:
+                stats = self.shadow_stats.get(name, {})
+                runs = stats.get("runs", 0)
+                compared = stats.get("compared", 0)
+                entry["shadow"] = {
+                    "path": shadow.path,
+                    "version": shadow.version,
+                    "runs": runs,
+                    "active_mean_seconds": stats["active_seconds"] / runs if runs else None,
+                    "shadow_mean_seconds": stats["shadow_seconds"] / runs if runs else None,
+                    "mean_abs_diff": stats["abs_diff_sum"] / compared if compared else None,
+                    "top1_agreement": (
+                        stats["agreed"] / compared if compared and stats["classifier"] else None
+                    ),
+                }
+            report[name] = entry
+        return report
@@ -0,0 +1,189 @@
+"""
+Per-model ONNX Runtime execution profiles.
+
+Each model (vision, emotion, attention, speech) gets a profile controlling
+its SessionOptions: thread counts, graph optimization level, execution mode
+and memory arena behaviour. Profiles are resolved in this order, later sources
+winning:
+
+  1. Built-in defaults. The cores are split across the inference workers
+     and the three sessions each of them drives, so that workers x 3 x
+     intra-op threads stays within the CPU count (1 thread per session as
+     soon as there are several workers on a typical machine).
+  2. The "default" section, then the model's section, of the JSON file at
+     ORT_PROFILES_PATH (default: ort_profiles.json), e.g.
+
+         {"default": {"inter_op_num_threads": 1},
+          "emotion": {"intra_op_num_threads": 2}}
+
+  3. Environment variables named <MODEL>_ORT_<KEY>, for example
+     EMOTION_ORT_INTRA_OP_NUM_THREADS=2 or SPEECH_ORT_EXECUTION_MODE=parallel.
+
+When ``save_optimized_model`` is on (it is off by default), the optimized
+graph is written next to the model on first load and reused on later
+startups so graph optimization is skipped. Only the portable "extended"
+optimizations are serialized: at level "all" the cached graph is loaded and
+the hardware-specific layout passes run again at startup. The cache file is
+keyed by the optimization level, the ONNX Runtime version and the CPU, so a
+graph optimized on another machine or runtime is never picked up.
+"""
+
+import hashlib
+import json
+import os
+import platform
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+import onnxruntime as ort
+
+ORT_PROFILES_PATH = os.getenv("ORT_PROFILES_PATH", "ort_profiles.json")
+
+# Number of sessions sharing the machine's cores by default
+_SESSION_COUNT = 3
+
+
+def default_intra_op_threads(workers: int = 1) -> int:
+    """Intra-op threads per session so ``workers`` concurrent workers fit the cores."""
+    return max(1, (os.cpu_count() or 1) // (_SESSION_COUNT * max(1, workers)))
+
+
+DEFAULT_PROFILE: Dict[str, Any] = {
+    "intra_op_num_threads": default_intra_op_threads(),
+    "inter_op_num_threads": 1,
+    "graph_optimization_level": "all",
+    "execution_mode": "sequential",
+    "enable_cpu_mem_arena": True,
+    "enable_mem_pattern": True,
+    "allow_spinning": False,
+    "save_optimized_model": False,
+}
+
+_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+_EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+def _coerce(value: str, default: Any) -> Any:
+    """Convert an environment string to the type of the default value."""
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        return int(value)
+    return value.strip().lower()
+
+
+def _load_profile_file(path: str) -> Dict[str, Dict[str, Any]]:
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as exc:
+        print(f"[AI] Ignoring unreadable ORT profile file {path}: {exc}")
+        return {}
+
+
+def get_profile(model_name: str, workers: int = 1) -> Dict[str, Any]:
+    """
+    Resolve the runtime profile for a model (see module docstring), with
+    the default thread count sized for ``workers`` concurrent inference workers.
+    """
+    profile = dict(DEFAULT_PROFILE, intra_op_num_threads=default_intra_op_threads(workers))
+
+    file_profiles = _load_profile_file(ORT_PROFILES_PATH)
+    profile.update(file_profiles.get("default", {}))
+    profile.update(file_profiles.get(model_name, {}))
+
+    prefix = f"{model_name.upper()}_ORT_"
+    for key, default in DEFAULT_PROFILE.items():
+        value = os.getenv(prefix + key.upper())
+        if value is not None:
+            profile[key] = _coerce(value, default)
+
+    return profile
+
+
+def _saved_level(profile: Dict[str, Any]) -> str:
+    """The optimization level a cached graph is saved at (at most "extended")."""
+    level = profile["graph_optimization_level"]
+    return "extended" if level == "all" else level
+
+
+@lru_cache(maxsize=1)
+def environment_key() -> str:
+    """Short digest of the ONNX Runtime version and the CPU it runs on."""
+    cpu = platform.processor()
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            # The model name and feature flags of the first core
+            cpu = "".join(
+                line for line in f if line.startswith(("model name", "flags", "Features"))
+            )
+    except OSError:
+        pass
+    identity = f"{ort.__version__}|{platform.machine()}|{cpu}"
+    return hashlib.sha256(identity.encode()).hexdigest()[:12]
+
+
+def optimized_model_path(path: str, profile: Dict[str, Any]) -> str:
+    """Where the optimized graph for ``path`` is cached under this profile."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{_saved_level(profile)}.{environment_key()}.optimized{ext or '.onnx'}"
+
+
+def _write_optimized_model(path: str, cached: str, level: ort.GraphOptimizationLevel) -> bool:
+    """Optimize ``path`` at ``level`` into ``cached``; False when that fails."""
+    options = ort.SessionOptions()
+    options.graph_optimization_level = level
+    options.optimized_model_filepath = cached
+    try:
+        ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+    except Exception as exc:
+        # e.g. a read-only models directory: serve without the cache
+        print(f"[AI] Could not save optimized graph {cached}: {exc}")
+        return False
+    return os.path.exists(cached)
+
+
+def build_session_options(path: str, profile: Dict[str, Any]) -> Tuple[str, ort.SessionOptions]:
+    """
+    Build SessionOptions for a profile.
+
+    Returns the path that should actually be loaded: the cached optimized
+    graph (written first if it is missing or older than the model), else the
+    original model when caching is off or the cache could not be written.
+    """
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = int(profile["intra_op_num_threads"])
+    options.inter_op_num_threads = int(profile["inter_op_num_threads"])
+    options.execution_mode = _EXECUTION_MODES[profile["execution_mode"]]
+    options.enable_cpu_mem_arena = bool(profile["enable_cpu_mem_arena"])
+    options.enable_mem_pattern = bool(profile["enable_mem_pattern"])
+    options.add_session_config_entry(
+        "session.intra_op.allow_spinning", "1" if profile["allow_spinning"] else "0"
+    )
+
+    level = _OPTIMIZATION_LEVELS[profile["graph_optimization_level"]]
+    load_path = path
+
+    if profile["save_optimized_model"] and level != ort.GraphOptimizationLevel.ORT_DISABLE_ALL:
+        cached = optimized_model_path(path, profile)
+        saved_level = _OPTIMIZATION_LEVELS[_saved_level(profile)]
+        fresh = os.path.exists(cached) and os.path.getmtime(cached) >= os.path.getmtime(path)
+        if fresh or _write_optimized_model(path, cached, saved_level):
+            load_path = cached
+            # Only the layout passes of level "all" (never serialized) are left
+            if level == saved_level:
+                level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+
+    options.graph_optimization_level = level
+    return load_path, options
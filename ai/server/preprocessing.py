@@ -0,0 +1,172 @@
+"""
+Allocation-free frame preprocessing for the vision models.
+
+The original path allocated a new array at every step (decode, cvtColor,
+resize, astype, /255, transpose, expand_dims) and produced a non-contiguous
+tensor that ONNX Runtime then copied again. Here:
+
+  * JPEGs much larger than the model input are decoded at reduced scale
+    (IMREAD_REDUCED_COLOR_2/4/8), which skips most of the IDCT work.
+  * The resize writes into a caller-supplied uint8 buffer.
+  * Colour swap (BGR -> RGB), HWC -> CHW transpose, float conversion and
+    /255 normalisation are fused into one ufunc pass that writes straight
+    into a slot of a preallocated, contiguous NCHW float32 batch buffer
+    (``write_input`` does the same for NHWC and grayscale models).
+
+Batch buffers are kept per worker thread, so concurrent batches never share
+memory and nothing is reallocated between batches of the same shape.
+"""
+
+import threading
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+_INV_255 = np.float32(1.0 / 255.0)
+
+# Reduced-scale decode flags, largest reduction first
+_REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# JPEG start-of-frame markers carrying the image dimensions
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+_local = threading.local()
+
+
+def jpeg_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from a JPEG header without decoding it."""
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+
+    i = 2
+    n = len(data)
+    while i + 4 <= n:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # Fill byte
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        length = (data[i + 2] << 8) | data[i + 3]
+        if marker in _SOF_MARKERS:
+            if i + 9 > n:
+                return None
+            height = (data[i + 5] << 8) | data[i + 6]
+            width = (data[i + 7] << 8) | data[i + 8]
+            return width, height
+        i += 2 + length
+    return None
+
+
+def decode_frame(frame_bytes: bytes, min_side: int = 0) -> np.ndarray:
+    """
+    Decode an image to BGR uint8, at reduced scale when possible.
+
+    For JPEGs, the largest power-of-two reduction whose shorter side is still
+    at least ``min_side`` pixels is used. Other formats decode at full size.
+    """
+    flag = cv2.IMREAD_COLOR
+    if min_side > 0:
+        dims = jpeg_dimensions(frame_bytes)
+        if dims is not None:
+            shorter = min(dims)
+            for factor, reduced_flag in _REDUCED_DECODE_FLAGS:
+                if shorter // factor >= min_side:
+                    flag = reduced_flag
+                    break
+
+    img = cv2.imdecode(np.frombuffer(frame_bytes, np.uint8), flag)
+    if img is None:
+        raise ValueError("Could not decode image")
+    return img
+
+
+def resize_frame(img: np.ndarray, size: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Resize a BGR image to (size, size), writing into ``out`` if given."""
+    if out is None:
+        out = np.empty((size, size, 3), dtype=np.uint8)
+    cv2.resize(img, (size, size), dst=out, interpolation=cv2.INTER_LINEAR)
+    return out
+
+
+def write_nchw(bgr: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """
+    Fused BGR->RGB, HWC->CHW and [0, 1] normalisation into ``out`` [3, H, W].
+
+    The source is only viewed (channel reversal and transpose are strides),
+    so the single multiply is the only pass over the data.
+    """
+    np.multiply(bgr[:, :, ::-1].transpose(2, 0, 1), _INV_255, out=out, casting="unsafe")
+    return out
+
+
+def write_input(
+    bgr: np.ndarray,
+    out: np.ndarray,
+    layout: str = "NCHW",
+    channels: int = 3,
+    scale: float = 1.0 / 255.0,
+) -> np.ndarray:
+    """
+    Like write_nchw, for any model layout ("NCHW" / "NHWC"), RGB or
+    grayscale (``channels`` 1) input and pixel ``scale``.
+    """
+    if channels == 1:
+        gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+        src = gray[np.newaxis] if layout == "NCHW" else gray[:, :, np.newaxis]
+    else:
+        rgb = bgr[:, :, ::-1]
+        src = rgb.transpose(2, 0, 1) if layout == "NCHW" else rgb
+    np.multiply(src, np.float32(scale), out=out, casting="unsafe")
+    return out
+
+
+def standardize(
+    batch: np.ndarray,
+    layout: str = "NCHW",
+    mean: Tuple[float, ...] = (),
+    std: Tuple[float, ...] = (),
+) -> np.ndarray:
+    """Subtract per-channel ``mean`` and divide by ``std`` in place (either may be empty)."""
+    # Broadcast along the channel axis
+    stats_shape = (1, -1, 1, 1) if layout == "NCHW" else (1, 1, 1, -1)
+    if mean:
+        batch -= np.asarray(mean, dtype=np.float32).reshape(stats_shape)
+    if std:
+        batch /= np.asarray(std, dtype=np.float32).reshape(stats_shape)
+    return batch
+
+
+def batch_buffer(batch_size: int, size: int, shape: Optional[Tuple[int, int, int]] = None) -> np.ndarray:
+    """
+    Return this thread's contiguous [batch_size, *shape] float32 buffer
+    (shape defaults to NCHW RGB: (3, size, size)).
+
+    There is one buffer per sample shape; each grows to the largest batch
+    seen and is reused afterwards. Callers must finish with it before
+    preprocessing the next batch of that shape.
+    """
+    shape = shape or (3, size, size)
+    buffers = getattr(_local, "batches", None)
+    if buffers is None:
+        buffers = _local.batches = {}
+    buf = buffers.get(shape)
+    if buf is None or buf.shape[0] < batch_size:
+        buf = buffers[shape] = np.empty((batch_size,) + shape, dtype=np.float32)
+    return buf[:batch_size]
+
+
+def preprocess_frame(frame_bytes: bytes, size: int = 64) -> np.ndarray:
+    """Decode and resize one frame to a (size, size, 3) BGR uint8 image."""
+    # Keep at least 2x the target resolution so the bilinear resize doesn't alias
+    img = decode_frame(frame_bytes, min_side=size * 2)
+    return resize_frame(img, size)
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Quantize Cognicare ONNX Models to INT8
+Produces dynamic- and static-INT8 variants of the emotion and speech models
+next to the float32 originals, and reports accuracy/latency against them.
+
+Usage:
+  python quantize_models.py                      # quantize emotion + speech
+  python quantize_models.py --report             # quantize, then compare
+  python quantize_models.py --speech-calibration-dir data/ravdess
+
+Static INT8 for the emotion model is calibrated on a sample of FER2013 rows
+(loaded through fer2013.py), preprocessed for the model's InputSpec as the
+server does. Static INT8 for the speech model needs WAV files to calibrate
+on; they are turned into the log-mel (or MFCC) context windows the server
+feeds the model, using the same SPEECH_* settings as main.py. Without
+--speech-calibration-dir only the dynamic speech variant is produced.
+
+Set PREFER_QUANTIZED_MODELS=static|dynamic|auto for main.py to pick up the
+quantized files when they exist.
+"""
+
+import argparse
+import glob
+import os
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+EMOTION_MODEL_PATH = "models/emotion_emotionnet.onnx"
+SPEECH_MODEL_PATH = "models/speech_ravdess.onnx"
+FER2013_CSV_PATH = "data/fer2013/fer2013.csv"
+
+QUANTIZATION_MODES = ("static", "dynamic")
+
+
+def quantized_model_path(path: str, mode: str) -> str:
+    """models/x.onnx -> models/x.int8-<mode>.onnx"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.int8-{mode}{ext or '.onnx'}"
+
+
+# ---------------------------------------------------------------------------
+# Calibration data
+# ---------------------------------------------------------------------------
+
+def _model_session(model_path: str):
+    import onnxruntime as ort
+
+    return ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+
+
+def fer2013_inputs(
+    model_path: str, csv_path: str, usage: str, limit: int
+) -> Tuple[List[np.ndarray], List[str]]:
+    """
+    Up to ``limit`` FER2013 rows of one Usage split as single-image inputs
+    preprocessed like the server does for this model (its sidecar or graph
+    InputSpec), with their emotion names.
+    """
+    from fer2013 import USAGES, load_fer2013, resize_batch
+    from model_registry import InputSpec, input_spec
+    from preprocessing import standardize, write_input
+    from train import FER2013_LABELS
+
+    spec = input_spec(model_path, _model_session(model_path)) or InputSpec()
+    size = spec.size or 64
+    data = load_fer2013(csv_path)
+    rows = np.flatnonzero(data.usage == USAGES.index(usage))[:limit]
+
+    inputs = []
+    for gray in resize_batch(data.images[rows], size):
+        sample = np.empty((1,) + spec.shape(size), dtype=np.float32)
+        write_input(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR), sample[0], spec.layout, spec.channels, spec.scale)
+        inputs.append(standardize(sample, spec.layout, spec.mean, spec.std))
+    return inputs, [FER2013_LABELS[label] for label in data.labels[rows]]
+
+
+def speech_frontend():
+    """The server's speech frontend: same SPEECH_* settings and defaults as main.py."""
+    from audio_features import MelFrontend
+
+    return MelFrontend(
+        sample_rate=int(os.getenv("SPEECH_SAMPLE_RATE", "16000")),
+        n_fft=int(os.getenv("SPEECH_N_FFT", "400")),
+        hop_length=int(os.getenv("SPEECH_HOP_LENGTH", "160")),
+        n_mels=int(os.getenv("SPEECH_N_MELS", "64")),
+        n_mfcc=int(os.getenv("SPEECH_N_MFCC", "0")),
+        deltas=os.getenv("SPEECH_DELTAS", "off").lower() in ("1", "on", "true", "yes"),
+        context_frames=int(os.getenv("SPEECH_CONTEXT_FRAMES", "100")),
+    )
+
+
+def wav_feature_windows(path: str, frontend, input_rank: int) -> List[np.ndarray]:
+    """
+    A WAV file as speech model inputs: consecutive context windows of its
+    log-mel (or MFCC) frames, each shaped as the server feeds the model.
+    """
+    from audio_decoding import decode_audio
+
+    with open(path, "rb") as f:
+        pcm = decode_audio(f.read(), frontend.sample_rate)
+    state = frontend.new_state()
+    windows = []
+    for start in range(0, max(len(pcm), 1), frontend.context_frames * frontend.hop_length):
+        frontend.process(pcm[start : start + frontend.context_frames * frontend.hop_length] / 32768.0, state)
+        window = frontend.context_window(state)
+        if input_rank == 4:
+            windows.append(window[None, None])
+        elif input_rank == 2:
+            windows.append(window.reshape(1, -1))
+        else:
+            windows.append(window[None])
+    return windows
+
+
+def _calibration_reader(input_name: str, samples: List[np.ndarray]):
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class _ListReader(CalibrationDataReader):
+        def __init__(self) -> None:
+            self._iter = iter(samples)
+
+        def get_next(self):
+            sample = next(self._iter, None)
+            return None if sample is None else {input_name: sample}
+
+    return _ListReader()
+
+
+# ---------------------------------------------------------------------------
+# Quantization
+# ---------------------------------------------------------------------------
+
+def quantize_dynamic_model(model_path: str) -> str:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    output_path = quantized_model_path(model_path, "dynamic")
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+    print(f"✅ Dynamic INT8: {output_path}")
+    return output_path
+
+
+def quantize_static_model(model_path: str, samples: List[np.ndarray]) -> str:
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+
+    input_name = _model_session(model_path).get_inputs()[0].name
+    output_path = quantized_model_path(model_path, "static")
+    quantize_static(
+        model_path,
+        output_path,
+        _calibration_reader(input_name, samples),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+    print(f"✅ Static INT8 ({len(samples)} calibration samples): {output_path}")
+    return output_path
+
+
+def emotion_calibration_samples(model_path: str, csv_path: str, limit: int) -> List[np.ndarray]:
+    return fer2013_inputs(model_path, csv_path, "Training", limit)[0]
+
+
+def speech_calibration_samples(model_path: str, wav_dir: str, limit: int) -> List[np.ndarray]:
+    input_rank = len(_model_session(model_path).get_inputs()[0].shape)
+    frontend = speech_frontend()
+    samples: List[np.ndarray] = []
+    for path in sorted(glob.glob(os.path.join(wav_dir, "**", "*.wav"), recursive=True)):
+        samples.extend(wav_feature_windows(path, frontend, input_rank))
+        if len(samples) >= limit:
+            break
+    return samples[:limit]
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+def _rss_mb() -> float:
+    """Resident set size of this process in MB (Linux only, else 0)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return 0.0
+
+
+def benchmark_model(
+    model_path: str,
+    inputs: List[np.ndarray],
+    labels: Optional[List[str]] = None,
+    class_names: Optional[List[str]] = None,
+) -> dict:
+    """
+    Measure load RSS, mean latency per input and (optionally) accuracy: the
+    top output's name in ``class_names`` (the model's labels) against the
+    expected ``labels``.
+    """
+    import onnxruntime as ort
+
+    rss_before = _rss_mb()
+    session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+    rss_after = _rss_mb()
+    input_name = session.get_inputs()[0].name
+
+    # Warm up allocator and kernels before timing
+    session.run(None, {input_name: inputs[0]})
+
+    correct = 0
+    start = time.perf_counter()
+    for i, sample in enumerate(inputs):
+        output = session.run(None, {input_name: sample})[0][0]
+        if labels is not None and class_names:
+            predicted = class_names[int(np.argmax(output[: len(class_names)]))]
+            correct += predicted == labels[i]
+    elapsed = time.perf_counter() - start
+
+    return {
+        "size_mb": os.path.getsize(model_path) / (1024 * 1024),
+        "rss_mb": rss_after - rss_before,
+        "latency_ms": elapsed / len(inputs) * 1000,
+        "accuracy": correct / len(inputs) if labels is not None else None,
+    }
+
+
+def print_report(title: str, results: List[Tuple[str, dict]]) -> None:
+    print(f"\n📊 {title}")
+    print(f"   {'variant':<13} {'size MB':>8} {'load RSS MB':>12} {'ms/input':>9} {'accuracy':>9}")
+    for name, r in results:
+        accuracy = f"{r['accuracy']:.2%}" if r["accuracy"] is not None else "-"
+        print(
+            f"   {name:<13} {r['size_mb']:>8.2f} {r['rss_mb']:>12.1f} "
+            f"{r['latency_ms']:>9.3f} {accuracy:>9}"
+        )
+
+
+def report_emotion(model_path: str, csv_path: str, limit: int) -> None:
+    from model_registry import model_labels
+    from train import FER2013_LABELS
+
+    inputs, labels = fer2013_inputs(model_path, csv_path, "PublicTest", limit)
+    # Quantized variants keep the float model's outputs, so its labels apply
+    class_names = model_labels(model_path, _model_session(model_path), FER2013_LABELS)
+
+    results = [("float32", benchmark_model(model_path, inputs, labels, class_names))]
+    for mode in QUANTIZATION_MODES:
+        path = quantized_model_path(model_path, mode)
+        if os.path.exists(path):
+            results.append((f"int8-{mode}", benchmark_model(path, inputs, labels, class_names)))
+    print_report(f"Emotion model on {len(inputs)} FER2013 PublicTest rows", results)
+
+
+def report_speech(model_path: str, samples: List[np.ndarray]) -> None:
+    results = [("float32", benchmark_model(model_path, samples))]
+    for mode in QUANTIZATION_MODES:
+        path = quantized_model_path(model_path, mode)
+        if os.path.exists(path):
+            results.append((f"int8-{mode}", benchmark_model(path, samples)))
+    print_report(f"Speech model on {len(samples)} inputs", results)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Quantize Cognicare ONNX models to INT8")
+    parser.add_argument("--emotion-model", default=EMOTION_MODEL_PATH)
+    parser.add_argument("--speech-model", default=SPEECH_MODEL_PATH)
+    parser.add_argument("--fer2013", default=FER2013_CSV_PATH)
+    parser.add_argument("--speech-calibration-dir", default=None)
+    parser.add_argument("--calibration-samples", type=int, default=500)
+    parser.add_argument("--report", action="store_true", help="Compare float32 and INT8 variants")
+    parser.add_argument("--report-samples", type=int, default=1000)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🤖 Cognicare INT8 Model Quantization")
+    print("=" * 60)
+
+    if os.path.exists(args.emotion_model):
+        print(f"\n📦 Emotion model: {args.emotion_model}")
+        quantize_dynamic_model(args.emotion_model)
+        if os.path.exists(args.fer2013):
+            samples = emotion_calibration_samples(
+                args.emotion_model, args.fer2013, args.calibration_samples
+            )
+            quantize_static_model(args.emotion_model, samples)
+        else:
+            print(f"⚠️  {args.fer2013} not found, skipping static INT8 calibration")
+    else:
+        print(f"⚠️  Emotion model not found: {args.emotion_model}")
+
+    speech_samples: List[np.ndarray] = []
+    if os.path.exists(args.speech_model):
+        print(f"\n📦 Speech model: {args.speech_model}")
+        quantize_dynamic_model(args.speech_model)
+        if args.speech_calibration_dir:
+            speech_samples = speech_calibration_samples(
+                args.speech_model, args.speech_calibration_dir, args.calibration_samples
+            )
+        if speech_samples:
+            quantize_static_model(args.speech_model, speech_samples)
+        else:
+            print("⚠️  No speech calibration WAVs, skipping static INT8 for speech")
+    else:
+        print(f"⚠️  Speech model not found: {args.speech_model}")
+
+    if args.report:
+        if os.path.exists(args.emotion_model) and os.path.exists(args.fer2013):
+            report_emotion(args.emotion_model, args.fer2013, args.report_samples)
+        if os.path.exists(args.speech_model) and speech_samples:
+            report_speech(args.speech_model, speech_samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Incremental per-session aggregation of frame and audio analyses.
+
+Instead of the client holding every FrameAnalysis/AudioAnalysis and posting
+the full lists to /session/finalize, the server folds each result into a
+fixed-size SessionAccumulator as soon as it is produced. Finalizing a
+session then only reads a handful of running sums.
+
+Sessions that are never finalized are evicted after ``ttl_seconds`` of
+inactivity, and the store holds at most ``max_sessions`` accumulators
+(least recently updated evicted first), which bounds its memory.
+"""
+
+import sys
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from gaze import GazeAccumulator
+from loudness import LoudnessTrend
+
+HISTOGRAM_BINS = 10
+
+
+def _bin(value: float) -> int:
+    """Histogram bin for a score in [0, 1]."""
+    return min(HISTOGRAM_BINS - 1, max(0, int(value * HISTOGRAM_BINS)))
+
+
+def _histogram(values: np.ndarray) -> np.ndarray:
+    """Vectorised _bin + count over an array of scores."""
+    bins = np.clip((values * HISTOGRAM_BINS).astype(np.int64), 0, HISTOGRAM_BINS - 1)
+    return np.bincount(bins, minlength=HISTOGRAM_BINS)
+
+
+class SessionAccumulator:
+    """Running sums for one game session; O(1) to update and to finalize."""
+
+    __slots__ = (
+        "frame_count",
+        "engagement_sum",
+        "attention_sum",
+        "emotion_totals",
+        "gaze",
+        "engagement_histogram",
+        "attention_histogram",
+        "audio_count",
+        "speech_counts",
+        "loudness",
+        "created_at",
+        "updated_at",
+        "last_frame_at",
+    )
+
+    def __init__(self) -> None:
+        self.frame_count = 0
+        self.engagement_sum = 0.0
+        self.attention_sum = 0.0
+        self.emotion_totals: Dict[str, float] = {}
+        self.gaze = GazeAccumulator()
+        self.engagement_histogram = [0] * HISTOGRAM_BINS
+        self.attention_histogram = [0] * HISTOGRAM_BINS
+        self.audio_count = 0
+        self.speech_counts: Dict[str, int] = {}
+        self.loudness = LoudnessTrend()
+        self.created_at = self.updated_at = time.monotonic()
+        self.last_frame_at: Optional[float] = None
+
+    def add_frame(self, frame: Dict[str, Any]) -> None:
+        engagement = float(frame.get("engagement", 0.5))
+        attention = float(frame.get("attention", 0.5))
+
+        self.frame_count += 1
+        self.engagement_sum += engagement
+        self.attention_sum += attention
+        self.engagement_histogram[_bin(engagement)] += 1
+        self.attention_histogram[_bin(attention)] += 1
+
+        totals = self.emotion_totals
+        for emotion, value in (frame.get("emotions") or {}).items():
+            totals[emotion] = totals.get(emotion, 0.0) + value
+
+        now = time.monotonic()
+        gaze = frame.get("gaze_direction")
+        if gaze:
+            # The first frame has no interval before it, so it adds no time
+            dt = now - self.last_frame_at if self.last_frame_at is not None else 0.0
+            self.gaze.add(float(gaze.get("x", 0.5)), float(gaze.get("y", 0.5)), dt)
+
+        self.updated_at = self.last_frame_at = now
+
+    def add_frame_columns(
+        self,
+        engagement: np.ndarray,
+        attention: np.ndarray,
+        emotion_labels: Sequence[str] = (),
+        emotions: Optional[np.ndarray] = None,
+        gaze_x: Optional[np.ndarray] = None,
+        gaze_y: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Fold many frames at once using NumPy reductions.
+
+        ``emotions`` is an [n_frames, len(emotion_labels)] matrix; gaze
+        arrays, when given, have one entry per frame.
+        """
+        n = int(engagement.shape[0])
+        if n == 0:
+            return
+
+        self.frame_count += n
+        self.engagement_sum += float(engagement.sum())
+        self.attention_sum += float(attention.sum())
+        for i, count in enumerate(_histogram(engagement)):
+            self.engagement_histogram[i] += int(count)
+        for i, count in enumerate(_histogram(attention)):
+            self.attention_histogram[i] += int(count)
+
+        if emotions is not None and emotions.size:
+            totals = self.emotion_totals
+            for label, value in zip(emotion_labels, emotions.sum(axis=0)):
+                totals[label] = totals.get(label, 0.0) + float(value)
+
+        if gaze_x is not None and gaze_y is not None and gaze_x.size:
+            # No per-frame timing in posted payloads; the default cadence is used
+            self.gaze.add_arrays(gaze_x, gaze_y)
+
+        self.updated_at = time.monotonic()
+
+    def add_frame_dicts(self, frames: List[Dict[str, Any]]) -> None:
+        """Fold a list of FrameAnalysis dicts via the columnar path."""
+        if not frames:
+            return
+
+        engagement = np.fromiter(
+            (f.get("engagement", 0.5) for f in frames), dtype=np.float64, count=len(frames)
+        )
+        attention = np.fromiter(
+            (f.get("attention", 0.5) for f in frames), dtype=np.float64, count=len(frames)
+        )
+
+        # Emotion dicts have no fixed column order, so sum them per label
+        # and hand the totals over as a single-row matrix
+        totals: Dict[str, float] = {}
+        for frame in frames:
+            for label, value in (frame.get("emotions") or {}).items():
+                totals[label] = totals.get(label, 0.0) + value
+        emotions = np.array([list(totals.values())], dtype=np.float64)
+
+        gazes = [f["gaze_direction"] for f in frames if f.get("gaze_direction")]
+        gaze_x = np.fromiter((g.get("x", 0.5) for g in gazes), dtype=np.float64, count=len(gazes))
+        gaze_y = np.fromiter((g.get("y", 0.5) for g in gazes), dtype=np.float64, count=len(gazes))
+
+        self.add_frame_columns(engagement, attention, list(totals), emotions, gaze_x, gaze_y)
+
+    def add_audio_emotions(self, emotions: Iterable[str]) -> None:
+        """Fold many speech emotion labels at once."""
+        counts = Counter(emotions)
+        if not counts:
+            return
+        for emotion, count in counts.items():
+            self.speech_counts[emotion] = self.speech_counts.get(emotion, 0) + count
+        self.audio_count += sum(counts.values())
+        self.updated_at = time.monotonic()
+
+    def add_audio(self, chunk: Dict[str, Any]) -> None:
+        emotion = chunk.get("emotion", "neutral")
+        self.audio_count += 1
+        self.speech_counts[emotion] = self.speech_counts.get(emotion, 0) + 1
+        now = time.monotonic()
+        if chunk.get("dbfs") is not None:
+            self.loudness.add(
+                chunk["dbfs"],
+                chunk.get("peak_dbfs", chunk["dbfs"]),
+                (now - self.created_at) / 60.0,
+            )
+        self.updated_at = now
+
+    @property
+    def average_engagement(self) -> float:
+        return self.engagement_sum / self.frame_count if self.frame_count else 0.5
+
+    @property
+    def average_attention(self) -> float:
+        return self.attention_sum / self.frame_count if self.frame_count else 0.5
+
+    def emotion_distribution(self) -> Dict[str, float]:
+        total = sum(self.emotion_totals.values())
+        if total <= 0:
+            return dict(self.emotion_totals)
+        return {k: v / total for k, v in self.emotion_totals.items()}
+
+    def speech_distribution(self) -> Dict[str, float]:
+        total = sum(self.speech_counts.values())
+        if total <= 0:
+            return {}
+        return {k: v / total for k, v in self.speech_counts.items()}
+
+    def gaze_patterns(self) -> Dict[str, Any]:
+        return self.gaze.patterns()
+
+    def histograms(self) -> Dict[str, List[int]]:
+        return {
+            "engagement": list(self.engagement_histogram),
+            "attention": list(self.attention_histogram),
+        }
+
+    def approx_bytes(self) -> int:
+        """Rough memory footprint, used for store reporting."""
+        return (
+            sys.getsizeof(self)
+            + sys.getsizeof(self.emotion_totals)
+            + sys.getsizeof(self.speech_counts)
+            + 2 * sys.getsizeof(self.engagement_histogram)
+            + sys.getsizeof(self.gaze)
+            + sys.getsizeof(self.loudness)
+            + self.gaze.heatmap.nbytes
+        )
+
+
+class SessionStore:
+    """LRU + TTL bounded map of session_id -> SessionAccumulator."""
+
+    def __init__(self, ttl_seconds: float = 1800.0, max_sessions: int = 10000) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, SessionAccumulator]" = OrderedDict()
+        self._evicted_expired = 0
+        self._evicted_capacity = 0
+
+    def get(self, session_id: str) -> Optional[SessionAccumulator]:
+        self.evict_expired()
+        return self._sessions.get(session_id)
+
+    def _get_or_create(self, session_id: str) -> SessionAccumulator:
+        self.evict_expired()
+        acc = self._sessions.get(session_id)
+        if acc is None:
+            acc = SessionAccumulator()
+            self._sessions[session_id] = acc
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._evicted_capacity += 1
+        else:
+            self._sessions.move_to_end(session_id)
+        return acc
+
+    def add_frame(self, session_id: str, frame: Dict[str, Any]) -> None:
+        self._get_or_create(session_id).add_frame(frame)
+
+    def add_audio(self, session_id: str, chunk: Dict[str, Any]) -> None:
+        self._get_or_create(session_id).add_audio(chunk)
+
+    def pop(self, session_id: str) -> Optional[SessionAccumulator]:
+        return self._sessions.pop(session_id, None)
+
+    def evict_expired(self) -> None:
+        """Drop sessions idle for longer than the TTL (oldest are first)."""
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._sessions:
+            session_id, acc = next(iter(self._sessions.items()))
+            if acc.updated_at >= cutoff:
+                break
+            del self._sessions[session_id]
+            self._evicted_expired += 1
+
+    def stats(self) -> Dict[str, Any]:
+        self.evict_expired()
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "approx_bytes": sum(acc.approx_bytes() for acc in self._sessions.values()),
+            "evicted_expired": self._evicted_expired,
+            "evicted_capacity": self._evicted_capacity,
+        }
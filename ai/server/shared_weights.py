@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Share ONNX model weights between server processes through a memory map.
+
+Every uvicorn worker (and every process-pool worker) normally holds a
+private copy of each model's weights. With SHARED_WEIGHTS=on, a model that
+has been exported by this script is loaded as a weight-less graph plus a
+read-only np.memmap of its weights file; each initializer is handed to ONNX
+Runtime with SessionOptions.add_initializer, so all processes read the same
+page-cache pages and the weights are resident once per machine.
+
+ONNX Runtime normally pre-packs MatMul/Conv weights into private buffers
+in every process, which undoes the sharing, so shared sessions disable
+pre-packing by default. benchmarks/bench_workers.py measures all three
+setups. On a 1-core box with two models of 31 MB of weights each, 4 workers
+gave:
+
+    weights       frames/s   PSS MiB
+    private            666       660
+    shared+pack        614       709   (SHARED_WEIGHTS_PREPACK=on)
+    shared             346       468   (default)
+
+Pre-packed shared weights cost more memory than private ones. Only
+unpacked sharing stops the weights from being multiplied per worker (the
+rest of each process still is), at a throughput cost that depends on the
+model. Without memory pressure, leave SHARED_WEIGHTS
+off rather than turning SHARED_WEIGHTS_PREPACK on; rerun the benchmark on
+your own models and hardware before relying on either.
+
+Export (needs the ``onnx`` package, not required by the server itself):
+
+    python shared_weights.py models/emotion_emotionnet.onnx models/attention_gaze.onnx
+
+writes, next to each model:
+
+    <root>.shared.onnx     graph whose initializers point at external data
+    <root>.weights         all initializer bytes, 64-byte aligned
+    <root>.weights.json    name -> offset / dtype / shape index
+
+Serve with several workers:
+
+    SHARED_WEIGHTS=on uvicorn main:app --workers 4
+"""
+
+import argparse
+import json
+import os
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+ALIGNMENT = 64
+
+
+def shared_paths(model_path: str) -> Tuple[str, str, str]:
+    """(graph, weights, index) paths of the shared export of ``model_path``."""
+    root = os.path.splitext(model_path)[0]
+    return f"{root}.shared.onnx", f"{root}.weights", f"{root}.weights.json"
+
+
+def has_fresh_export(model_path: str) -> bool:
+    graph, weights, index = shared_paths(model_path)
+    if not all(os.path.exists(p) for p in (graph, weights, index)):
+        return False
+    return os.path.getmtime(index) >= os.path.getmtime(model_path)
+
+
+def attach_shared_weights(
+    options: Any, model_path: str, prepack: bool = False
+) -> Optional[Tuple[str, List[Any]]]:
+    """
+    Register memory-mapped initializers for ``model_path`` on ``options``.
+
+    Returns (graph path to load, objects that must outlive the session), or
+    None when the model has no up-to-date shared export.
+    """
+    import onnxruntime as ort
+
+    if not has_fresh_export(model_path):
+        return None
+    graph, weights, index = shared_paths(model_path)
+    with open(index, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+
+    mapped = np.memmap(weights, dtype=np.uint8, mode="r")
+    keepalive: List[Any] = [mapped]
+    for name, entry in entries.items():
+        array = np.ndarray(
+            shape=tuple(entry["shape"]),
+            dtype=np.dtype(entry["dtype"]),
+            buffer=mapped,
+            offset=int(entry["offset"]),
+        )
+        value = ort.OrtValue.ortvalue_from_numpy(array)
+        options.add_initializer(name, value)
+        keepalive.append(value)
+
+    if not prepack:
+        options.add_session_config_entry("session.disable_prepacking", "1")
+    return graph, keepalive
+
+
+def export_shared_weights(model_path: str) -> None:
+    """Split ``model_path`` into a weight-less graph and an aligned weights file."""
+    import onnx
+    from onnx import numpy_helper
+    from onnx.external_data_helper import set_external_data
+
+    graph_path, weights_path, index_path = shared_paths(model_path)
+    model = onnx.load(model_path)
+
+    index = {}
+    offset = 0
+    with open(weights_path, "wb") as out:
+        for tensor in model.graph.initializer:
+            array = numpy_helper.to_array(tensor)
+            padding = (-offset) % ALIGNMENT
+            out.write(b"\0" * padding)
+            offset += padding
+
+            data = np.ascontiguousarray(array).tobytes()
+            out.write(data)
+            index[tensor.name] = {
+                "offset": offset,
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+            }
+            for field in ("float_data", "int32_data", "int64_data", "double_data", "uint64_data"):
+                tensor.ClearField(field)
+            tensor.raw_data = data  # set_external_data expects raw_data
+            set_external_data(tensor, os.path.basename(weights_path), offset, len(data))
+            tensor.ClearField("raw_data")
+            tensor.data_location = onnx.TensorProto.EXTERNAL
+            offset += len(data)
+
+    onnx.save(model, graph_path)
+    # Written last: its mtime marks the export as complete and fresh
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+
+    print(f"✅ {model_path}: {len(index)} initializers, {offset / 1e6:.1f} MB -> {weights_path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export ONNX models for shared-memory serving")
+    parser.add_argument("models", nargs="+", help="ONNX model files to export")
+    args = parser.parse_args()
+    for path in args.models:
+        export_shared_weights(path)
+
+
+if __name__ == "__main__":
+    main()
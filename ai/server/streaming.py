@@ -0,0 +1,156 @@
+"""
+Persistent WebSocket streaming for a whole game session.
+
+One connection to /stream/{session_id} carries every frame and audio chunk
+of a session, instead of a multipart POST (and often a new TLS handshake)
+per frame. Clients send binary messages whose first byte tags the payload:
+
+    0x01 + JPEG bytes      -> video frame
+    0x02 + audio bytes     -> audio chunk (int16 PCM, WAV or Ogg/WebM)
+
+Results are pushed back as JSON text messages as soon as they finish:
+
+    {"type": "frame", "seq": 7, "result": {...}, "dropped_frames": 2}
+    {"type": "audio", "seq": 3, "result": {...}, "dropped_chunks": 0}
+    {"type": "frame", "seq": 8, "error": "overloaded"}
+
+``seq`` numbers count received messages of each type from 0. Backpressure:
+only the newest unprocessed frame is kept, so when the client outpaces the
+server stale frames are dropped rather than queued. Audio chunks queue in
+order up to a small bound, dropping the oldest beyond it.
+
+When the connection ends, ``on_close`` (if given) is awaited with the
+session id to release per-connection state such as the audio decoder.
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from fastapi import WebSocket
+
+from executor import ExecutorSaturated
+
+FRAME_MESSAGE = 0x01
+AUDIO_MESSAGE = 0x02
+
+Analyzer = Callable[[bytes, str], Awaitable[Dict[str, Any]]]
+CloseHook = Callable[[str], Awaitable[None]]
+
+
+class StreamSession:
+    """Serve one WebSocket connection for a game session."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        session_id: str,
+        analyze_frame: Analyzer,
+        analyze_audio: Analyzer,
+        audio_queue_size: int = 8,
+        on_close: Optional[CloseHook] = None,
+    ) -> None:
+        self.websocket = websocket
+        self.session_id = session_id
+        self.analyze_frame = analyze_frame
+        self.analyze_audio = analyze_audio
+        self.on_close = on_close
+
+        self._send_lock = asyncio.Lock()
+
+        # Latest-wins slot for frames
+        self._frame: Optional[Tuple[int, bytes]] = None
+        self._frame_ready = asyncio.Event()
+        self._frame_seq = 0
+        self.dropped_frames = 0
+
+        # Bounded FIFO for audio
+        self._audio: Deque[Tuple[int, bytes]] = deque(maxlen=max(1, audio_queue_size))
+        self._audio_ready = asyncio.Event()
+        self._audio_seq = 0
+        self.dropped_chunks = 0
+
+    async def run(self) -> None:
+        """Receive messages until the client disconnects."""
+        await self.websocket.accept()
+        workers = [
+            asyncio.create_task(self._frame_worker()),
+            asyncio.create_task(self._audio_worker()),
+        ]
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                payload = message.get("bytes")
+                if not payload:
+                    await self._send({"type": "error", "error": "Expected a binary tagged message"})
+                    continue
+                await self._dispatch(payload[0], payload[1:])
+        finally:
+            try:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+            finally:
+                if self.on_close is not None:
+                    try:
+                        await self.on_close(self.session_id)
+                    except Exception as exc:
+                        print(f"[AI] Stream cleanup failed for {self.session_id}: {exc}")
+
+    async def _dispatch(self, tag: int, body: bytes) -> None:
+        if tag == FRAME_MESSAGE:
+            if self._frame is not None:
+                # The previous frame was never started; it is stale now
+                self.dropped_frames += 1
+            self._frame = (self._frame_seq, body)
+            self._frame_seq += 1
+            self._frame_ready.set()
+        elif tag == AUDIO_MESSAGE:
+            if len(self._audio) == self._audio.maxlen:
+                self.dropped_chunks += 1
+            self._audio.append((self._audio_seq, body))
+            self._audio_seq += 1
+            self._audio_ready.set()
+        else:
+            await self._send({"type": "error", "error": f"Unknown message tag {tag}"})
+
+    async def _frame_worker(self) -> None:
+        while True:
+            await self._frame_ready.wait()
+            self._frame_ready.clear()
+            if self._frame is None:
+                continue
+            seq, body = self._frame
+            self._frame = None
+            message = await self._analyze("frame", seq, self.analyze_frame, body)
+            message["dropped_frames"] = self.dropped_frames
+            await self._send(message)
+
+    async def _audio_worker(self) -> None:
+        while True:
+            await self._audio_ready.wait()
+            self._audio_ready.clear()
+            while self._audio:
+                seq, body = self._audio.popleft()
+                message = await self._analyze("audio", seq, self.analyze_audio, body)
+                message["dropped_chunks"] = self.dropped_chunks
+                await self._send(message)
+
+    async def _analyze(self, kind: str, seq: int, analyzer: Analyzer, body: bytes) -> Dict[str, Any]:
+        try:
+            result = await analyzer(body, self.session_id)
+        except ExecutorSaturated:
+            return {"type": kind, "seq": seq, "error": "overloaded"}
+        except Exception as exc:
+            return {"type": kind, "seq": seq, "error": str(exc)}
+        return {"type": kind, "seq": seq, "result": result}
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        async with self._send_lock:
+            try:
+                await self.websocket.send_json(message)
+            except Exception:
+                # Client already gone; the receive loop will notice
+                pass
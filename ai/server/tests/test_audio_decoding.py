@@ -0,0 +1,148 @@
+"""
+Audio chunk decoding: format sniffing, WAV parsing, polyphase resampling and
+chunked MediaRecorder streams.
+
+Run from ai/server:
+  python -m pytest tests
+"""
+
+import io
+import os
+import struct
+import sys
+import wave
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from audio_decoding import (  # noqa: E402
+    StreamDecoderStore,
+    decode_audio,
+    detect_format,
+    parse_wav,
+    resample,
+)
+
+
+def _tone(freq: float, rate: int, seconds: float = 0.5, amplitude: float = 10000.0) -> np.ndarray:
+    t = np.arange(int(rate * seconds)) / rate
+    return (np.sin(2 * np.pi * freq * t) * amplitude).astype(np.int16)
+
+
+def _wav(samples: np.ndarray, rate: int, channels: int = 1, width: int = 2) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(width)
+        w.setframerate(rate)
+        w.writeframes(samples.tobytes())
+    return buf.getvalue()
+
+
+def _float_wav(samples: np.ndarray, rate: int, data_size: int) -> bytes:
+    """32-bit float WAV with an explicit data size (0xFFFFFFFF for streaming writers)."""
+    body = samples.astype("<f4").tobytes()
+    fmt = struct.pack("<HHIIHH", 3, 1, rate, rate * 4, 4, 32)
+    return (
+        b"RIFF" + struct.pack("<I", 36 + len(body)) + b"WAVE"
+        + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+        + b"data" + struct.pack("<I", data_size) + body
+    )
+
+
+def _peak_hz(samples: np.ndarray, rate: int) -> float:
+    spectrum = np.abs(np.fft.rfft(samples.astype(np.float64)))
+    return float(np.argmax(spectrum) * rate / samples.size)
+
+
+def test_detect_format():
+    assert detect_format(_wav(np.zeros(10, np.int16), 16000)) == "wav"
+    assert detect_format(b"OggS\x00\x02" + b"\x00" * 30) == "ogg"
+    assert detect_format(b"\x1a\x45\xdf\xa3" + b"\x00" * 30) == "webm"
+    assert detect_format(np.zeros(64, np.int16).tobytes()) == "pcm"
+    assert detect_format(b"RIFF") == "pcm"
+
+
+def test_parse_wav_16bit_stereo():
+    left, right = _tone(440, 16000), _tone(880, 16000)
+    stereo = np.stack([left, right], axis=1)
+    samples, rate = parse_wav(_wav(stereo, 16000, channels=2))
+    assert rate == 16000
+    assert samples.shape == (left.size, 2)
+    np.testing.assert_array_equal(samples[:, 0], left)
+    np.testing.assert_array_equal(samples[:, 1], right)
+
+
+def test_parse_wav_8bit_and_float():
+    samples, _ = parse_wav(_wav(np.array([0, 128, 255], np.uint8), 8000, width=1))
+    assert samples.dtype == np.uint8 and samples[:, 0].tolist() == [0, 128, 255]
+
+    values = np.array([0.0, 0.5, -0.5], np.float32)
+    samples, rate = parse_wav(_float_wav(values, 22050, 0xFFFFFFFF))
+    assert rate == 22050
+    np.testing.assert_array_equal(samples[:, 0], values)
+
+
+def test_parse_wav_rejects_unsupported_encoding():
+    data = bytearray(_wav(np.zeros(8, np.int16), 16000))
+    struct.pack_into("<H", data, 20, 0x55)  # MP3 format tag
+    with pytest.raises(ValueError):
+        parse_wav(bytes(data))
+
+
+@pytest.mark.parametrize("orig_rate", [48000, 44100, 22050, 8000])
+def test_resample_keeps_length_and_pitch(orig_rate):
+    samples = _tone(440, orig_rate)
+    out = resample(samples, orig_rate, 16000)
+    assert out.dtype == np.int16
+    assert out.size == -(-samples.size * 16000 // orig_rate)
+    assert abs(_peak_hz(out, 16000) - 440) < 5
+    # Same level away from the edges
+    core = slice(out.size // 4, 3 * out.size // 4)
+    assert np.sqrt(np.mean(out[core].astype(np.float64) ** 2)) == pytest.approx(10000 / np.sqrt(2), rel=0.02)
+
+
+def test_resample_filters_above_the_new_nyquist():
+    # 10 kHz can't be represented at 16 kHz; it must not alias back in
+    out = resample(_tone(10000, 48000), 48000, 16000)
+    core = out[out.size // 4 : 3 * out.size // 4].astype(np.float64)
+    assert np.sqrt(np.mean(core ** 2)) < 100
+
+
+def test_decode_audio_wav_to_target_rate():
+    out = decode_audio(_wav(_tone(440, 48000), 48000), 16000)
+    assert out.size == 8000
+    assert abs(_peak_hz(out, 16000) - 440) < 5
+
+
+def _opus_webm(seconds: float = 2.0) -> bytes:
+    av = pytest.importorskip("av")
+    buf = io.BytesIO()
+    container = av.open(buf, "w", format="webm", options={"live": "1", "cluster_time_limit": "500"})
+    stream = container.add_stream("libopus", rate=48000, layout="mono")
+    pcm = _tone(300, 48000, seconds)
+    for start in range(0, pcm.size, 960):
+        frame = av.AudioFrame.from_ndarray(pcm[None, start : start + 960], format="s16", layout="mono")
+        frame.sample_rate = 48000
+        frame.pts = start
+        for packet in stream.encode(frame):
+            container.mux(packet)
+    for packet in stream.encode(None):
+        container.mux(packet)
+    container.close()
+    return buf.getvalue()
+
+
+def test_chunked_webm_stream_decodes_through_one_decoder():
+    data = _opus_webm()
+    streams = StreamDecoderStore(16000)
+    decoder = streams.get("session")
+    # MediaRecorder chunks can split the container anywhere
+    chunks = [data[i : i + 700] for i in range(0, len(data), 700)]
+    decoded = [decode_audio(chunk, 16000, decoder) for chunk in chunks]
+    streams.forget("session")
+
+    assert sum(part.size for part in decoded) == pytest.approx(32000, abs=160)
+    assert sum(1 for part in decoded[1:] if part.size) > len(chunks) // 2
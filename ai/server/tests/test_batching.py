@@ -0,0 +1,77 @@
+"""
+MicroBatcher: flush on size and on timeout, and per-caller result order.
+
+Run from ai/server:
+  python -m pytest tests
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from batching import MicroBatcher  # noqa: E402
+
+
+def _recording_runner(batches):
+    async def run_batch(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    return run_batch
+
+
+def test_full_batch_flushes_without_waiting():
+    batches = []
+    # A wait far longer than the test: only the size limit can flush
+    batcher = MicroBatcher(_recording_runner(batches), max_batch_size=4, max_wait_ms=60_000)
+
+    async def go():
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(4))), timeout=1.0
+        )
+
+    assert asyncio.run(go()) == [0, 10, 20, 30]
+    assert batches == [[0, 1, 2, 3]]
+
+
+def test_partial_batch_flushes_on_timeout():
+    batches = []
+    batcher = MicroBatcher(_recording_runner(batches), max_batch_size=16, max_wait_ms=20)
+
+    async def go():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        results = await asyncio.gather(batcher.submit(1), batcher.submit(2))
+        return results, loop.time() - started
+
+    results, elapsed = asyncio.run(go())
+    assert results == [10, 20]
+    assert batches == [[1, 2]]
+    assert elapsed >= 0.015
+
+
+def test_results_follow_submission_order_across_batches():
+    batches = []
+    batcher = MicroBatcher(_recording_runner(batches), max_batch_size=3, max_wait_ms=5)
+
+    async def go():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(7)))
+
+    assert asyncio.run(go()) == [i * 10 for i in range(7)]
+    assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+    assert batcher.stats()["batch_size_histogram"] == {1: 1, 3: 2}
+
+
+def test_batch_failure_reaches_every_caller():
+    async def run_batch(items):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(run_batch, max_batch_size=2, max_wait_ms=5)
+
+    async def go():
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    results = asyncio.run(go())
+    assert all(isinstance(r, RuntimeError) for r in results)
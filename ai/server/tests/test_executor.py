@@ -0,0 +1,71 @@
+"""
+InferenceExecutor: shedding beyond capacity and per-session lane affinity.
+
+Run from ai/server:
+  python -m pytest tests
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from executor import ExecutorSaturated, InferenceExecutor  # noqa: E402
+
+
+def test_work_beyond_capacity_is_shed():
+    executor = InferenceExecutor(mode="thread", max_workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def go():
+        running = asyncio.ensure_future(executor.run(release.wait, 5.0))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(int, "1")
+        # Follow-up stages of admitted work are never shed
+        follow_up = asyncio.ensure_future(executor.run(int, "2", shed=False))
+        release.set()
+        return await running, await follow_up
+
+    try:
+        assert asyncio.run(go()) == (True, 2)
+        stats = executor.stats()
+        assert stats["rejected"] == 1
+        assert stats["outstanding"] == 0
+    finally:
+        executor.shutdown()
+
+
+def test_keys_map_to_stable_lanes():
+    executor = InferenceExecutor(mode="process", max_workers=3)
+    try:
+        lanes = {key: executor.lane(key) for key in ("a", "b", "c", "d", "e", "f")}
+        assert lanes == {key: executor.lane(key) for key in lanes}
+        assert set(lanes.values()) <= {0, 1, 2}
+        assert len(set(lanes.values())) > 1
+        assert InferenceExecutor(mode="thread").lane("a") is None
+    finally:
+        executor.shutdown()
+
+
+def test_a_sessions_work_runs_in_one_process():
+    executor = InferenceExecutor(mode="process", max_workers=2)
+
+    async def go():
+        first = [await executor.run(os.getpid, key="session-1") for _ in range(4)]
+        other = await executor.run(os.getpid, key="session-4")
+        return first, other
+
+    try:
+        first, other = asyncio.run(go())
+        assert len(set(first)) == 1
+        assert first[0] != os.getpid()
+        # crc32 puts these two sessions in different lanes
+        assert executor.lane("session-1") != executor.lane("session-4")
+        assert other != first[0]
+    finally:
+        executor.shutdown()
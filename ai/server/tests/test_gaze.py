@@ -0,0 +1,59 @@
+"""
+Gaze I-VT split: fixations and saccades from gaze speed, not per-frame distance.
+
+Run from ai/server:
+  python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from gaze import GazeAccumulator  # noqa: E402
+
+
+def _trace(times: np.ndarray) -> np.ndarray:
+    """Look at (0.2, 0.5) until t=3 s, jump to (0.8, 0.5), then back at t=6 s."""
+    xs = np.full(times.shape, 0.2)
+    xs[(times >= 3.0) & (times < 6.0)] = 0.8
+    return xs
+
+
+def test_fixed_rate_trace():
+    times = np.arange(0.0, 9.0, 0.1)
+    xs = _trace(times)
+    gaze = GazeAccumulator()
+    gaze.add_arrays(xs[:1], np.full(1, 0.5), 0.0)
+    gaze.add_arrays(xs[1:], np.full(xs.size - 1, 0.5), 0.1)
+    patterns = gaze.patterns()
+    assert patterns["saccade_count"] == 2
+    assert patterns["fixation_count"] == 3
+
+
+def test_variable_rate_trace_matches_fixed_rate():
+    rng = np.random.default_rng(0)
+    times = np.cumsum(rng.uniform(0.05, 1.0, 40))
+    times -= times[0]
+    xs = _trace(times)
+    gaze = GazeAccumulator()
+    previous = None
+    for t, x in zip(times, xs):
+        gaze.add(float(x), 0.5, 0.0 if previous is None else float(t - previous))
+        previous = t
+    patterns = gaze.patterns()
+    assert patterns["saccade_count"] == 2
+    assert patterns["fixation_count"] == 3
+
+
+def test_slow_drift_is_not_a_saccade_at_low_frame_rate():
+    # 0.1 screen widths per second sampled every 2 s moves 0.2 per frame
+    gaze = GazeAccumulator()
+    gaze.add(0.1, 0.5, 0.0)
+    for step in range(1, 5):
+        gaze.add(0.1 + 0.2 * step, 0.5, 2.0)
+    patterns = gaze.patterns()
+    assert patterns["saccade_count"] == 0
+    assert patterns["fixation_ratio"] == 1.0
@@ -0,0 +1,86 @@
+"""
+SessionAccumulator: posted frame dicts and frame columns finalize the same way.
+
+Run from ai/server:
+  python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from session_store import SessionAccumulator  # noqa: E402
+
+LABELS = ["happy", "sad", "neutral"]
+
+
+def _frames(n: int = 50):
+    rng = np.random.default_rng(0)
+    emotions = rng.dirichlet(np.ones(len(LABELS)), size=n)
+    engagement = rng.uniform(0.0, 1.0, n)
+    attention = rng.uniform(0.0, 1.0, n)
+    gaze = rng.uniform(-0.2, 1.2, (n, 2))
+    return engagement, attention, emotions, gaze
+
+
+def _finalize_view(acc: SessionAccumulator):
+    """Everything /session/finalize reads from an accumulator."""
+    return {
+        "frame_count": acc.frame_count,
+        "average_engagement": acc.average_engagement,
+        "average_attention": acc.average_attention,
+        "emotion_distribution": acc.emotion_distribution(),
+        "histograms": acc.histograms(),
+        "gaze_patterns": acc.gaze_patterns(),
+    }
+
+
+def _assert_close(a, b, path="result"):
+    """Nested dicts/lists equal up to float rounding."""
+    if isinstance(a, dict):
+        assert isinstance(b, dict) and set(a) == set(b), path
+        for key in a:
+            _assert_close(a[key], b[key], f"{path}.{key}")
+    elif isinstance(a, list):
+        assert isinstance(b, list) and len(a) == len(b), path
+        for i, (x, y) in enumerate(zip(a, b)):
+            _assert_close(x, y, f"{path}[{i}]")
+    else:
+        assert a == pytest.approx(b), path
+
+
+def test_frame_dicts_and_columns_finalize_the_same():
+    engagement, attention, emotions, gaze = _frames()
+
+    from_dicts = SessionAccumulator()
+    from_dicts.add_frame_dicts([
+        {
+            "engagement": float(engagement[i]),
+            "attention": float(attention[i]),
+            "emotions": dict(zip(LABELS, map(float, emotions[i]))),
+            "gaze_direction": {"x": float(gaze[i, 0]), "y": float(gaze[i, 1])},
+        }
+        for i in range(len(engagement))
+    ])
+
+    from_columns = SessionAccumulator()
+    from_columns.add_frame_columns(
+        engagement, attention, LABELS, emotions, gaze[:, 0].copy(), gaze[:, 1].copy()
+    )
+
+    _assert_close(_finalize_view(from_dicts), _finalize_view(from_columns))
+
+
+def test_frames_without_gaze_or_emotions():
+    from_dicts = SessionAccumulator()
+    from_dicts.add_frame_dicts([{"engagement": 0.2, "attention": 0.9}, {}])
+
+    from_columns = SessionAccumulator()
+    from_columns.add_frame_columns(np.array([0.2, 0.5]), np.array([0.9, 0.5]))
+
+    _assert_close(_finalize_view(from_dicts), _finalize_view(from_columns))
+    assert from_dicts.gaze_patterns()["samples"] == 0
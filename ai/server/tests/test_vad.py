@@ -0,0 +1,56 @@
+"""
+Voice-activity gate: hangover and ZCR edge cases.
+
+Run from ai/server:
+  python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from vad import VoiceActivityDetector  # noqa: E402
+
+SAMPLE_RATE = 16000
+CHUNK = SAMPLE_RATE // 2  # 500 ms
+
+
+def _pcm(signal: np.ndarray, dbfs: float) -> np.ndarray:
+    """Scale ``signal`` to an RMS of ``dbfs`` and convert to int16."""
+    rms = np.sqrt(np.mean(signal ** 2))
+    scaled = signal / rms * 32768.0 * 10.0 ** (dbfs / 20.0)
+    return np.clip(scaled, -32768, 32767).astype(np.int16)
+
+
+def _tone(dbfs: float, freq: float = 220.0) -> np.ndarray:
+    t = np.arange(CHUNK) / SAMPLE_RATE
+    return _pcm(np.sin(2 * np.pi * freq * t), dbfs)
+
+
+def test_silent_chunk_after_speech_is_silence():
+    vad = VoiceActivityDetector(sample_rate=SAMPLE_RATE, hangover_frames=10)
+    assert vad.is_speech(_tone(-20.0), "session")
+    # Digital silence right after speech: the hangover alone must not make it speech
+    assert not vad.is_speech(np.zeros(CHUNK, dtype=np.int16), "session")
+
+
+def test_hangover_bridges_pauses_inside_a_chunk():
+    vad = VoiceActivityDetector(sample_rate=SAMPLE_RATE, stop_dbfs=-48.0, hangover_frames=10)
+    assert vad.is_speech(_tone(-20.0), "session")
+    # Quieter continuation between stop_dbfs and start_dbfs stays speech
+    assert vad.is_speech(_tone(-45.0), "session")
+
+
+def test_loud_white_noise_is_not_gated_by_zcr():
+    vad = VoiceActivityDetector(sample_rate=SAMPLE_RATE)
+    noise = _pcm(np.random.default_rng(0).standard_normal(CHUNK), -20.0)
+    assert vad.is_speech(noise)
+
+
+def test_quiet_white_noise_is_silence():
+    vad = VoiceActivityDetector(sample_rate=SAMPLE_RATE)
+    noise = _pcm(np.random.default_rng(0).standard_normal(CHUNK), -35.0)
+    assert not vad.is_speech(noise)
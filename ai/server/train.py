@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Train Cognicare's facial emotion models on FER2013.
+
+One entry point for every emotion model the server can use. Architecture,
+input size, colour, layout, labels and output path are configuration:
+
+    python train.py                                  # deep 64x64 CNN (emotionnet)
+    python train.py --preset compact                 # small 48x48 CNN
+    python train.py --architecture compact --input-size 96 --grayscale \
+        --output models/emotion_gray96.onnx
+
+Each export writes ``<root>.json`` next to the model, which the server's
+model registry reads at load time:
+
+    {"labels": ["angry", ...],
+     "input": {"shape": [null, 3, 64, 64], "layout": "NCHW", "color": "RGB",
+               "scale": 0.00392156862745098, "mean": [0, 0, 0], "std": [1, 1, 1]},
+     "architecture": "deep", "validation_accuracy": 0.63, ...}
+
+so frames are preprocessed at the model's native resolution, layout and
+normalisation. Data comes from fer2013.py (cached uint8 arrays, tf.data
+pipeline) split by Usage, and training is checkpointed and resumable
+(checkpoints.py); only the best epoch is exported.
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from checkpoints import checkpoint_callbacks, restore_best
+from fer2013 import (
+    load_fer2013,
+    split_indices,
+    steps_per_second_callback,
+    tf_dataset,
+    to_model_input,
+)
+
+FER2013_CSV_PATH = "data/fer2013/fer2013.csv"
+# emotions: 0=Angry, 1=Disgust, 2=Fear, 3=Happy, 4=Sad, 5=Surprise, 6=Neutral
+FER2013_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+ARCHITECTURES = ("compact", "deep")
+LAYOUTS = ("NCHW", "NHWC")
+
+
+@dataclass
+class TrainConfig:
+    architecture: str = "deep"
+    input_size: int = 64
+    channels: int = 3  # 3: RGB (grey replicated), 1: grayscale
+    # Exported input layout; the server feeds NCHW natively
+    layout: str = "NCHW"
+    labels: List[str] = field(default_factory=lambda: list(FER2013_LABELS))
+    output_path: str = "models/emotion_emotionnet.onnx"
+    csv_path: str = FER2013_CSV_PATH
+    batch_size: int = 32
+    epochs: int = 50
+    learning_rate: float = 0.001
+    augment: bool = True
+    # EarlyStopping(patience=5) and ReduceLROnPlateau(patience=3)
+    early_stopping: bool = True
+    # Default: checkpoints/<output file name without extension>
+    checkpoint_dir: Optional[str] = None
+    # Also export a combined emotion + attention model here (see export_multitask)
+    multitask_path: Optional[str] = None
+    attention_teacher_path: str = "models/attention_gaze.onnx"
+
+
+PRESETS: Dict[str, TrainConfig] = {
+    # Deeper 64x64 CNN with augmentation, served as emotion_emotionnet.onnx
+    "emotionnet": TrainConfig(multitask_path="models/vision_multitask.onnx"),
+    # Small 48x48 CNN trained on the native FER2013 resolution
+    "compact": TrainConfig(
+        architecture="compact",
+        input_size=48,
+        output_path="models/emotion_model.onnx",
+        augment=False,
+        early_stopping=False,
+    ),
+}
+
+
+# ---------------------------------------------------------------------------
+# Model
+# ---------------------------------------------------------------------------
+
+def build_model(config: TrainConfig):
+    """Keras classifier (NHWC input) for ``config.architecture``."""
+    from tensorflow import keras
+    from tensorflow.keras import layers
+
+    size, channels = config.input_size, config.channels
+    if config.architecture == "compact":
+        body = [
+            layers.Conv2D(32, (3, 3), activation='relu'),
+            layers.MaxPooling2D(2, 2),
+            layers.Dropout(0.25),
+
+            layers.Conv2D(64, (3, 3), activation='relu'),
+            layers.MaxPooling2D(2, 2),
+            layers.Dropout(0.25),
+
+            layers.Conv2D(128, (3, 3), activation='relu'),
+            layers.MaxPooling2D(2, 2),
+            layers.Dropout(0.25),
+
+            layers.Flatten(),
+            layers.Dense(256, activation='relu'),
+            layers.Dropout(0.5),
+            layers.Dense(128, activation='relu'),
+            layers.Dropout(0.5),
+        ]
+    elif config.architecture == "deep":
+        body = []
+        for filters in (32, 64, 128):
+            body += [
+                layers.Conv2D(filters, (3, 3), activation='relu', padding='same'),
+                layers.BatchNormalization(),
+                layers.Conv2D(filters, (3, 3), activation='relu', padding='same'),
+                layers.MaxPooling2D(2, 2),
+                layers.Dropout(0.25),
+            ]
+        body += [
+            layers.Flatten(),
+            layers.Dense(512, activation='relu'),
+            layers.BatchNormalization(),
+            layers.Dropout(0.5),
+            layers.Dense(256, activation='relu'),
+            layers.Dropout(0.5),
+        ]
+    else:
+        raise ValueError(f"Unknown architecture {config.architecture!r}; use one of {ARCHITECTURES}")
+
+    model = keras.Sequential(
+        [layers.Input(shape=(size, size, channels))]
+        + body
+        # Named so the combined vision model exposes it as its "emotion" output
+        + [layers.Dense(len(config.labels), activation='softmax', name='emotion')]
+    )
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=config.learning_rate),
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    return model
+
+
+def model_inputs(images: np.ndarray, config: TrainConfig) -> np.ndarray:
+    """uint8 FER2013 rows -> float32 batch in the exported layout."""
+    batch = to_model_input(images, config.input_size, config.channels)
+    if config.layout == "NCHW":
+        batch = batch.transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(batch)
+
+
+def _layout_wrapper(config: TrainConfig):
+    """(Keras input in the exported layout, the same tensor as NHWC)."""
+    from tensorflow.keras import layers
+
+    size, channels = config.input_size, config.channels
+    if config.layout == "NCHW":
+        inputs = layers.Input(shape=(channels, size, size), name="input")
+        return inputs, layers.Permute((2, 3, 1))(inputs)
+    inputs = layers.Input(shape=(size, size, channels), name="input")
+    return inputs, inputs
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def model_metadata(config: TrainConfig, **extra: Any) -> Dict[str, Any]:
+    """The sidecar the server reads (see model_registry.input_spec)."""
+    size, channels = config.input_size, config.channels
+    shape = [None, channels, size, size] if config.layout == "NCHW" else [None, size, size, channels]
+    return {
+        "labels": list(config.labels),
+        "input": {
+            "shape": shape,
+            "layout": config.layout,
+            "color": "RGB" if channels == 3 else "GRAY",
+            "scale": 1.0 / 255.0,
+            "mean": [0.0] * channels,
+            "std": [1.0] * channels,
+        },
+        "architecture": config.architecture,
+        "dataset": "FER2013",
+        "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **extra,
+    }
+
+
+def write_sidecar(model_path: str, metadata: Dict[str, Any]) -> str:
+    path = os.path.splitext(model_path)[0] + ".json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    return path
+
+
+def export_onnx(model, config: TrainConfig, output_path: str, wrap_layout: bool = True) -> str:
+    """
+    Export ``model`` to ONNX. A plain NHWC classifier is first wrapped to take
+    ``config.layout`` input; pass ``wrap_layout=False`` for graphs built on
+    _layout_wrapper already.
+    """
+    import tensorflow as tf
+    from tensorflow import keras
+    import tf2onnx
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    if wrap_layout:
+        inputs, nhwc = _layout_wrapper(config)
+        exported = keras.Model(inputs, model(nhwc))
+    else:
+        exported = model
+    shape = exported.inputs[0].shape
+    spec = (tf.TensorSpec((None,) + tuple(shape[1:]), tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(exported, input_signature=spec, output_path=output_path)
+    print(f"✅ Model exported to: {output_path}")
+    print(f"   File size: {os.path.getsize(output_path) / (1024*1024):.2f} MB")
+    return output_path
+
+
+def verify_onnx(model, config: TrainConfig, output_path: str, images: np.ndarray) -> float:
+    """Compare ONNX Runtime and Keras outputs on a few rows; returns the max difference."""
+    import onnxruntime as ort
+
+    session = ort.InferenceSession(output_path)
+    onnx_out = session.run(None, {session.get_inputs()[0].name: model_inputs(images, config)})[0]
+    keras_out = model.predict(to_model_input(images, config.input_size, config.channels), verbose=0)
+    diff = float(np.abs(onnx_out - keras_out).max())
+    print(f"🧪 ONNX Runtime vs Keras on {len(images)} samples: max |diff| {diff:.2e}")
+    return diff
+
+
+def export_multitask(emotion_model, data, train_idx: np.ndarray, config: TrainConfig, epochs: int = 5) -> Optional[str]:
+    """
+    Export one ONNX graph with a shared backbone and two heads.
+
+    The server otherwise runs the emotion and the attention model on every
+    frame, i.e. the convolutional work twice. Here the trained emotion
+    network is the backbone; an attention/gaze head ([attention, gaze_x,
+    gaze_y] in [0, 1]) is trained on its penultimate features, distilled
+    from the existing attention model since FER2013 has no gaze labels.
+
+    The graph has two outputs, "emotion" and "attention"; main.py uses it
+    instead of the separate models when VISION_MODEL_PATH exists.
+    """
+    from tensorflow import keras
+    from tensorflow.keras import layers
+    import onnxruntime as ort
+    from model_registry import InputSpec, input_spec
+
+    output_path = config.multitask_path
+    teacher_path = config.attention_teacher_path
+    print("\n🧠 Building combined emotion + attention model...")
+    if not os.path.exists(teacher_path):
+        print(f"⚠️  No attention model at {teacher_path}; skipping the combined export.")
+        return None
+
+    # Attention targets from the separate model, fed in its own input format
+    teacher = ort.InferenceSession(teacher_path)
+    teacher_spec = input_spec(teacher_path, teacher) or InputSpec()
+    teacher_config = replace(
+        config,
+        input_size=teacher_spec.size or config.input_size,
+        channels=teacher_spec.channels,
+        layout=teacher_spec.layout,
+    )
+    teacher_input = teacher.get_inputs()[0].name
+    fixed_batch = teacher.get_inputs()[0].shape[0]
+    step = fixed_batch if isinstance(fixed_batch, int) else 256
+    targets = []
+    for start in range(0, len(train_idx), step):
+        chunk = model_inputs(data.images[train_idx[start:start + step]], teacher_config)
+        out = teacher.run(None, {teacher_input: chunk})[0].reshape(len(chunk), -1)
+        # Pad models without gaze outputs with a centred gaze
+        padded = np.full((len(chunk), 3), 0.5, dtype=np.float32)
+        padded[:, :min(3, out.shape[1])] = out[:, :3]
+        targets.append(np.clip(padded, 0.0, 1.0))
+    targets = np.concatenate(targets)
+    print(f"   Distilled {len(targets)} attention targets from {teacher_path}")
+
+    # Shared backbone: every emotion layer except the classifier, frozen
+    inputs, features = _layout_wrapper(config)
+    for layer in emotion_model.layers[:-1]:
+        layer.trainable = False
+        features = layer(features)
+    emotion = emotion_model.layers[-1](features)
+    x = layers.Dense(64, activation='relu')(features)
+    attention = layers.Dense(3, activation='sigmoid', name='attention')(x)
+
+    # Train the attention head alone; the emotion head is already trained
+    head = keras.Model(inputs, attention)
+    head.compile(optimizer=keras.optimizers.Adam(learning_rate=config.learning_rate), loss='mse')
+
+    def head_batches():
+        while True:
+            for start in range(0, len(train_idx), 64):
+                rows = train_idx[start:start + 64]
+                yield model_inputs(data.images[rows], config), targets[start:start + 64]
+
+    head.fit(head_batches(), steps_per_epoch=math.ceil(len(train_idx) / 64), epochs=epochs, verbose=1)
+
+    # Output names come from the "emotion" / "attention" layer names
+    combined = keras.Model(inputs, [emotion, attention])
+    export_onnx(combined, config, output_path, wrap_layout=False)
+    write_sidecar(output_path, model_metadata(config, heads=["emotion", "attention"]))
+
+    session = ort.InferenceSession(output_path)
+    sample = model_inputs(data.images[train_idx[:2]], config)
+    outputs = session.run(None, {session.get_inputs()[0].name: sample})
+    shapes = {meta.name: out.shape for meta, out in zip(session.get_outputs(), outputs)}
+    print(f"   Outputs: {shapes}")
+    return output_path
+
+
+# ---------------------------------------------------------------------------
+# Training
+# ---------------------------------------------------------------------------
+
+def train(config: TrainConfig) -> Optional[str]:
+    """Train, evaluate and export one model; returns the ONNX path."""
+    from tensorflow import keras
+
+    print(f"🤖 Training {config.architecture} emotion model "
+          f"({config.input_size}x{config.input_size}x{config.channels}, {config.layout})")
+    print("=" * 60)
+
+    if not os.path.exists(config.csv_path):
+        print("❌ FER2013 dataset not found!")
+        print("📥 Download it from: https://www.kaggle.com/datasets/msambare/fer2013")
+        print(f"   Place fer2013.csv at: {config.csv_path}")
+        return None
+
+    data = load_fer2013(config.csv_path)
+    if int(data.labels.max()) >= len(config.labels):
+        raise ValueError(
+            f"{len(config.labels)} labels configured but the data has class {int(data.labels.max())}"
+        )
+
+    # Split by Usage: Training / PublicTest (validation) / PrivateTest (test)
+    train_idx, val_idx, test_idx = split_indices(data)
+    print(f"\n📊 Data split:")
+    print(f"   Training: {len(train_idx)} samples")
+    print(f"   Validation: {len(val_idx)} samples")
+    print(f"   Test: {len(test_idx)} samples")
+
+    def dataset(indices, training=False):
+        return tf_dataset(
+            data, indices, config.batch_size, config.input_size,
+            training=training, augment=training and config.augment, channels=config.channels,
+        )
+
+    model = build_model(config)
+    model.summary()
+
+    checkpoint_dir = config.checkpoint_dir or os.path.join(
+        "checkpoints", os.path.splitext(os.path.basename(config.output_path))[0]
+    )
+    callbacks, best_path = checkpoint_callbacks(checkpoint_dir)
+    if config.early_stopping:
+        callbacks += [
+            keras.callbacks.EarlyStopping(patience=5, restore_best_weights=True),
+            keras.callbacks.ReduceLROnPlateau(patience=3, factor=0.5),
+        ]
+    callbacks.append(steps_per_second_callback(config.batch_size))
+
+    print("\n🚀 Starting training...")
+    print(f"   Epoch checkpoints: {checkpoint_dir} (an interrupted run resumes from there)")
+    val_ds = dataset(val_idx)
+    model.fit(
+        dataset(train_idx, training=True),
+        epochs=config.epochs,
+        validation_data=val_ds,
+        verbose=1,
+        callbacks=callbacks,
+    )
+
+    # Evaluate the best epoch (across resumed runs), which is what gets exported
+    restore_best(model, best_path)
+    val_loss, val_acc = model.evaluate(val_ds, verbose=0)
+    metrics = {"validation_accuracy": float(val_acc), "validation_loss": float(val_loss)}
+    print(f"\n✅ Training complete!")
+    print(f"   Validation Accuracy: {val_acc:.2%}")
+    print(f"   Validation Loss: {val_loss:.4f}")
+    if len(test_idx):
+        _, test_acc = model.evaluate(dataset(test_idx), verbose=0)
+        metrics["test_accuracy"] = float(test_acc)
+        print(f"   Test Accuracy: {test_acc:.2%}")
+
+    print("\n📦 Exporting to ONNX...")
+    export_onnx(model, config, config.output_path)
+    sidecar = write_sidecar(config.output_path, model_metadata(config, **metrics))
+    print(f"   Metadata: {sidecar}")
+    verify_onnx(model, config, config.output_path, data.images[val_idx[:8]])
+
+    if config.multitask_path:
+        export_multitask(model, data, train_idx, config)
+    return config.output_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train a FER2013 emotion model and export it to ONNX")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="emotionnet")
+    parser.add_argument("--architecture", choices=ARCHITECTURES)
+    parser.add_argument("--input-size", type=int)
+    parser.add_argument("--grayscale", action="store_true", help="1-channel input instead of RGB")
+    parser.add_argument("--layout", choices=LAYOUTS)
+    parser.add_argument("--labels", help="Comma-separated class names, in FER2013 index order")
+    parser.add_argument("--output", help="ONNX output path")
+    parser.add_argument("--csv", help="Path to fer2013.csv")
+    parser.add_argument("--epochs", type=int)
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--no-augment", action="store_true")
+    parser.add_argument("--checkpoint-dir")
+    parser.add_argument("--multitask-output", help="Also export a combined emotion + attention model")
+    args = parser.parse_args()
+
+    overrides: Dict[str, Any] = {
+        "architecture": args.architecture,
+        "input_size": args.input_size,
+        "layout": args.layout,
+        "output_path": args.output,
+        "csv_path": args.csv,
+        "epochs": args.epochs,
+        "batch_size": args.batch_size,
+        "checkpoint_dir": args.checkpoint_dir,
+        "multitask_path": args.multitask_output,
+    }
+    if args.labels:
+        overrides["labels"] = [label.strip() for label in args.labels.split(",") if label.strip()]
+    if args.grayscale:
+        overrides["channels"] = 1
+    if args.no_augment:
+        overrides["augment"] = False
+    config = replace(PRESETS[args.preset], **{k: v for k, v in overrides.items() if v is not None})
+    print(f"⚙️  Config: {asdict(config)}")
+    train(config)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Energy + zero-crossing voice-activity detection for audio chunks.
+
+Children are silent for most of a game, so running the speech model on every
+chunk mostly classifies room noise. VoiceActivityDetector splits a chunk into
+short frames and marks a frame as voiced when it is loud enough and its
+zero-crossing rate is below that of broadband noise. The ZCR gate only
+applies to quiet frames: anything at or above ``loud_dbfs`` counts as voiced
+whatever its ZCR (fricatives, shouting, or sound too loud to be ignored).
+Hysteresis keeps the decision stable: speech starts above ``start_dbfs``,
+continues while frames stay above the lower ``stop_dbfs``, and only ends
+after ``hangover_frames`` quieter frames. The state carries across a
+session's chunks, so a word split over two chunks is not cut off.
+
+Chunks without any voiced frame are reported as silence and can skip
+feature extraction and inference entirely. The hangover only bridges quiet
+frames between voiced ones; it never makes a chunk without a voiced frame
+(e.g. the silence right after speech) count as speech on its own.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from loudness import frame_envelope
+
+
+class VadState:
+    """Per-session hysteresis state."""
+
+    __slots__ = ("active", "hangover")
+
+    def __init__(self) -> None:
+        self.active = False
+        self.hangover = 0
+
+
+class VoiceActivityDetector:
+    """Frame-level energy/ZCR detector with hysteresis and skip counters."""
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: float = 30.0,
+        start_dbfs: float = -40.0,
+        stop_dbfs: float = -48.0,
+        zcr_max: float = 0.35,
+        hangover_frames: int = 10,
+        max_sessions: int = 1000,
+        loud_dbfs: float = -25.0,
+    ) -> None:
+        self.frame_length = max(1, int(sample_rate * frame_ms / 1000.0))
+        self.start_dbfs = start_dbfs
+        self.stop_dbfs = stop_dbfs
+        self.zcr_max = zcr_max
+        self.loud_dbfs = loud_dbfs
+        self.hangover_frames = hangover_frames
+        self.max_sessions = max_sessions
+
+        self._sessions: "OrderedDict[str, VadState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._chunks = 0
+        self._skipped = 0
+
+    def is_speech(self, samples: np.ndarray, session_id: Optional[str] = None) -> bool:
+        """
+        True when a frame of ``samples`` (int16 PCM) is voiced: it starts
+        speech, or continues speech that is active (possibly carried over
+        from the session's previous chunk). Updates the session's hysteresis
+        state and the counters.
+        """
+        state = self._state(session_id)
+        dbfs, zcr = self._frame_features(samples)
+
+        speech_like = (zcr <= self.zcr_max) | (dbfs >= self.loud_dbfs)
+        voiced_start = (dbfs >= self.start_dbfs) & speech_like
+        voiced_stay = (dbfs >= self.stop_dbfs) & speech_like
+
+        speech = False
+        active, hangover = state.active, state.hangover
+        for start, stay in zip(voiced_start.tolist(), voiced_stay.tolist()):
+            if start or (active and stay):
+                active, hangover = True, self.hangover_frames
+                speech = True
+            elif active:
+                # Hangover: stay active through short pauses, but only voiced
+                # frames make the chunk speech
+                hangover -= 1
+                active = hangover > 0
+        state.active, state.hangover = active, hangover
+
+        self._chunks += 1
+        if not speech:
+            self._skipped += 1
+        return speech
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "chunks": self._chunks,
+            "skipped_silent": self._skipped,
+            "skipped_ratio": self._skipped / self._chunks if self._chunks else 0.0,
+            "start_dbfs": self.start_dbfs,
+            "stop_dbfs": self.stop_dbfs,
+            "zcr_max": self.zcr_max,
+            "loud_dbfs": self.loud_dbfs,
+        }
+
+    def _state(self, session_id: Optional[str]) -> VadState:
+        if not session_id:
+            return VadState()
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = VadState()
+                self._sessions[session_id] = state
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            return state
+
+    def _frame_features(self, samples: np.ndarray):
+        """Per-frame level in dBFS and zero-crossing rate (fraction of samples)."""
+        dbfs = frame_envelope(samples, self.frame_length)
+        frames = samples[: dbfs.shape[0] * self.frame_length].reshape(dbfs.shape[0], -1)
+
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / max(1, frames.shape[1] - 1)
+        return dbfs, zcr
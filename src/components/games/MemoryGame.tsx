@@ -2,7 +2,14 @@ import { useState, useEffect, useRef } from 'react';
 import { supabase, Child } from '../../lib/supabase';
 import { useLanguage } from '../../contexts/LanguageContext';
 import { X, Star, Camera, CameraOff } from 'lucide-react';
-import { analyzeFrame, finalizeSession, calculateFallbackMetrics, FrameAnalysis } from '../../lib/ai';
+import {
+  analyzeFrame,
+  openAnalysisStream,
+  finalizeSession,
+  calculateFallbackMetrics,
+  AnalysisStream,
+  FrameAnalysis,
+} from '../../lib/ai';
 
 interface MemoryGameProps {
   child: Child;
@@ -24,9 +31,11 @@ export function MemoryGame({ child, onExit }: MemoryGameProps) {
   const videoRef = useRef<HTMLVideoElement>(null);
   const canvasRef = useRef<HTMLCanvasElement>(null);
   const frameIntervalRef = useRef<number | null>(null);
+  const analysisStreamRef = useRef<AnalysisStream | null>(null);
   const [frames, setFrames] = useState<FrameAnalysis[]>([]);
   const [reactionTimes, setReactionTimes] = useState<number[]>([]);
   const lastMoveTime = useRef<number>(Date.now());
+  const [aiSessionId] = useState(() => crypto.randomUUID());
 
   useEffect(() => {
     initializeGame();
@@ -37,6 +46,7 @@ export function MemoryGame({ child, onExit }: MemoryGameProps) {
       if (frameIntervalRef.current) {
         clearInterval(frameIntervalRef.current);
       }
+      analysisStreamRef.current?.close();
     };
   }, []);
 
@@ -68,6 +78,11 @@ export function MemoryGame({ child, onExit }: MemoryGameProps) {
         videoRef.current.srcObject = stream;
       }
 
+      // One WebSocket carries every frame of the session
+      analysisStreamRef.current = openAnalysisStream(aiSessionId, (analysis) => {
+        setFrames((prev) => [...prev, analysis]);
+      });
+
       // Capture frames every 2 seconds (0.5 fps)
       frameIntervalRef.current = window.setInterval(() => {
         captureFrame();
@@ -94,7 +109,10 @@ export function MemoryGame({ child, onExit }: MemoryGameProps) {
     canvas.toBlob(async (blob) => {
       if (blob) {
         try {
-          const analysis = await analyzeFrame(blob);
+          // Results from the stream arrive through its onFrame callback
+          if (await analysisStreamRef.current?.sendFrame(blob)) return;
+
+          const analysis = await analyzeFrame(blob, aiSessionId);
           setFrames((prev) => [...prev, analysis]);
         } catch (error) {
           console.error('Error analyzing frame:', error);
@@ -170,11 +188,12 @@ export function MemoryGame({ child, onExit }: MemoryGameProps) {
       let metrics: any = {};
       if (frames.length > 0) {
         try {
-          const sessionMetrics = await finalizeSession(
-            'temp-session-id',
-            frames,
-            []
-          );
+          // The server aggregated every frame sent with this session id;
+          // only resend them if it has nothing (e.g. after a restart)
+          let sessionMetrics = await finalizeSession(aiSessionId);
+          if (!sessionMetrics.frame_count) {
+            sessionMetrics = await finalizeSession(aiSessionId, frames, []);
+          }
           metrics = {
             ...sessionMetrics,
             reaction_times: reactionTimes,
@@ -17,6 +17,11 @@ export interface AudioAnalysis {
   emotion: string;
   confidence: number;
   energy: number;
+  /** Chunk RMS and peak level in dB relative to full scale */
+  dbfs?: number;
+  peak_dbfs?: number;
+  /** False when the chunk was gated as silence and the model was skipped */
+  voice_activity?: boolean;
 }
 
 export interface SessionMetrics {
@@ -26,15 +31,90 @@ export interface SessionMetrics {
   gaze_patterns: Record<string, any>;
   speech_emotions: Record<string, number>;
   recommendations: string[];
+  frame_count?: number;
+  audio_chunk_count?: number;
+  histograms?: Record<string, number[]>;
+  /** Session loudness: average_dbfs, max_peak_dbfs, trend_db_per_minute */
+  loudness?: Record<string, number>;
+}
+
+const STREAM_FRAME_TAG = 0x01;
+const STREAM_AUDIO_TAG = 0x02;
+
+export interface AnalysisStream {
+  sendFrame: (frameBlob: Blob) => Promise<boolean>;
+  sendAudio: (pcmBlob: Blob) => Promise<boolean>;
+  isOpen: () => boolean;
+  close: () => void;
+}
+
+/**
+ * Open a persistent WebSocket to the AI server for a whole game session.
+ * Frames and audio chunks are sent as tagged binary messages and results
+ * arrive through the callbacks as soon as the server finishes them. The
+ * server drops stale frames when the client sends faster than it can keep up.
+ * The send functions resolve to false when the socket is not open, so callers
+ * can fall back to analyzeFrame / analyzeAudio.
+ */
+export function openAnalysisStream(
+  sessionId: string,
+  onFrame: (analysis: FrameAnalysis) => void,
+  onAudio?: (analysis: AudioAnalysis) => void
+): AnalysisStream {
+  const wsUrl = AI_SERVER_URL.replace(/^http/, 'ws');
+  const socket = new WebSocket(`${wsUrl}/stream/${encodeURIComponent(sessionId)}`);
+  socket.binaryType = 'arraybuffer';
+
+  socket.onmessage = (event) => {
+    try {
+      const message = JSON.parse(event.data);
+      if (message.error) {
+        console.warn('AI stream error:', message.error);
+      } else if (message.type === 'frame') {
+        onFrame(message.result);
+      } else if (message.type === 'audio') {
+        onAudio?.(message.result);
+      }
+    } catch (error) {
+      console.error('Error parsing AI stream message:', error);
+    }
+  };
+
+  socket.onerror = (error) => {
+    console.error('AI stream connection error:', error);
+  };
+
+  const send = async (tag: number, blob: Blob): Promise<boolean> => {
+    if (socket.readyState !== WebSocket.OPEN) {
+      return false;
+    }
+    const payload = new Uint8Array(blob.size + 1);
+    payload[0] = tag;
+    payload.set(new Uint8Array(await blob.arrayBuffer()), 1);
+    socket.send(payload);
+    return true;
+  };
+
+  return {
+    sendFrame: (frameBlob) => send(STREAM_FRAME_TAG, frameBlob),
+    sendAudio: (pcmBlob) => send(STREAM_AUDIO_TAG, pcmBlob),
+    isOpen: () => socket.readyState === WebSocket.OPEN,
+    close: () => socket.close(),
+  };
 }
 
 /**
- * Analyze a video frame for emotions and engagement
+ * Analyze a video frame for emotions and engagement.
+ * Passing the game session id lets the server track the child's face
+ * across frames instead of re-detecting it every time.
  */
-export async function analyzeFrame(frameBlob: Blob): Promise<FrameAnalysis> {
+export async function analyzeFrame(frameBlob: Blob, sessionId?: string): Promise<FrameAnalysis> {
   try {
     const formData = new FormData();
     formData.append('frame', frameBlob, 'frame.jpg');
+    if (sessionId) {
+      formData.append('session_id', sessionId);
+    }
 
     const response = await fetch(`${AI_SERVER_URL}/vision/frame`, {
       method: 'POST',
@@ -57,13 +137,24 @@ export async function analyzeFrame(frameBlob: Blob): Promise<FrameAnalysis> {
   }
 }
 
+/**
+ * File name for an audio blob. The server sniffs the container itself, so
+ * this is informational; MediaRecorder blobs (Opus in WebM/OGG) can be sent
+ * as-is instead of being converted to WAV.
+ */
+function audioFileName(audioBlob: Blob): string {
+  if (audioBlob.type.includes('webm')) return 'audio.webm';
+  if (audioBlob.type.includes('ogg')) return 'audio.ogg';
+  return 'audio.wav';
+}
+
 /**
  * Analyze an audio chunk for speech emotions
  */
 export async function analyzeAudio(audioBlob: Blob): Promise<AudioAnalysis> {
   try {
     const formData = new FormData();
-    formData.append('audio', audioBlob, 'audio.wav');
+    formData.append('audio', audioBlob, audioFileName(audioBlob));
 
     const response = await fetch(`${AI_SERVER_URL}/audio/chunk`, {
       method: 'POST',
@@ -87,12 +178,36 @@ export async function analyzeAudio(audioBlob: Blob): Promise<AudioAnalysis> {
 }
 
 /**
- * Finalize a game session and get aggregated metrics
+ * Convert frame analyses to the columnar layout the server aggregates with
+ * NumPy: one array per field and a row-major flattened emotion matrix.
+ */
+function toFrameColumns(frames: FrameAnalysis[]) {
+  const emotionLabels = Array.from(
+    new Set(frames.flatMap((frame) => Object.keys(frame.emotions)))
+  );
+  const withGaze = frames.every((frame) => frame.gaze_direction);
+
+  return {
+    engagement: frames.map((frame) => frame.engagement),
+    attention: frames.map((frame) => frame.attention),
+    emotion_labels: emotionLabels,
+    emotions: frames.flatMap((frame) =>
+      emotionLabels.map((label) => frame.emotions[label] ?? 0)
+    ),
+    gaze_x: withGaze ? frames.map((frame) => frame.gaze_direction!.x) : [],
+    gaze_y: withGaze ? frames.map((frame) => frame.gaze_direction!.y) : [],
+  };
+}
+
+/**
+ * Finalize a game session and get aggregated metrics.
+ * Frames and audio analysed with this session id are already aggregated on
+ * the server, so the lists only need to be sent if the server lost them.
  */
 export async function finalizeSession(
   sessionId: string,
-  frames: FrameAnalysis[],
-  audioChunks: AudioAnalysis[]
+  frames: FrameAnalysis[] = [],
+  audioChunks: AudioAnalysis[] = []
 ): Promise<SessionMetrics> {
   try {
     const response = await fetch(`${AI_SERVER_URL}/session/finalize`, {
@@ -102,8 +217,10 @@ export async function finalizeSession(
       },
       body: JSON.stringify({
         session_id: sessionId,
-        frames,
-        audio_chunks: audioChunks,
+        ...(frames.length > 0 && { frame_columns: toFrameColumns(frames) }),
+        ...(audioChunks.length > 0 && {
+          audio_emotions: audioChunks.map((chunk) => chunk.emotion),
+        }),
       }),
     });
 